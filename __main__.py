@@ -1,7 +1,12 @@
-import dndCharacterApp.gui.main_frame as main_frame
+import sys
 
+# With arguments the program runs from the command line, without it opens the GUI.
 def main():
+    if len(sys.argv) > 1:
+        import dndCharacterApp.cli as cli
+        sys.exit(cli.main(sys.argv[1:]))
+    import dndCharacterApp.gui.main_frame as main_frame
     main_frame.create_window()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,96 @@
+# ----------------------------------------------------------------------------------------------- #
+# Benchmark of filling the character sheet pdf. The same random sheets are filled five ways:
+#       pypdf2 per field:  template read with PyPDF2 for every sheet, one update per field
+#                          (how sheets used to be made)
+#       pypdf2 one pass:   template read with PyPDF2 for every sheet, every value of a page set
+#                          in a single update
+#       filler one pass:   parsed template (pdf_utils), every value of a page set in a single
+#                          update
+#       incremental:       as filler one pass, written as an incremental update of the template
+#       compressed:        as filler one pass, written compressed without unused objects
+# and the time and size per sheet of each is printed. Run from the root of the repository with
+#       python -m benchmarks.pdf_fill_benchmark [count] [seed]
+# ----------------------------------------------------------------------------------------------- #
+
+import sys
+import time
+from io import BytesIO
+import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.rand_utils as ran
+
+
+# Function which fills a sheet the way it used to be done: the template is read and its
+# pages copied with PyPDF2, then each field is set with its own call.
+def fill_pypdf2_per_field(pages: (), stream, one_pass=False):
+    from PyPDF2 import PdfReader, PdfWriter
+
+    with open(io._get_absolute_path(io.PDF_FILE_PATH), "rb") as template:
+        pdf = PdfReader(BytesIO(template.read()))
+    wr = PdfWriter()
+    for i in range(len(pages)):
+        wr.add_page(pdf.pages[i])
+    for page_num in range(len(pages)):
+        if one_pass:
+            wr.update_page_form_field_values(wr.pages[page_num], pages[page_num])
+        else:
+            for name, value in pages[page_num].items():
+                wr.update_page_form_field_values(wr.pages[page_num], {name: value})
+    wr.write(stream)
+
+
+def fill_pypdf2_one_pass(pages: (), stream):
+    fill_pypdf2_per_field(pages, stream, True)
+
+
+def fill_filler_one_pass(pages: (), stream, mode="full"):
+    wr = io.get_form_filler().new_document()
+    for page_num in range(len(pages)):
+        wr.update_page_form_field_values(page_num, pages[page_num])
+    wr.write(stream, mode)
+
+
+def fill_incremental(pages: (), stream):
+    fill_filler_one_pass(pages, stream, "incremental")
+
+
+def fill_compressed(pages: (), stream):
+    fill_filler_one_pass(pages, stream, "compressed")
+
+
+# Function used to time a way of filling over every sheet's field values.
+# Returns the time per sheet in milliseconds and the average size of a sheet in bytes.
+def run(fill, sheet_pages: []) -> ():
+    size = 0
+    start = time.perf_counter()
+    for pages in sheet_pages:
+        stream = BytesIO()
+        fill(pages, stream)
+        size += len(stream.getvalue())
+    elapsed = time.perf_counter() - start
+    return elapsed / len(sheet_pages) * 1000, size // len(sheet_pages)
+
+
+def main(args: []) -> int:
+    count = int(args[0]) if len(args) > 0 else 20
+    seed = args[1] if len(args) > 1 else "benchmark"
+
+    sheets = ran.generate_many(count, ran.GenerationOptions(seed=seed))
+    sheet_pages = [sheet.pdf_field_values() for sheet in sheets if sheet is not None]
+    # Parse the template before timing so only the filling is measured.
+    if io.get_form_filler() is None:
+        print("Could not read " + io.PDF_FILE_PATH, file=sys.stderr)
+        return 1
+
+    print("Filling " + str(count) + " character sheets")
+    for name, fill in (("pypdf2 per field", fill_pypdf2_per_field),
+                       ("pypdf2 one pass", fill_pypdf2_one_pass),
+                       ("filler one pass", fill_filler_one_pass),
+                       ("incremental", fill_incremental),
+                       ("compressed", fill_compressed)):
+        per_sheet, size = run(fill, sheet_pages)
+        print("  {:<18}{:>9.2f}ms per sheet {:>9} bytes".format(name, per_sheet, size))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
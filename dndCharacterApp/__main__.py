@@ -0,0 +1,5 @@
+import sys
+import dndCharacterApp.cli as cli
+
+if __name__ == '__main__':
+    sys.exit(cli.main())
@@ -0,0 +1,273 @@
+# ----------------------------------------------------------------------------------------------- #
+# Command line part of application, used to make character sheets without the GUI (and without
+# importing tkinter) such as on a server.
+#       python -m dndCharacterApp generate --count N --level L --race R --out DIR --seed S
+#                                          --pdf-mode full|incremental|compressed --pack FILE
+#                                          --format pdf|fdf|xfdf|jsonl|csv|archive --numpy-dice
+# A pack named - is written to the standard output, the summary then goes to standard error.
+# The jsonl, csv and archive formats write every sheet into a single file (the pack, by
+# default characters.jsonl, characters.csv or characters.dndarc), sheets are added to the end
+# of an archive which already exists.
+# ----------------------------------------------------------------------------------------------- #
+
+import argparse
+import sys
+import time
+from os import makedirs
+from os.path import exists, getsize, join
+import dndCharacterApp.utils.archive_utils as archive
+import dndCharacterApp.utils.export_utils as export
+import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.rand_utils as ran
+import dndCharacterApp.utils.warmup_utils as warmup_utils
+from dndCharacterApp.dndEntities.dnd_enums import Alignment as Alignment
+
+
+# Function which returns the parser of the program's arguments.
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dndCharacterApp",
+                                     description="Random Dnd character sheet generator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="make random character sheets")
+    generate.add_argument("--count", type=_positive_int, default=1,
+                          help="number of character sheets to make (default 1)")
+    generate.add_argument("--level", type=int, default=None,
+                          help="level of every character (default random)")
+    generate.add_argument("--race", default=None,
+                          help="name or index of the race of every character (default random)")
+    generate.add_argument("--class", dest="dnd_class", default=None,
+                          help="class of every character (default random)")
+    generate.add_argument("--alignment", default=None, choices=[a.name for a in Alignment],
+                          help="alignment of every character (default random)")
+    generate.add_argument("--out", default=".",
+                          help="folder the character sheets are saved in (default .)")
+    generate.add_argument("--seed", default=None,
+                          help="seed which makes the batch reproducible")
+    generate.add_argument("--start", type=int, default=0,
+                          help="number of the first sheet of a seeded batch (default 0)")
+    generate.add_argument("--pdf-mode", default="full",
+                          choices=("full", "incremental", "compressed"),
+                          help="full pdfs, the template followed by only the filled fields or "
+                               "compressed pdfs (default full)")
+    generate.add_argument("--pack", default=None,
+                          help="name of a single pdf, in the out folder, holding every sheet, "
+                               "- for standard output (default one file per sheet, ignores "
+                               "--pdf-mode and the pdf, fdf and xfdf formats)")
+    generate.add_argument("--format", default="pdf",
+                          choices=("pdf", "fdf", "xfdf", archive.ARCHIVE_FORMAT) + export.FORMATS,
+                          help="pdfs, only the values of their fields as fdf or xfdf files "
+                               "which open with the character sheet template, or the "
+                               "characters as a single jsonl, csv or binary archive file "
+                               "(default pdf)")
+    generate.add_argument("--numpy-dice", action="store_true",
+                          help="roll ability scores and hit points with NumPy, a seed then "
+                               "gives other sheets than without it")
+    return parser
+
+
+# Function used to make character sheets given the parsed arguments.
+# Returns the exit code of the program.
+def generate(args) -> int:
+    start_time = time.perf_counter()
+    # Begin loading the rule files while the arguments are checked.
+    warm_up = warmup_utils.start_warm_up()
+
+    race = int(args.race) if args.race is not None and args.race.isdigit() else args.race
+    alignment = Alignment[args.alignment] if args.alignment is not None else None
+    try:
+        options = ran.GenerationOptions(args.level, race, args.dnd_class, alignment, args.seed,
+                                        args.numpy_dice)
+    except ValueError as ex:
+        print("Error: " + str(ex), file=sys.stderr)
+        return 2
+    to_stdout = args.pack == "-"
+    if to_stdout and args.format == archive.ARCHIVE_FORMAT:
+        print("Error: an archive can not be written to standard output", file=sys.stderr)
+        return 2
+    if not to_stdout:
+        makedirs(args.out, exist_ok=True)
+
+    warm_up.wait()
+    errors = warm_up.get_errors()
+    for file_path, ex in errors:
+        print("Could not load " + str(file_path) + ": " + str(ex), file=sys.stderr)
+    if len(errors) > 0:
+        return 2
+    for error in warm_up.get_rule_errors():
+        print("Rule error: " + error, file=sys.stderr)
+    warm_up_time = time.perf_counter() - start_time
+
+    sheets = ran.iter_character_sheets(args.count, options, args.start)
+    if args.format in export.FORMATS or args.format == archive.ARCHIVE_FORMAT:
+        failed, generate_time, pdf_time, size = _create_export(args, sheets)
+    elif args.pack is not None:
+        failed, generate_time, pdf_time, size = _create_pack(args, sheets)
+    else:
+        failed, generate_time, pdf_time, size = _create_files(args, sheets)
+
+    total_time = time.perf_counter() - start_time
+    made = args.count - failed
+    # The standard output may hold the pack itself.
+    out = sys.stderr if to_stdout else sys.stdout
+    print("Created " + str(made) + " of " + str(args.count) + " character sheets in " +
+          ("standard output" if to_stdout else args.out), file=out)
+    print("  warm up:    " + _format_time(warm_up_time), file=out)
+    print("  generation: " + _format_time(generate_time, args.count), file=out)
+    print("  output:     " + _format_time(pdf_time, args.count), file=out)
+    print("  total:      " + _format_time(total_time, args.count), file=out)
+    if size is not None and made > 0:
+        print("  size:       " + str(size) + " bytes (" + str(size // made) + " bytes per sheet)",
+              file=out)
+    return 0 if failed == 0 else 1
+
+
+# Function used to write each sheet into its own pdf, or fdf or xfdf file.
+# Returns the number of sheets that failed, the time spent making them and writing the pdfs
+# and the size of the pdfs.
+def _create_files(args, sheets) -> ():
+    generate_time = 0.0
+    pdf_time = 0.0
+    failed = 0
+    size = 0
+    for i in range(args.start, args.start + args.count):
+        sheet_start = time.perf_counter()
+        sheet = _next_sheet(sheets, i)
+        pdf_start = time.perf_counter()
+        generate_time += pdf_start - sheet_start
+        if sheet is None:
+            failed += 1
+            continue
+        file_path = join(args.out, _get_sheet_name(i) + "." + args.format)
+        if args.format == "pdf":
+            created = sheet.create_pdf(file_path, args.pdf_mode)
+        else:
+            created = sheet.create_data_file(file_path, args.format)
+        if not created:
+            failed += 1
+            print("Could not create " + file_path, file=sys.stderr)
+        else:
+            size += getsize(file_path)
+        pdf_time += time.perf_counter() - pdf_start
+    return failed, generate_time, pdf_time, size
+
+
+# Function used to write every sheet into a single pdf as they are made.
+# Returns the number of sheets that failed, the time spent making them and writing the pdf
+# and the size of the pdf (None if written to standard output).
+def _create_pack(args, sheets) -> ():
+    times = [0.0]
+    # Names of the sheets added to the pack, sheets that could not be made are left out.
+    names = []
+
+    def pages():
+        for i in range(args.start, args.start + args.count):
+            sheet_start = time.perf_counter()
+            sheet = _next_sheet(sheets, i)
+            times[0] += time.perf_counter() - sheet_start
+            if sheet is not None:
+                names.append(_get_sheet_name(i))
+                yield sheet.pdf_field_values()
+
+    start_time = time.perf_counter()
+    if args.pack == "-":
+        file_path = "standard output"
+        out_file = sys.stdout.buffer
+    else:
+        file_path = join(args.out, args.pack)
+        out_file = file_path
+    size = None
+    if not io.create_party_pack(pages(), out_file, names):
+        failed = args.count
+        print("Could not create " + file_path, file=sys.stderr)
+    else:
+        failed = args.count - len(names)
+        if out_file is file_path:
+            size = getsize(file_path)
+    return failed, times[0], time.perf_counter() - start_time - times[0], size
+
+
+# Function used to write every sheet into a single jsonl, csv or archive file as they are made.
+# Returns the number of sheets that failed, the time spent making them and writing the file
+# and the size added to the file (None if written to standard output).
+def _create_export(args, sheets) -> ():
+    times = [0.0]
+
+    def timed_sheets():
+        for i in range(args.start, args.start + args.count):
+            sheet_start = time.perf_counter()
+            sheet = _next_sheet(sheets, i)
+            times[0] += time.perf_counter() - sheet_start
+            if sheet is not None:
+                yield sheet
+
+    start_time = time.perf_counter()
+    if args.pack == "-":
+        file_path = "standard output"
+        out_file = sys.stdout
+    elif args.format == archive.ARCHIVE_FORMAT:
+        file_path = join(args.out, args.pack or "characters." + archive.ARCHIVE_EXTENSION)
+        out_file = file_path
+    else:
+        file_path = join(args.out, args.pack or "characters." + args.format)
+        out_file = file_path
+    size = None
+    # An archive which already exists is added to, other files are replaced.
+    previous_size = 0
+    if args.format == archive.ARCHIVE_FORMAT and exists(file_path):
+        previous_size = getsize(file_path)
+    try:
+        if args.format == archive.ARCHIVE_FORMAT:
+            failed = args.count - archive.archive_sheets(timed_sheets(), file_path)
+        else:
+            failed = args.count - export.export_sheets(timed_sheets(), out_file, args.format)
+    except (OSError, ValueError) as ex:
+        failed = args.count
+        print("Could not create " + file_path + ": " + str(ex), file=sys.stderr)
+    else:
+        if out_file is file_path:
+            size = getsize(file_path) - previous_size
+    return failed, times[0], time.perf_counter() - start_time - times[0], size
+
+
+# Function which returns the next sheet of the batch, None (after saying so) if sheet i of the
+# batch could not be made.
+def _next_sheet(sheets, i: int):
+    sheet = next(sheets)
+    if sheet is None:
+        print("Could not make " + _get_sheet_name(i), file=sys.stderr)
+    return sheet
+
+
+def _get_sheet_name(i: int) -> str:
+    return "character_" + str(i).zfill(6)
+
+
+# Function used by the parser to read a whole number greater than 0.
+def _positive_int(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("not a whole number: " + text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1: " + text)
+    return value
+
+
+def _format_time(seconds: float, count=0) -> str:
+    text = "{:.3f}s".format(seconds)
+    if count > 0:
+        text += " ({:.2f}ms per sheet)".format(seconds / count * 1000)
+    return text
+
+
+def main(args=None) -> int:
+    args = get_parser().parse_args(args)
+    match args.command:
+        case "generate":
+            return generate(args)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -177,6 +177,12 @@ class CharacterSheet:
             return str(self.get_level()) + "d" + str(self._dndClass.get_hit_die())
         return ""
 
+    # Function which returns the number of sides of the character's hit die, -1 without a class.
+    def get_hit_die_size(self) -> int:
+        if self._dndClass is not None:
+            return self._dndClass.get_hit_die()
+        return -1
+
     def get_level(self) -> int:
         return self._level
 
@@ -488,14 +494,33 @@ class CharacterSheet:
 
         return tuple(button_data)
 
+    # Function which returns the value of every field of the pdf, as a tuple with a mapping
+    # of field name to value for each page.
+    def pdf_field_values(self) -> ():
+        return io.get_sheet_field_values(self.string_field_pdf_data(), self.button_pdf_data(),
+                                         self.get_class_spells(), self.get_class_spell_slots(),
+                                         self.get_prepared_or_known())
+
     # Function used to create a pdf file representing the contents of itself.
     # Will only create a pdf if all main attributes are present: Class, Race and Background.
+    # The file path can also be a binary stream to write to, and the pdf mode is how the file
+    # is written (see io_utils.create_character_sheet).
     # A boolean is returned to represent if this process was a success.
-    def create_pdf(self, file_path: str) -> bool:
+    def create_pdf(self, file_path, pdf_mode="full") -> bool:
         if self._dndClass is not None and self._background is not None and self._race is not None:
             return io.create_character_sheet(self.string_field_pdf_data(), self.button_pdf_data(),
                                              self.get_class_spells(), self.get_class_spell_slots(),
-                                             self.get_prepared_or_known(), file_path)
+                                             self.get_prepared_or_known(), file_path, pdf_mode)
+        return False
+
+    # Function used to create an FDF or XFDF file holding only the values of the pdf's fields,
+    # which opens with the character sheet template (see io_utils.create_character_data).
+    # A boolean is returned to represent if this process was a success.
+    def create_data_file(self, file_path, fdf_format="fdf") -> bool:
+        if self._dndClass is not None and self._background is not None and self._race is not None:
+            return io.create_character_data(self.string_field_pdf_data(), self.button_pdf_data(),
+                                            self.get_class_spells(), self.get_class_spell_slots(),
+                                            self.get_prepared_or_known(), file_path, fdf_format)
         return False
 
 # Function used to combine lists that elements of the character sheet share.
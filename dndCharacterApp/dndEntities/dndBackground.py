@@ -4,6 +4,7 @@
 #           languages, equipment, money, features, personality trait, ideal, bonds, and
 #           flaw.
 # ----------------------------------------------------------------------------------------------- #
+import threading
 from dndCharacterApp.dndEntities.dnd_enums import Alignment as Alignment
 import dndCharacterApp.utils.io_utils as io
 
@@ -16,16 +17,20 @@ class Background:
     def __init__(self, alignment: Alignment, background_index: int):
         self._alignment = alignment
         self._index = background_index
-        self._ideals_list = \
-            io.get_col(background_index, io.BKGR_IDEALS_FILE_PATH, False) \
-                if background_index != -1 else None
+        self._ideals_list = get_ideals_list(background_index) \
+            if background_index != -1 else None
         self._initialize_attributes()
         self._set_none_attributes()
 
     # Function sets the attributes of the background
     def _initialize_attributes(self):
         if self._index != -1:
-            line = io.get_col(self._index, io.BKGR_ATRBT_FILE_PATH, False)
+            # Use the indexed rules database if it is in use.
+            database = io.get_rules_database()
+            if database is not None:
+                line = database.get_background(self._index)
+            else:
+                line = io.get_col(self._index, io.BKGR_ATRBT_FILE_PATH, False)
             self.name = line[0]
             self._skill_prof = line[1].split("=")
             self.tool_prof = line[2].split("=")
@@ -46,17 +51,17 @@ class Background:
     # Index is used to choose from the background's ideal list.
     # A boolean value is returned whether or not this operation was successful
     def set_ideal(self, ideal_index: int) -> bool:
+        if self.can_have_ideal(ideal_index):
+            self._ideal = self._ideals_list[ideal_index].split("=")[1]
+            return True
+        return False
+
+    # Function which returns whether the ideal at the index of the background's ideal list
+    # can be taken with the background's alignment.
+    def can_have_ideal(self, ideal_index: int) -> bool:
         # If the ideal list was properly set
         if self._ideals_list is not None:
-            # Split between alignments which can get this ideal and its description
-            selected_ideal = self._ideals_list[ideal_index].split("=")
-            # If the alignment is any or the GE/LC matches the alignment set the ideal
-            # as such.
-            if selected_ideal[0].lower() == "any" or \
-                    self._alignment.ge_axis_value().lower() == selected_ideal[0].lower() or \
-                    self._alignment.lc_axis_value().lower() == selected_ideal[0].lower():
-                self._ideal = selected_ideal[1]
-                return True
+            return _ideal_matches_alignment(self._ideals_list[ideal_index], self._alignment)
         return False
 
     # Getters for attributes of the background class that can not be changed
@@ -75,6 +80,74 @@ class Background:
     def get_index(self) -> int:
         return self._index
 
+# Ideals of every background keyed by the background's index, along with the ideals each
+# (background index, alignment) can take. Built the first time an ideal is needed.
+_IDEALS = None
+_ELIGIBLE_IDEALS = None
+_IDEALS_LOCK = threading.Lock()
+
+
+# Function which returns the ideal list of a background given its index, the first
+# entry is the background's name. None is returned if there is no such background.
+def get_ideals_list(background_index: int) -> ():
+    return _get_ideal_index()[0].get(background_index)
+
+
+# Function which returns the indexes (in the background's ideal list) of every ideal
+# that a background can take with the given alignment.
+def get_eligible_ideals(background_index: int, alignment: Alignment) -> ():
+    return _get_ideal_index()[1].get((background_index, alignment), ())
+
+
+# Function which returns every (background index, alignment) that has no ideal
+# that can be taken, these backgrounds can not be made with that alignment.
+def find_missing_ideals() -> []:
+    eligible_ideals = _get_ideal_index()[1]
+    return [key for key in eligible_ideals.keys() if len(eligible_ideals[key]) == 0]
+
+
+# Function used to drop the ideal index so it is built again from the ideals file.
+def clear_ideal_index():
+    global _IDEALS, _ELIGIBLE_IDEALS
+    with _IDEALS_LOCK:
+        _IDEALS = None
+        _ELIGIBLE_IDEALS = None
+
+
+def _get_ideal_index() -> ():
+    global _IDEALS, _ELIGIBLE_IDEALS
+
+    with _IDEALS_LOCK:
+        if _IDEALS is None:
+            ideals = {}
+            eligible_ideals = {}
+            # Every column of the first row is a background.
+            background_list = io.get_row(1, io.BKGR_IDEALS_FILE_PATH)
+            count = len(background_list) if background_list is not None else 0
+            for index in range(1, count + 1):
+                ideals_list = io.get_col(index, io.BKGR_IDEALS_FILE_PATH, False)
+                if ideals_list is None or len(ideals_list) == 0:
+                    continue
+                ideals[index] = tuple(ideals_list)
+                for alignment in Alignment:
+                    eligible_ideals[(index, alignment)] = tuple(
+                        i for i in range(1, len(ideals_list))
+                        if _ideal_matches_alignment(ideals_list[i], alignment))
+            _IDEALS = ideals
+            _ELIGIBLE_IDEALS = eligible_ideals
+        return _IDEALS, _ELIGIBLE_IDEALS
+
+
+# Function which returns whether an ideal ("Alignment=Ideal") can be taken with an alignment,
+# that is if the ideal is for any alignment or either axis of the alignment matches.
+def _ideal_matches_alignment(ideal: str, alignment: Alignment) -> bool:
+    # Split between alignments which can get this ideal and its description
+    ideal_alignment = ideal.split("=")[0].lower()
+    return ideal_alignment == "any" or \
+        alignment.ge_axis_value().lower() == ideal_alignment or \
+        alignment.lc_axis_value().lower() == ideal_alignment
+
+
 # Private function used to set money of a background
 # List passed in should have the second value be the type of
 # money (gold, copper, etc.) and first value should be numeric amount.
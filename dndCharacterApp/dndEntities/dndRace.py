@@ -5,7 +5,39 @@
 #           ability score increases, speed, max age, and list of spells (if they get any)
 # ----------------------------------------------------------------------------------------------- #
 
+import threading
+from typing import NamedTuple
 import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.rules_parser as rules
+
+# Highest level a character can reach, racial spells are precomputed up to it.
+MAX_LEVEL = 20
+
+
+# Immutable record of the attributes of a race that are shared by every character of
+# that race. Spells by level holds the racial spells known at each level (index 0 to 20),
+# both it and racial spells are None if the race does not get racial spells.
+class RaceTemplate(NamedTuple):
+    index: int
+    name: str
+    ability_score_incr: tuple
+    casting_ability: str
+    racial_spells: rules.LevelGated
+    spells_by_level: tuple
+    features: tuple
+    max_age: int
+    size: str
+    speed: int
+    languages: tuple
+    racial_name_file_path: str
+
+    # Function which returns the racial spells known at a given level.
+    def get_spells(self, level: int) -> ():
+        if self.spells_by_level is None:
+            return None
+        if 0 <= level <= MAX_LEVEL:
+            return self.spells_by_level[level]
+        return self.racial_spells.up_to(level)
 
 
 class Race:
@@ -14,62 +46,29 @@ class Race:
     # Index for race corresponds with entries in race file
     # Level is need to add certain attributes
     def __init__(self, index_of_race: int, level: int):
-        attributes = io.get_col(index_of_race, io.RACE_FILE_PATH, False)
-        if attributes is not None:
-            self._set_race_attributes(attributes, level)
+        template = get_race_template(index_of_race)
+        if template is not None:
+            self._set_race_attributes(template, level)
         self._level = level
 
-    # Function sets the attributes of the race
-    def _set_race_attributes(self, attributes: (), level: int):
-        self._name = attributes[0]
-
-        # Set ability scores
-        line = attributes[1].split("=")
-        self._ability_score_incr = []
-        for score in line:
-            self._ability_score_incr.append(int(score))
-        self._ability_score_incr = tuple(self._ability_score_incr)
-
-        # If race gets racial spells set those, else set to None
-        if attributes[2].lower() != "none":
-            self._set_racial_spells(attributes[2], level)
-        else:
-            self._casting_ability = None
-            self._spells = None
-
-        line = attributes[3].split("=")
-        self._features = tuple(line.copy())
-
-        self._max_age = attributes[4]
-        self._size = attributes[5]
-        self._speed = attributes[6]
-
-        line = attributes[7].split("=")
-        self._languages = tuple(line.copy())
-
-        self._racial_name_file_path = attributes[8]
+    # Function sets the attributes of the race from its shared template
+    def _set_race_attributes(self, template: RaceTemplate, level: int):
+        self._name = template.name
+        self._ability_score_incr = template.ability_score_incr
+        # If race gets racial spells set those, else they are None
+        self._casting_ability = template.casting_ability
+        self._spells = template.get_spells(level)
+        self._features = template.features
+        self._max_age = template.max_age
+        self._size = template.size
+        self._speed = template.speed
+        self._languages = template.languages
+        self._racial_name_file_path = template.racial_name_file_path
 
         self._armor_prof = None
         self._weapon_prof = None
         self._tool_prof = None
 
-    def _set_racial_spells(self, spellList: str, level: int):
-        line = spellList.split("=")
-        # First entry is casting ability
-        self._casting_ability = line[0]
-
-        # Fill spell list
-        self._spells = []
-        for i in range(1, len(line)):
-            inner_line = line[i].split("/")
-            # If the character's level is great enough, then add the spell to the list
-            if level >= int(inner_line[0]):
-                self._spells.append(inner_line[1])
-            else:
-                break
-        # Convert to tuple since spells won't need further altering
-        self._spells = tuple(self._spells)
-
     # List of setters for attributes of the race class
     def set_speed(self, speed: int):
         self._speed = speed
@@ -116,3 +115,88 @@ class Race:
 
     def get_tool_prof(self) -> ():
         return self._tool_prof
+
+
+# Templates of every race in the race file, keyed by their index (starting at 1).
+# Built the first time a race is needed.
+_RACE_TEMPLATES = None
+_RACE_COUNT = 0
+_RACE_TEMPLATES_LOCK = threading.Lock()
+
+
+# Function which returns the template of a race given its index in the race file.
+# None is returned if there is no race at that index.
+def get_race_template(index_of_race: int) -> RaceTemplate:
+    return _get_race_templates().get(index_of_race)
+
+
+# Function which returns the number of races in the race file.
+def get_race_count() -> int:
+    _get_race_templates()
+    return _RACE_COUNT
+
+
+# Function which returns the names of every race, in the order of the race file.
+def get_race_names() -> ():
+    templates = _get_race_templates()
+    return tuple(templates[index].name for index in sorted(templates.keys()))
+
+
+# Function which returns the index of a race given its name (case insensitive),
+# -1 is returned if there is no race with that name.
+def find_race_index(name: str) -> int:
+    for template in _get_race_templates().values():
+        if template.name.lower() == name.lower():
+            return template.index
+    return -1
+
+
+# Function used to drop the race templates so they are built again from the race file.
+def clear_race_templates():
+    global _RACE_TEMPLATES
+    with _RACE_TEMPLATES_LOCK:
+        _RACE_TEMPLATES = None
+
+
+def _get_race_templates() -> {}:
+    global _RACE_TEMPLATES, _RACE_COUNT
+
+    with _RACE_TEMPLATES_LOCK:
+        if _RACE_TEMPLATES is None:
+            templates = {}
+            # Every column of the first row is a race.
+            race_list = io.get_row(1, io.RACE_FILE_PATH)
+            count = len(race_list) if race_list is not None else 0
+            for index in range(1, count + 1):
+                attributes = io.get_col(index, io.RACE_FILE_PATH, False)
+                if attributes is not None and len(attributes) > 0:
+                    templates[index] = _build_race_template(index, attributes)
+            _RACE_TEMPLATES = templates
+            _RACE_COUNT = count
+        return _RACE_TEMPLATES
+
+
+# Function used to build the template of a race given its column of the race file.
+def _build_race_template(index: int, attributes: ()) -> RaceTemplate:
+    # If race gets racial spells precompute them for every level, else set to None
+    if attributes[2].lower() != "none":
+        casting_ability, spells = rules.parse_racial_spells(attributes[2])
+        spells_by_level = tuple(spells.up_to(level) for level in range(MAX_LEVEL + 1))
+    else:
+        casting_ability = None
+        spells = None
+        spells_by_level = None
+
+    return RaceTemplate(index=index,
+                        name=attributes[0],
+                        ability_score_incr=tuple(int(score) for score in
+                                                 rules.parse_list(attributes[1])),
+                        casting_ability=casting_ability,
+                        racial_spells=spells,
+                        spells_by_level=spells_by_level,
+                        features=rules.parse_list(attributes[3]),
+                        max_age=attributes[4],
+                        size=attributes[5],
+                        speed=attributes[6],
+                        languages=rules.parse_list(attributes[7]),
+                        racial_name_file_path=attributes[8])
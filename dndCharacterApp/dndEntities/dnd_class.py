@@ -5,10 +5,71 @@
 #           archetype name, saving throws and proficiencies for armors, weapons and tools
 # ----------------------------------------------------------------------------------------------- #
 
+import threading
+from typing import NamedTuple
 from dndCharacterApp.dndEntities.dndRace import Race as Race
+from dndCharacterApp.dndEntities.dndRace import MAX_LEVEL as MAX_LEVEL
 from dndCharacterApp.dndEntities.dndBackground import Background as Background
 import dndCharacterApp.utils.io_utils as io
 import dndCharacterApp.utils.math_utils as math
+import dndCharacterApp.utils.rules_parser as rules
+
+
+# Immutable record of what a class or archetype grants at a single level.
+# Spells known and spell slots are None if the class or archetype can not cast spells,
+# spells known is -1 for prepared casters. Bonus spells holds the spells granted for each
+# spell level, it is None if none are granted.
+class LevelProgression(NamedTuple):
+    prof_bonus: int
+    features: tuple
+    attacks: tuple
+    spells_known: int
+    spell_slots: tuple
+    bonus_spells: tuple
+
+
+# Immutable record of a class's standard attributes along with its progression for
+# levels 1 to 20. Spell casting is None for non spell casters.
+class ClassProgression(NamedTuple):
+    name: str
+    hit_die: int
+    armor_prof: tuple
+    weapon_prof: tuple
+    tool_prof: tuple
+    saving_throws: tuple
+    spell_casting: tuple
+    choice_attributes: tuple
+    source: tuple
+    levels: tuple
+
+    # Function which returns what the class grants at a given level.
+    def at(self, level: int) -> LevelProgression:
+        if 1 <= level <= MAX_LEVEL:
+            return self.levels[level - 1]
+        return _build_class_level(self.source, self.spell_casting, level)
+
+
+# Immutable record of the bonuses granted by an archetype along with its progression for
+# levels 1 to 20. Bonuses the archetype does not grant are None.
+class ArchetypeProgression(NamedTuple):
+    file_path: str
+    index: int
+    armor_prof: tuple
+    weapon_prof: tuple
+    tool_prof: tuple
+    skill_bonuses: tuple
+    languages: tuple
+    spell_casting: tuple
+    bonus_spell_entries: tuple
+    source: tuple
+    levels: tuple
+
+    # Function which returns what the archetype grants at a given level.
+    def at(self, level: int) -> LevelProgression:
+        if 1 <= level <= MAX_LEVEL:
+            return self.levels[level - 1]
+        return _build_archetype_level(self.source, self.spell_casting,
+                                      self.bonus_spell_entries, level)
 
 
 class DndClass:
@@ -32,52 +93,38 @@ class DndClass:
         self._initialize_standard_attributes()
         self._set_none_attributes()
         # Get list of the class's attributes that require choices for later use
-        self._choice_attributes_list = io.get_col(self._name, io.CLASS_CHOICE_FILE_PATH, False)
+        self._choice_attributes_list = get_class_progression(self._name).choice_attributes
 
     # Function used to set attributes of the class which are non-optional
     def _initialize_standard_attributes(self):
-        line = io.get_col(self._name, io.CLASS_STAND_FILE_PATH, True)
+        progression = get_class_progression(self._name)
+        level = progression.at(self._level)
         # Set standard attributes associated with the class
-        self._prof_bonus = _get_prof_bonus(line[1].split("="), self._level)
-        self._hit_die = line[2]
-        self._armor_prof = line[3].split("=")
-        self._weapon_prof = line[4].split("=")
-        self._tool_prof = line[5].split("=")
-        self._saving_throws = line[6].split("=")
+        self._prof_bonus = level.prof_bonus
+        self._hit_die = progression.hit_die
+        self._armor_prof = list(progression.armor_prof)
+        self._weapon_prof = list(progression.weapon_prof)
+        self._tool_prof = list(progression.tool_prof)
+        self._saving_throws = list(progression.saving_throws)
 
         # Check to see if the class is a caster, depending on which set the
         # caster attributes thusly.
-        sub_line = line[7].split("=")
-        if sub_line[0].lower() == "true":
-            self._initialize_spell_casting_traits(sub_line)
+        if progression.spell_casting is not None:
+            self._initialize_spell_casting_traits(progression.spell_casting, level)
         else:
             self._initialize_non_spell_casting_attributes()
 
         # Finally set all features and attacks the character can learn at their level.
-        self._features = _initialize_features_or_attacks(
-            line[8].split("="), self._level)
-        self._attacks_and_spell_casting = _initialize_features_or_attacks(
-            line[9].split("="), self._level)
+        self._features = list(level.features)
+        self._attacks_and_spell_casting = list(level.attacks)
 
-    # Function used to set spell caster attributes
-    def _initialize_spell_casting_traits(self, line: []):
+    # Function used to set spell caster attributes as well as an empty spell list
+    def _initialize_spell_casting_traits(self, line: (), level: LevelProgression):
         self._casting_ability = line[1]
         self._spell_list_file_path = line[3]
         self._prepared_or_known = line[4].lower()[0]
-        self._set_spells_and_slots(line[2])
-
-    # Function used to set spell slots as well as an empty spell list
-    def _set_spells_and_slots(self, file_path: str):
-        # Get caster information
-        line = io.get_col(self._level, file_path, False)
-        self._spell_slots = []
-        # If the caster is a known caster set the number of spells, else set it to
-        # -1.
-        self._spells_known = line[1] if self._prepared_or_known == "k" else -1
-
-        # Set the number of spells for each spell level the caster may use per day.
-        for i in range(2, len(line)):
-            self._spell_slots.append(line[i])
+        self._spells_known = level.spells_known
+        self._spell_slots = list(level.spell_slots)
 
         # Make a 2-D list with the maximum spell level dependent on the class's spell
         # slots for that level.
@@ -112,51 +159,45 @@ class DndClass:
     # selected archetype. If the archetype is granted spells and requires
     # further selection then the sender is notified.
     def set_archetype_attributes(self, file_path: str, index: int) -> bool:
-        line = io.get_col(index, file_path, False)
+        archetype = get_archetype_progression(file_path, index)
+        level = archetype.at(self._level)
         need_to_set_spells = False
 
         # Add extra bonuses and proficiencies granted by the archetype.
-        if line[1].lower() != "none":
+        if archetype.armor_prof is not None:
             self._armor_prof = _add_more_items_to_list(
-                list(self._armor_prof), line[1].split("="))
-        if line[2].lower() != "none":
+                list(self._armor_prof), archetype.armor_prof)
+        if archetype.weapon_prof is not None:
             self._weapon_prof = _add_more_items_to_list(
-                list(self._weapon_prof), line[2].split("="))
-        if line[3].lower() != "none":
+                list(self._weapon_prof), archetype.weapon_prof)
+        if archetype.tool_prof is not None:
             self._tool_prof = _add_more_items_to_list(
-                list(self._tool_prof), line[3].split("="))
-        if line[4].lower() != "none":
+                list(self._tool_prof), archetype.tool_prof)
+        if archetype.skill_bonuses is not None:
             if self._skill_bonuses is None:
                 self._skill_bonuses = []
             self._skill_bonuses = _add_more_items_to_list(
-                list(self._skill_bonuses), line[4].split("="))
-        if line[5].lower() != "none":
+                list(self._skill_bonuses), archetype.skill_bonuses)
+        if archetype.languages is not None:
             if self.languages is None:
                 self.languages = []
             self.languages = _add_more_items_to_list(
-                list(self.languages), line[5].split("="))
+                list(self.languages), archetype.languages)
 
         # Check to see if archetype grants spell casting and set traits accordingly.
-        sub_line = line[7].split("=")
-        if sub_line[0].lower() == "true":
-            self._initialize_spell_casting_traits(sub_line)
+        if archetype.spell_casting is not None:
+            self._initialize_spell_casting_traits(archetype.spell_casting, level)
 
         # Check to see if archetype grants bonus spells and add them accordingly
         # If further spell selection is needed notify the sender.
-        sub_line = line[6].split("=")
-        if sub_line[0].lower() == "true":
-            need_to_set_spells = self._set_bonus_spells(sub_line[1])
+        if level.bonus_spells is not None:
+            need_to_set_spells = self._set_bonus_spells(level.bonus_spells)
 
-        # Add new features gained through the archetype to the final list.
-        new_features = _initialize_features_or_attacks(line[8].split("="), self._level)
-        self._features = _add_more_items_to_list(self._features, tuple(new_features))
-
-        # If new attacks/spell casting attacks are granted via the archetype add them to the
-        # total list
-        if line[9].lower() != "none":
-            new_att_or_spell = _initialize_features_or_attacks(line[9].split("="), self._level)
-            self._attacks_and_spell_casting = _add_more_items_to_list(self._attacks_and_spell_casting,
-                                                                      tuple(new_att_or_spell))
+        # Add new features and attacks/spell casting attacks gained through the
+        # archetype to the final lists.
+        self._features = _add_more_items_to_list(self._features, level.features)
+        self._attacks_and_spell_casting = _add_more_items_to_list(self._attacks_and_spell_casting,
+                                                                  level.attacks)
 
         # Finally, cycle through all features and make changes to the class's bonuses
         # or other attributes if needed.
@@ -183,48 +224,19 @@ class DndClass:
         self._skill_bonuses = tuple(skill_bonuses)
         return True
 
-    # Function used to set bonus spells granted to the class depending
-    # on its level, if the class requires further selection in terms of the spells
+    # Function used to add the bonus spells granted to the class at its level,
+    # if the class requires further selection in terms of the spells
     # granted to it, the sender is thusly notified.
-    def _set_bonus_spells(self, file_path: str) -> bool:
-        spell_list = []
+    def _set_bonus_spells(self, bonus_spells: ()) -> bool:
         need_to_set_spells = False
-        # Index for columns in bonus spells file
-        index = 1
-
-        # Get the bonus spells for the class/archetype
-        while True:
-            line = io.get_col(index, file_path, False)
-            index += 1
-            # If an empty list or none is returned the list is complete
-            if line is not None:
-                if len(line) > 0:
-                    spell_list.append(line)
-                else:
-                    break
-            else:
-                break
-
-        # Go through all the spells gained at specific levels and add them to
-        # the class if they are a high enough level to obtain them.
-        for entries in spell_list:
-            if self._level < int(entries[0]):
-                break
-            # Index for spell level
-            index = 0
-            # Get the list of spells for that spell level at for the
-            # given class level
-            for i in range(1, len(entries)):
-                line = entries[i].split("=")
-                for sub_entries in line:
-                    # Add the spell to the spell list and if further selection needs
-                    # to be made notify the sender.
-                    if sub_entries != "-":
-                        self.spells[index].append(sub_entries)
-                        if sub_entries.startswith("*"):
-                            need_to_set_spells = True
-                # Increase spell level once all entries of the previous are finished.
-                index += 1
+
+        # Add the spells of each spell level and if further selection needs
+        # to be made notify the sender.
+        for index in range(len(bonus_spells)):
+            for spell in bonus_spells[index]:
+                self.spells[index].append(spell)
+                if spell.startswith("*"):
+                    need_to_set_spells = True
 
         # Notify the sender if the spell list is incomplete.
         return need_to_set_spells
@@ -470,31 +482,187 @@ def finalize_attacks_and_spell_casting(attacks_and_spell_casting: [], level: int
     return attacks_and_spell_casting
 
 
+# Progressions of each class keyed by name, and of each archetype keyed by its
+# file and index. Each is built the first time it is needed.
+_CLASS_PROGRESSIONS = {}
+_ARCHETYPE_PROGRESSIONS = {}
+_PROGRESSIONS_LOCK = threading.Lock()
+
+
+# Function which returns the progression of a class given its name.
+def get_class_progression(name: str) -> ClassProgression:
+    with _PROGRESSIONS_LOCK:
+        progression = _CLASS_PROGRESSIONS.get(name)
+        if progression is None:
+            progression = _build_class_progression(name)
+            _CLASS_PROGRESSIONS[name] = progression
+        return progression
+
+
+# Function which returns the progression of an archetype given its file and index.
+def get_archetype_progression(file_path: str, index: int) -> ArchetypeProgression:
+    with _PROGRESSIONS_LOCK:
+        progression = _ARCHETYPE_PROGRESSIONS.get((file_path, index))
+        if progression is None:
+            progression = _build_archetype_progression(file_path, index)
+            _ARCHETYPE_PROGRESSIONS[(file_path, index)] = progression
+        return progression
+
+
+# Function used to drop every progression so they are built again from the class files.
+def clear_progressions():
+    with _PROGRESSIONS_LOCK:
+        _CLASS_PROGRESSIONS.clear()
+        _ARCHETYPE_PROGRESSIONS.clear()
+
+
+def _build_class_progression(name: str) -> ClassProgression:
+    line = io.get_col(name, io.CLASS_STAND_FILE_PATH, True)
+    spell_casting = _get_spell_casting(line[7])
+    return ClassProgression(name=name,
+                            hit_die=line[2],
+                            armor_prof=rules.parse_list(line[3]),
+                            weapon_prof=rules.parse_list(line[4]),
+                            tool_prof=rules.parse_list(line[5]),
+                            saving_throws=rules.parse_list(line[6]),
+                            spell_casting=spell_casting,
+                            choice_attributes=io.get_col(name, io.CLASS_CHOICE_FILE_PATH, False),
+                            source=line,
+                            levels=tuple(_build_class_level(line, spell_casting, level)
+                                         for level in range(1, MAX_LEVEL + 1)))
+
+
+def _build_class_level(line: (), spell_casting: (), level: int) -> LevelProgression:
+    spells_known, spell_slots = _get_spells_and_slots(spell_casting, level)
+    return LevelProgression(prof_bonus=_get_prof_bonus(line[1], level),
+                            features=_initialize_features_or_attacks(line[8], level),
+                            attacks=_initialize_features_or_attacks(line[9], level),
+                            spells_known=spells_known,
+                            spell_slots=spell_slots,
+                            bonus_spells=None)
+
+
+def _build_archetype_progression(file_path: str, index: int) -> ArchetypeProgression:
+    line = io.get_col(index, file_path, False)
+    spell_casting = _get_spell_casting(line[7])
+    sub_line = rules.parse_list(line[6])
+    bonus_spell_entries = _get_bonus_spell_entries(sub_line[1]) \
+        if sub_line[0].lower() == "true" else None
+    return ArchetypeProgression(file_path=file_path,
+                                index=index,
+                                armor_prof=_get_optional_list(line[1]),
+                                weapon_prof=_get_optional_list(line[2]),
+                                tool_prof=_get_optional_list(line[3]),
+                                skill_bonuses=_get_optional_list(line[4]),
+                                languages=_get_optional_list(line[5]),
+                                spell_casting=spell_casting,
+                                bonus_spell_entries=bonus_spell_entries,
+                                source=line,
+                                levels=tuple(_build_archetype_level(line, spell_casting,
+                                                                    bonus_spell_entries, level)
+                                             for level in range(1, MAX_LEVEL + 1)))
+
+
+def _build_archetype_level(line: (), spell_casting: (), bonus_spell_entries: (),
+                           level: int) -> LevelProgression:
+    spells_known, spell_slots = _get_spells_and_slots(spell_casting, level)
+    # Only archetypes which grant attacks/spell casting attacks have them.
+    attacks = _initialize_features_or_attacks(line[9], level) \
+        if line[9].lower() != "none" else ()
+    bonus_spells = _get_bonus_spells(bonus_spell_entries, level) \
+        if bonus_spell_entries is not None else None
+    return LevelProgression(prof_bonus=None,
+                            features=_initialize_features_or_attacks(line[8], level),
+                            attacks=attacks,
+                            spells_known=spells_known,
+                            spell_slots=spell_slots,
+                            bonus_spells=bonus_spells)
+
+
+# Function which returns the spell casting traits of a class or archetype:
+# (True, casting ability, spell slot file, spell list file, prepared or known),
+# None is returned if it can not cast spells.
+def _get_spell_casting(cell: str) -> ():
+    sub_line = rules.parse_list(cell)
+    if sub_line[0].lower() == "true":
+        return sub_line
+    return None
+
+
+# Function which returns the spells known and the spell slots of a caster at a level,
+# both are None for non spell casters.
+def _get_spells_and_slots(spell_casting: (), level: int) -> ():
+    if spell_casting is None:
+        return None, None
+    # Get caster information
+    line = io.get_col(level, spell_casting[2], False)
+    # If the caster is a known caster set the number of spells, else set it to -1.
+    spells_known = line[1] if spell_casting[4].lower()[0] == "k" else -1
+    # Set the number of spells for each spell level the caster may use per day.
+    return spells_known, tuple(line[2:])
+
+
+# Function which returns every column of a bonus spells file, each column holds the
+# class level followed by the spells gained for each spell level.
+def _get_bonus_spell_entries(file_path: str) -> ():
+    spell_list = []
+    # Index for columns in bonus spells file
+    index = 1
+
+    while True:
+        line = io.get_col(index, file_path, False)
+        index += 1
+        # If an empty list or none is returned the list is complete
+        if line is None or len(line) == 0:
+            break
+        spell_list.append(line)
+    return tuple(spell_list)
+
+
+# Function which returns the bonus spells gained up to a level for each spell level.
+def _get_bonus_spells(spell_list: (), level: int) -> ():
+    bonus_spells = []
+
+    # Go through all the spells gained at specific levels and add them
+    # if the level is high enough to obtain them.
+    for entries in spell_list:
+        if level < int(entries[0]):
+            break
+        # Get the list of spells for each spell level at the given class level
+        for i in range(1, len(entries)):
+            if len(bonus_spells) < i:
+                bonus_spells.append([])
+            for spell in rules.parse_list(entries[i]):
+                if spell != "-":
+                    bonus_spells[i - 1].append(spell)
+
+    return tuple(tuple(spells) for spells in bonus_spells)
+
+
+# Function which returns the entries of a list cell or None if the cell is "none".
+def _get_optional_list(cell: str) -> ():
+    if cell.lower() != "none":
+        return rules.parse_list(cell)
+    return None
+
+
 # Function used to get a class's features or attacks depending on the
 # class itself and the level of the character.
-def _initialize_features_or_attacks(line: [], level: int) -> []:
-    temp_list = []
-    # Continue looping through the list until the character's level
-    # is not high enough to add that feature or attack to itself
-    for entries in line:
-        sub_line = entries.split("/")
-        if level < int(sub_line[0]):
-            break
-        else:
-            temp_list.append(sub_line[1])
-    return temp_list
+# The cell is a level gated list (level/feature=level/feature) which is only parsed once.
+def _initialize_features_or_attacks(cell: str, level: int) -> ():
+    # Stops at the first feature or attack the character's level is not
+    # high enough for.
+    return rules.parse_level_gated(cell).up_to(level)
 
 
 # Function used to get a class's proficiency bonus depending on the
 # class itself and the level of the character.
-def _get_prof_bonus(line: [], level: int) -> int:
-    # Search through list until the character's level is found.
-    for entries in line:
-        sub_line = entries.split("/")
-        if int(sub_line[0]) == level:
-            return int(sub_line[1])
+def _get_prof_bonus(cell: str, level: int) -> int:
+    prof_bonus = rules.parse_level_gated(cell).at(level)
     # Return -1 if an improper level is given.
-    return -1
+    if prof_bonus is None:
+        return -1
+    return int(prof_bonus)
 
 
 # Function used to add additional items to a dnd class's
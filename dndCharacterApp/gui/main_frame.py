@@ -2,13 +2,17 @@
 # GUI part of application.
 # ----------------------------------------------------------------------------------------------- #
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import *
 from tkinter import ttk
 from tkinter import filedialog
 from tkinter import messagebox
-import dndCharacterApp.utils.io_utils as io
+from os.path import join
 import dndCharacterApp.utils.rand_utils as ran
+import dndCharacterApp.utils.warmup_utils as warmup_utils
+import dndCharacterApp.dndEntities.dndRace as race_mod
 from dndCharacterApp.dndEntities.dndRace import Race as Race
 from dndCharacterApp.dndEntities.character_sheet import CharacterSheet as CharacterSheet
 
@@ -26,8 +30,8 @@ def set_window_geometry():
 # Function used to get all the current races available to the program to
 # use as values in the appropriate
 def set_race_values() -> ():
-    race_list = list(io.get_row(1, io.RACE_FILE_PATH))
-    if race_list is not None:
+    race_list = list(race_mod.get_race_names())
+    if len(race_list) > 0:
         race_list.insert(0, "Random")
         return tuple(race_list)
     else:
@@ -38,59 +42,172 @@ def set_race_values() -> ():
         change_text_area(text)
         return tuple(["Error"])
 
-# Function of the generate button. Creates a character sheet given the input
-# of the user.
+# Function of the generate button. Creates one or more character sheets given the input
+# of the user. The sheets are made on a worker thread so the window stays responsive,
+# its progress is read from a queue by _poll_generation.
 def generate_character_sheet():
 
     level = _LEVEL_SELECT.get()
     race = _RACE_SELECT.get()
-    # Get the path where the user would like to save their file at
-    file = filedialog.asksaveasfile(title="Save character sheet.",
-                                    filetypes=(("pdf files", "*.pdf"),))
-    # If the file could be created then continue
-    if file is not None:
-        # Get the file path as a string and add the pdf extension if the user hasn't.
-        file_path = file.name
-        if not file_path.endswith(".pdf"):
-            file_path += ".pdf"
-    else:
-        change_text_area("Please select a file name.")
+    # Do not create a sheet if the race file was not properly read/found.
+    if race.lower() == "error":
+        change_text_area("Cannot create a character sheet at this time."
+                     "\nPlease restart the program.")
         return
-    # Attempt to create the character sheet.
     try:
-        if race.lower() == "random" and level.lower() == "random":
-            sheet = ran.completely_random_character_sheet()
-        # Do not create a sheet if the race file was not properly read/found.
-        elif race.lower() == "error":
-            change_text_area("Cannot create a character sheet at this time."
-                         "\nPlease restart the program.")
-            return
-        elif race.lower() == "random":
-            level = int(level)
-            race = ran.random_race(level)
-            sheet = random_sheet_attributes(level, race)
-        elif level.lower() == "random":
-            level = ran.random_level()
-            index = _RACES.index(race)
-            race = Race(index,level)
-            sheet = random_sheet_attributes(level, race)
-        else:
-            level = int(level)
-            index = _RACES.index(race)
-            race = Race(index, level)
-            sheet = random_sheet_attributes(level, race)
+        count = int(_COUNT_SELECT.get())
+    except ValueError:
+        count = 0
+    if count < 1:
+        change_text_area("Please select how many characters to create.")
+        return
 
-        if sheet.create_pdf(file_path):
-            change_text_area("Sheet Created.")
+    if count == 1:
+        # Get the path where the user would like to save their file at
+        file = filedialog.asksaveasfile(title="Save character sheet.",
+                                        filetypes=(("pdf files", "*.pdf"),))
+        # If the file could be created then continue
+        if file is not None:
+            # Get the file path as a string and add the pdf extension if the user hasn't.
+            file_path = file.name
+            file.close()
+            if not file_path.endswith(".pdf"):
+                file_path += ".pdf"
+            file_paths = [file_path]
         else:
-            change_text_area("Sheet could not be created please try again.")
-    # Show an exception warning if any exceptions occur during this process.
-    except Exception as ex:
-        ex_name = type(ex).__name__
-        ex_info = ex.args
-        title_text = "Exception " + ex_name + " has occurred."
-        messagebox.showerror(title=title_text, message=ex_info)
-        change_text_area("Please try again.")
+            change_text_area("Please select a file name.")
+            return
+    else:
+        # Get the folder the sheets will be saved in, each sheet gets a numbered name.
+        folder = filedialog.askdirectory(title="Save character sheets in.")
+        if not folder:
+            change_text_area("Please select a folder.")
+            return
+        file_paths = [join(folder, "character_" + str(i + 1).zfill(len(str(count))) + ".pdf")
+                      for i in range(count)]
+
+    _CANCEL_EVENT.clear()
+    _FAILED_PATHS.clear()
+    _set_generating(True, count)
+    change_text_area("Creating " + str(count) + " sheet(s)...")
+    worker = threading.Thread(target=_generation_worker, args=(level, race, file_paths),
+                              daemon=True)
+    worker.start()
+    win.after(_POLL_DELAY, _poll_generation)
+
+# Function of the cancel button, the worker stops after the sheet it is working on.
+def cancel_generation():
+    _CANCEL_EVENT.set()
+    change_text_area("Cancelling...")
+
+# Function run on the worker thread which makes and saves every sheet.
+# It never touches the widgets, instead it sends its progress through the queue:
+# ("progress", sheets done, sheets created), ("failed", file path), ("error", exception) and
+# finally ("done", sheets created) or ("cancelled", sheets created). Sheets that failed are
+# done as well.
+def _generation_worker(level: str, race: str, file_paths: []):
+    created = 0
+    done = 0
+    for file_path in file_paths:
+        if _CANCEL_EVENT.is_set():
+            _RESULTS.put(("cancelled", created))
+            return
+        # Attempt to create the character sheet.
+        try:
+            sheet = _make_sheet(level, race)
+            if sheet.create_pdf(file_path):
+                created += 1
+            else:
+                _RESULTS.put(("failed", file_path))
+        # A sheet that ran out of choices fails on its own, the rest are still made.
+        except ran.PoolExhaustedError:
+            _RESULTS.put(("failed", file_path))
+        except Exception as ex:
+            _RESULTS.put(("error", ex))
+            _RESULTS.put(("done", created))
+            return
+        done += 1
+        _RESULTS.put(("progress", done, created))
+    _RESULTS.put(("done", created))
+
+# Function used to make a single sheet given the selected level and race.
+def _make_sheet(level: str, race: str) -> CharacterSheet:
+    if race.lower() == "random" and level.lower() == "random":
+        sheet = ran.completely_random_character_sheet()
+    elif race.lower() == "random":
+        level = int(level)
+        race = ran.random_race(level)
+        sheet = random_sheet_attributes(level, race)
+    elif level.lower() == "random":
+        level = ran.random_level()
+        index = race_mod.find_race_index(race)
+        race = Race(index,level)
+        sheet = random_sheet_attributes(level, race)
+    else:
+        level = int(level)
+        index = race_mod.find_race_index(race)
+        race = Race(index, level)
+        sheet = random_sheet_attributes(level, race)
+    return sheet
+
+# Function which reads the worker's messages on the Tk thread and updates the widgets,
+# it keeps checking the queue until the worker is finished.
+def _poll_generation():
+    finished = False
+    while not _RESULTS.empty():
+        message = _RESULTS.get_nowait()
+        match message[0]:
+            case "progress":
+                _PROGRESS.set(message[1])
+                change_text_area("Created " + str(message[2]) + " of " +
+                                 str(int(progress_bar["maximum"])) + " sheet(s).")
+            case "failed":
+                _FAILED_PATHS.append(message[1])
+            # Show an exception warning if any exceptions occur during this process.
+            case "error":
+                ex_name = type(message[1]).__name__
+                ex_info = message[1].args
+                title_text = "Exception " + ex_name + " has occurred."
+                messagebox.showerror(title=title_text, message=ex_info)
+            case "done":
+                finished = True
+                total = int(progress_bar["maximum"])
+                if message[1] == total:
+                    change_text_area("Sheet Created." if total == 1 else
+                                     str(total) + " Sheets Created.")
+                elif message[1] == 0:
+                    change_text_area("Sheet could not be created please try again." +
+                                     _get_failed_text())
+                else:
+                    change_text_area("Created " + str(message[1]) + " of " + str(total) +
+                                     " sheets, please try again for the rest." +
+                                     _get_failed_text())
+            case "cancelled":
+                finished = True
+                change_text_area("Cancelled after creating " + str(message[1]) + " sheet(s)." +
+                                 _get_failed_text())
+
+    if finished:
+        _set_generating(False)
+    else:
+        win.after(_POLL_DELAY, _poll_generation)
+
+# Function which returns the lines listing the sheets that could not be created, if any.
+def _get_failed_text() -> str:
+    if len(_FAILED_PATHS) == 0:
+        return ""
+    return "\nCould not create:\n" + "\n".join(_FAILED_PATHS)
+
+# Function used to switch the buttons and progress bar between generating and idle.
+def _set_generating(generating: bool, count=1):
+    if generating:
+        progress_bar.config(maximum=count)
+        _PROGRESS.set(0)
+        gen_button.config(state=DISABLED)
+        cancel_button.config(state=NORMAL)
+    else:
+        gen_button.config(state=NORMAL)
+        cancel_button.config(state=DISABLED)
 
 # Function used to change the text of the text area widget.
 def change_text_area(text: str):
@@ -114,102 +231,151 @@ def random_sheet_attributes(level: int, race:Race) -> CharacterSheet:
     sheet = ran.random_character_sheet(dnd_class, gender, name, age)
     return sheet
 
+# Function which builds the window and runs it until it is closed.
 def create_window():
+    # Begin loading the rule files in the background while the window is made.
+    warmup_utils.start_warm_up()
+    _build_window()
     win.mainloop()
 
 # Set GUI attributes of the frame.
-win = Tk()
 _WINDOW_HEIGHT = 700
 _WINDOW_WIDTH = 700
 _TEXT_BOX_HEIGHT = int(_WINDOW_HEIGHT / 65)
 _TEXT_BOX_WIDTH = int(_WINDOW_WIDTH / 10)
-text_area = Text(win,
-                 height=_TEXT_BOX_HEIGHT,
-                 width=_TEXT_BOX_WIDTH,
-                 wrap=WORD
-                 )
 _TEXT = "Program is able to generate a limited amount of characters from a pool of two classes, " \
         "which each have two archtypes it can select from. (Cleric and Rogue)" \
         "\nOnly Race available is Aasimar with 10 subraces." \
         "\nBackgrounds from A-S are available as long as the background does not grant extra spells." \
         "\nFeats not available yet and only level and race can be manually selected at the moment." \
         "\nFirst Python Build. Testing to see if it works on other devices."
-_TEXT_BOX_TEXT = tk.StringVar(win)
-_TEXT_BOX_TEXT.set(_TEXT)
+_COUNTS = ("1", "5", "10", "25", "50", "100")
+# Milliseconds between each check of the worker's progress.
+_POLL_DELAY = 100
 _LEVELS = ("Random", "1", "2", "3", "4", "5", "6", "7", "8",
 			"9", "10", "11", "12", "13", "14", "15", "16", "17", "18", "19", "20")
-_LEVEL_SELECT = tk.StringVar(win)
-_LEVEL_SELECT.set(_LEVELS[0])
+
+# Widgets and variables of the window, they are only made once the window is built
+# so the module can be imported without a display or reading any rule files.
+win = None
+text_area = None
+_TEXT_BOX_TEXT = None
+_LEVEL_SELECT = None
 _RACES = None
-_RACE_SELECT = tk.StringVar(win)
-
-# Window settings
-win.title("Random Dnd Sheet Application: Build 1(Python) - 8/11/2022")
-set_window_geometry()
-win.columnconfigure(0, weight=1)
-
-# Top frame settings
-frame = ttk.Frame(win)
-frame.grid()
-
-# Title Label settings
-title_label = ttk.Label(frame,
-                       text="Random Dnd Sheet App",
-                       font=("Arial", 30, 'bold')
-                       )
-title_label.grid(column=0,row=0, pady=(20,10))
-
-# Feature Label settings
-feature_label = ttk.Label(frame,
-                          text="Features Available :",
-                          font=("Arial", 20, 'italic'))
-feature_label.grid(column=0,row=1, pady=25)
-
-# Text Area settings
-text_area = Text(win,
-                 height=_TEXT_BOX_HEIGHT,
-                 width=_TEXT_BOX_WIDTH,
-                 wrap=WORD
-                 )
-text_area.insert(1.0, _TEXT_BOX_TEXT.get())
-text_area.config(state=DISABLED)
-text_area.grid(column=0,row=2, pady=10)
-
-# Frame 2 settings
-frame2 = ttk.Frame(win)
-frame2.grid()
-
-# Level selection label and drop down list settings
-level_select_label = ttk.Label(frame2,
-                          text="Level of Character :",
-                          font=("Arial", 15))
-level_select_label.grid(column=0,row=0, padx=(65, 180), pady=(50,0))
-level_select_ddbox = ttk.Combobox(frame2, textvariable=_LEVEL_SELECT,
-                                  font=("Arial", 12))
-level_select_ddbox['values'] = _LEVELS
-level_select_ddbox.grid(column=1,row=0, padx=(0, 75), pady=(50,0))
-
-# Race selection label and drop down list settings
-race_select_label = ttk.Label(frame2,
-                          text="Race of Character :",
-                          font=("Arial", 15))
-race_select_label.grid(column=0,row=1,padx=(0,112), pady=(50,0))
-_RACES = set_race_values()
-_RACE_SELECT.set(_RACES[0])
-race_select_ddbox = ttk.Combobox(frame2, textvariable=_RACE_SELECT,
-                                  font=("Arial", 12))
-race_select_ddbox['values'] = _RACES
-race_select_ddbox.grid(column=1,row=1, padx=(0,75), pady=(50,0))
-
-# Generate character label and button settings
-generate_character_label = ttk.Label(frame2,
-                          text="Generate Random Character :",
-                          font=("Arial", 15))
-generate_character_label.grid(column=0,row=2,padx=(0,28), pady=(50,0))
-
-gen_button = Button(frame2,
-                    text="Generate",
-                    font=("Arial", 15),
-                    command=generate_character_sheet)
-gen_button.grid(column=1,row=2, padx=(0,75), pady=(50,0))
+_RACE_SELECT = None
+_COUNT_SELECT = None
+_PROGRESS = None
+progress_bar = None
+gen_button = None
+cancel_button = None
+# Messages sent by the worker thread and the event used to ask it to stop.
+_RESULTS = queue.Queue()
+_CANCEL_EVENT = threading.Event()
+# File paths of the sheets of the current generation that could not be created.
+_FAILED_PATHS = []
+
+# Function used to make the window along with all of its widgets.
+def _build_window():
+    global win, text_area, _TEXT_BOX_TEXT, _LEVEL_SELECT, _RACES, _RACE_SELECT, _COUNT_SELECT, \
+        _PROGRESS, progress_bar, gen_button, cancel_button
+
+    win = Tk()
+    _TEXT_BOX_TEXT = tk.StringVar(win)
+    _TEXT_BOX_TEXT.set(_TEXT)
+    _LEVEL_SELECT = tk.StringVar(win)
+    _LEVEL_SELECT.set(_LEVELS[0])
+    _RACE_SELECT = tk.StringVar(win)
+    _COUNT_SELECT = tk.StringVar(win)
+    _COUNT_SELECT.set(_COUNTS[0])
+    _PROGRESS = tk.IntVar(win)
+
+    # Window settings
+    win.title("Random Dnd Sheet Application: Build 1(Python) - 8/11/2022")
+    set_window_geometry()
+    win.columnconfigure(0, weight=1)
+
+    # Top frame settings
+    frame = ttk.Frame(win)
+    frame.grid()
+
+    # Title Label settings
+    title_label = ttk.Label(frame,
+                           text="Random Dnd Sheet App",
+                           font=("Arial", 30, 'bold')
+                           )
+    title_label.grid(column=0,row=0, pady=(20,10))
+
+    # Feature Label settings
+    feature_label = ttk.Label(frame,
+                              text="Features Available :",
+                              font=("Arial", 20, 'italic'))
+    feature_label.grid(column=0,row=1, pady=25)
+
+    # Text Area settings
+    text_area = Text(win,
+                     height=_TEXT_BOX_HEIGHT,
+                     width=_TEXT_BOX_WIDTH,
+                     wrap=WORD
+                     )
+    text_area.insert(1.0, _TEXT_BOX_TEXT.get())
+    text_area.config(state=DISABLED)
+    text_area.grid(column=0,row=2, pady=10)
+
+    # Frame 2 settings
+    frame2 = ttk.Frame(win)
+    frame2.grid()
+
+    # Level selection label and drop down list settings
+    level_select_label = ttk.Label(frame2,
+                              text="Level of Character :",
+                              font=("Arial", 15))
+    level_select_label.grid(column=0,row=0, padx=(65, 180), pady=(50,0))
+    level_select_ddbox = ttk.Combobox(frame2, textvariable=_LEVEL_SELECT,
+                                      font=("Arial", 12))
+    level_select_ddbox['values'] = _LEVELS
+    level_select_ddbox.grid(column=1,row=0, padx=(0, 75), pady=(50,0))
+
+    # Race selection label and drop down list settings
+    race_select_label = ttk.Label(frame2,
+                              text="Race of Character :",
+                              font=("Arial", 15))
+    race_select_label.grid(column=0,row=1,padx=(0,112), pady=(50,0))
+    _RACES = set_race_values()
+    _RACE_SELECT.set(_RACES[0])
+    race_select_ddbox = ttk.Combobox(frame2, textvariable=_RACE_SELECT,
+                                      font=("Arial", 12))
+    race_select_ddbox['values'] = _RACES
+    race_select_ddbox.grid(column=1,row=1, padx=(0,75), pady=(50,0))
+
+    # Number of characters label and drop down list settings
+    count_select_label = ttk.Label(frame2,
+                              text="Number of Characters :",
+                              font=("Arial", 15))
+    count_select_label.grid(column=0,row=2,padx=(0,80), pady=(50,0))
+    count_select_ddbox = ttk.Combobox(frame2, textvariable=_COUNT_SELECT,
+                                      font=("Arial", 12))
+    count_select_ddbox['values'] = _COUNTS
+    count_select_ddbox.grid(column=1,row=2, padx=(0,75), pady=(50,0))
+
+    # Generate character label and button settings
+    generate_character_label = ttk.Label(frame2,
+                              text="Generate Random Character :",
+                              font=("Arial", 15))
+    generate_character_label.grid(column=0,row=3,padx=(0,28), pady=(50,0))
+
+    gen_button = Button(frame2,
+                        text="Generate",
+                        font=("Arial", 15),
+                        command=generate_character_sheet)
+    gen_button.grid(column=1,row=3, padx=(0,75), pady=(50,0))
 
+    # Progress bar and cancel button settings
+    progress_bar = ttk.Progressbar(frame2, variable=_PROGRESS, mode="determinate",
+                                   length=300)
+    progress_bar.grid(column=0,row=4, pady=(30,0))
+    cancel_button = Button(frame2,
+                           text="Cancel",
+                           font=("Arial", 15),
+                           state=DISABLED,
+                           command=cancel_generation)
+    cancel_button.grid(column=1,row=4, padx=(0,75), pady=(30,0))
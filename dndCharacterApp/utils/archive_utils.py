@@ -0,0 +1,431 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which stores character sheets in a compact binary archive, for keeping very many
+# generated characters. A sheet is encoded from its record (see export_utils.sheet_to_record):
+# scores, levels and other numbers as fixed width integers, and every text (features, spells,
+# items, languages, ...) as the id of the string in the archive's string table, so each
+# distinct text is only stored once. The archive is only ever appended to:
+#       header      magic, archive version and record schema version
+#       records     one after the other, as they are written
+#       footer      the string table, then the offset and length of every record
+#       trailer     offset of the footer and the number of records and strings
+# Each time the archive is written to, it is copied to a temporary file without its footer and
+# the new records and a new footer are added to the copy, which then replaces the archive. An
+# archive therefore only ever holds one footer, and is left as it was if writing to it stops
+# half way. A record is read with one seek once the footer is loaded. Does not need PyPDF2.
+# ----------------------------------------------------------------------------------------------- #
+
+import struct
+import sys
+from array import array
+from os import replace
+from os.path import exists
+from shutil import copyfile
+import dndCharacterApp.utils.export_utils as export
+
+# Version of the archive's layout and of the encoding of its records.
+ARCHIVE_FORMAT_VERSION = 1
+ARCHIVE_FORMAT = "archive"
+ARCHIVE_EXTENSION = "dndarc"
+# String id of a missing text.
+NONE_ID = 0xFFFFFFFF
+# Slot count of a spell level without slots.
+_NO_SLOTS = 0xFF
+_ARCHIVE_MAGIC = b"DNDARCH\n"
+_TRAILER_MAGIC = b"DNDAEND\n"
+# Magic, archive version and record schema version.
+_HEADER = struct.Struct(">8sHH")
+# Footer offset, record count, string count and magic.
+_TRAILER = struct.Struct(">QQI8s")
+# Texts of a record stored as a single string id, in order.
+_TEXT_KEYS = ("gender", "race", "class", "archetype", "background", "alignment", "hit_die",
+              "personality_trait", "ideal", "bond", "flaw")
+# Lists of a record stored as string ids, in order, the weapons' names and damages follow them.
+_LIST_KEYS = ("languages", "proficiencies", "equipment", "armors", "attacks_and_spellcasting",
+              "racial_spells")
+_FEATURE_KEYS = ("race", "background", "class")
+# Fixed part of a record: the text ids; age, level, hit points, armor class, initiative, speed,
+# proficiency bonus and passive wisdom; the ability scores, modifiers, saves and proficient
+# saves (one bit each); the skill scores and proficient skills; the money; the length of the
+# name (in words) and of each list, the number of weapons and whether there is spell casting.
+_FIXED = struct.Struct(">" + str(len(_TEXT_KEYS)) + "I" + "HBHBbBBB" +
+                       str(len(export.ABILITY_KEYS)) + "B" +
+                       str(2 * len(export.ABILITY_KEYS)) + "b" + "B" +
+                       str(len(export.SKILL_KEYS)) + "b" + "I" +
+                       str(len(export.MONEY_NAMES)) + "I" +
+                       "B" + str(len(_LIST_KEYS) + len(_FEATURE_KEYS)) + "H" + "BB")
+# Spell casting part of a record: the ability and prepared or known ids, save dc, attack bonus
+# and the number of spell levels and of slot levels.
+_SPELLCASTING = struct.Struct(">IIBbBB")
+
+
+# Class which interns the texts of records, giving each distinct text an id which is its
+# index in the table.
+class StringTable:
+
+    def __init__(self, strings=()):
+        self._strings = list(strings)
+        self._ids = {text: i for i, text in enumerate(self._strings)}
+
+    # Function which returns the id of a text, adding it to the table if it is new.
+    def intern(self, text) -> int:
+        if text is None:
+            return NONE_ID
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._ids[text] = string_id
+        return string_id
+
+    # Function which returns the text of an id.
+    def get(self, string_id: int) -> str:
+        return None if string_id == NONE_ID else self._strings[string_id]
+
+    def get_count(self) -> int:
+        return len(self._strings)
+
+    def get_strings(self) -> []:
+        return self._strings
+
+
+# Function which returns the binary encoding of a record made by export_utils.sheet_to_record,
+# its texts are interned into the string table. Raises ValueError if a number does not fit
+# its field or an entry of the record is missing.
+def encode_record(record: {}, strings: StringTable) -> bytes:
+    try:
+        return _encode_record(record, strings)
+    except KeyError as ex:
+        raise ValueError("Record can not be encoded: missing " + str(ex))
+
+
+def _encode_record(record: {}, strings: StringTable) -> bytes:
+    intern = strings.intern
+    abilities = [record["abilities"][key] for key in export.ABILITY_KEYS]
+    skills = [record["skills"][key] for key in export.SKILL_KEYS]
+    # Names are nearly all different, so their words are interned instead.
+    name = record["name"].split(" ") if record["name"] is not None else ()
+    lists = [record[key] for key in _LIST_KEYS]
+    lists.extend(record["features"][key] for key in _FEATURE_KEYS)
+    weapons = record["weapons"]
+    spellcasting = record["spellcasting"]
+
+    save_profs = 0
+    for i in range(len(abilities)):
+        if abilities[i]["save_proficient"]:
+            save_profs |= 1 << i
+    skill_profs = 0
+    for i in range(len(skills)):
+        if skills[i]["proficient"]:
+            skill_profs |= 1 << i
+
+    ids = array("I", (intern(word) for word in name))
+    for items in lists:
+        ids.extend(intern(item) for item in items)
+    for weapon in weapons:
+        ids.append(intern(weapon["name"]))
+        ids.append(intern(weapon["damage"]))
+    try:
+        parts = [_FIXED.pack(*(intern(record[key]) for key in _TEXT_KEYS),
+                             record["age"], record["level"], record["hit_points"],
+                             record["armor_class"], record["initiative"], record["speed"],
+                             record["proficiency_bonus"], record["passive_wisdom"],
+                             *(ability["score"] for ability in abilities),
+                             *(ability["modifier"] for ability in abilities),
+                             *(ability["save"] for ability in abilities), save_profs,
+                             *(skill["score"] for skill in skills), skill_profs,
+                             *(record["money"][key] for key in export.MONEY_NAMES),
+                             len(name), *(len(items) for items in lists), len(weapons),
+                             spellcasting is not None),
+                 struct.pack(">" + str(len(weapons)) + "b",
+                             *(weapon["attack_bonus"] for weapon in weapons))]
+        if spellcasting is not None:
+            spells = spellcasting["spells"]
+            slots = spellcasting["slots"]
+            parts.append(_SPELLCASTING.pack(intern(spellcasting["ability"]),
+                                            intern(spellcasting["prepared_or_known"]),
+                                            spellcasting["save_dc"], spellcasting["attack_bonus"],
+                                            len(spells), len(slots)))
+            parts.append(struct.pack(">" + str(len(spells)) + "H" + str(len(slots)) + "B",
+                                     *(len(level) for level in spells),
+                                     *(_NO_SLOTS if slot is None else slot for slot in slots)))
+            for level in spells:
+                ids.extend(intern(spell) for spell in level)
+    except (struct.error, TypeError) as ex:
+        raise ValueError("Record can not be encoded: " + str(ex))
+
+    if sys.byteorder == "little":
+        ids.byteswap()
+    parts.append(ids.tobytes())
+    return b"".join(parts)
+
+
+# Function which returns the record of a binary encoding made by encode_record, the same as
+# the record that was encoded.
+def decode_record(data: bytes, strings: StringTable) -> {}:
+    get = strings.get
+    fixed = _FIXED.unpack_from(data)
+    position = _FIXED.size
+    text_count = len(_TEXT_KEYS)
+    ability_count = len(export.ABILITY_KEYS)
+    skill_count = len(export.SKILL_KEYS)
+    texts = fixed[:text_count]
+    (age, level, hit_points, armor_class, initiative, speed, prof_bonus,
+     passive_wisdom) = fixed[text_count:text_count + 8]
+    index = text_count + 8
+    scores = fixed[index:index + ability_count]
+    modifiers = fixed[index + ability_count:index + 2 * ability_count]
+    saves = fixed[index + 2 * ability_count:index + 3 * ability_count]
+    save_profs = fixed[index + 3 * ability_count]
+    index += 3 * ability_count + 1
+    skill_scores = fixed[index:index + skill_count]
+    skill_profs = fixed[index + skill_count]
+    index += skill_count + 1
+    money = fixed[index:index + len(export.MONEY_NAMES)]
+    index += len(export.MONEY_NAMES)
+    name_length = fixed[index]
+    list_lengths = fixed[index + 1:index + 1 + len(_LIST_KEYS) + len(_FEATURE_KEYS)]
+    weapon_count, has_spellcasting = fixed[-2:]
+
+    bonuses = struct.unpack_from(">" + str(weapon_count) + "b", data, position)
+    position += weapon_count
+    spell_lengths = ()
+    slots = ()
+    if has_spellcasting:
+        (ability, prepared_or_known, save_dc, attack_bonus, level_count,
+         slot_count) = _SPELLCASTING.unpack_from(data, position)
+        position += _SPELLCASTING.size
+        counts = struct.unpack_from(">" + str(level_count) + "H" + str(slot_count) + "B", data,
+                                    position)
+        position += 2 * level_count + slot_count
+        spell_lengths = counts[:level_count]
+        slots = counts[level_count:]
+
+    ids = array("I")
+    ids.frombytes(data[position:])
+    if sys.byteorder == "little":
+        ids.byteswap()
+    words = [get(string_id) for string_id in ids]
+    position = name_length
+    lists = []
+    for length in list_lengths:
+        lists.append(words[position:position + length])
+        position += length
+    weapons = []
+    for bonus in bonuses:
+        weapons.append({"name": words[position], "attack_bonus": bonus,
+                        "damage": words[position + 1]})
+        position += 2
+
+    spellcasting = None
+    if has_spellcasting:
+        spells = []
+        for length in spell_lengths:
+            spells.append(words[position:position + length])
+            position += length
+        spellcasting = {"ability": get(ability),
+                        "prepared_or_known": get(prepared_or_known),
+                        "save_dc": save_dc,
+                        "attack_bonus": attack_bonus,
+                        "spells": spells,
+                        "slots": [None if slot == _NO_SLOTS else slot for slot in slots]}
+
+    text = {_TEXT_KEYS[i]: get(texts[i]) for i in range(text_count)}
+    features = lists[len(_LIST_KEYS):]
+    return {
+        "schema_version": export.SCHEMA_VERSION,
+        "name": " ".join(words[:name_length]) if name_length > 0 else None,
+        "gender": text["gender"],
+        "age": age,
+        "race": text["race"],
+        "class": text["class"],
+        "archetype": text["archetype"],
+        "background": text["background"],
+        "alignment": text["alignment"],
+        "level": level,
+        "hit_points": hit_points,
+        "hit_die": text["hit_die"],
+        "armor_class": armor_class,
+        "initiative": initiative,
+        "speed": speed,
+        "proficiency_bonus": prof_bonus,
+        "passive_wisdom": passive_wisdom,
+        "abilities": {export.ABILITY_KEYS[i]: {"score": scores[i],
+                                               "modifier": modifiers[i],
+                                               "save": saves[i],
+                                               "save_proficient": bool(save_profs >> i & 1)}
+                      for i in range(ability_count)},
+        "skills": {export.SKILL_KEYS[i]: {"score": skill_scores[i],
+                                          "proficient": bool(skill_profs >> i & 1)}
+                   for i in range(skill_count)},
+        "languages": lists[0],
+        "proficiencies": lists[1],
+        "equipment": lists[2],
+        "armors": lists[3],
+        "weapons": weapons,
+        "money": dict(zip(export.MONEY_NAMES, money)),
+        "personality_trait": text["personality_trait"],
+        "ideal": text["ideal"],
+        "bond": text["bond"],
+        "flaw": text["flaw"],
+        "features": dict(zip(_FEATURE_KEYS, features)),
+        "attacks_and_spellcasting": lists[4],
+        "spellcasting": spellcasting,
+        "racial_spells": lists[5]
+    }
+
+
+# Class which appends character sheets to an archive, creating it if it does not exist.
+# Sheets are written to a temporary copy of the archive which replaces it once the writer is
+# closed, nothing written is readable until then. Raises ValueError if the file is not an
+# archive of this version.
+class ArchiveWriter:
+
+    def __init__(self, file_path: str):
+        self._file_path = file_path
+        self._temp_path = file_path + ".tmp"
+        if exists(file_path):
+            with open(file_path, "rb") as archive:
+                strings, self._offsets, self._lengths, footer_offset = _read_footer(archive)
+            # The copy only keeps the records, the footer is written again once closed.
+            copyfile(file_path, self._temp_path)
+            self._file = open(self._temp_path, "r+b")
+            self._file.truncate(footer_offset)
+            self._strings = StringTable(strings)
+            self._position = self._file.seek(footer_offset)
+        else:
+            self._file = open(self._temp_path, "wb")
+            self._strings = StringTable()
+            self._offsets = array("Q")
+            self._lengths = array("I")
+            self._position = self._file.write(_HEADER.pack(_ARCHIVE_MAGIC, ARCHIVE_FORMAT_VERSION,
+                                                           export.SCHEMA_VERSION))
+
+    # Function used to write a character sheet.
+    def write(self, sheet):
+        self.write_record(export.sheet_to_record(sheet))
+
+    # Function used to write a record made by export_utils.sheet_to_record.
+    def write_record(self, record: {}):
+        data = encode_record(record, self._strings)
+        self._offsets.append(self._position)
+        self._lengths.append(len(data))
+        self._position += self._file.write(data)
+
+    # Function which returns the number of records in the archive, those written included.
+    def get_count(self) -> int:
+        return len(self._offsets)
+
+    # Function used to write the footer, close the file and replace the archive with it.
+    def close(self):
+        if self._file.closed:
+            return
+        strings = [text.encode("utf-8") for text in self._strings.get_strings()]
+        lengths = array("I", (len(text) for text in strings))
+        offsets = self._offsets
+        record_lengths = self._lengths
+        if sys.byteorder == "little":
+            for values in (lengths, offsets, record_lengths):
+                values.byteswap()
+        self._file.write(lengths.tobytes())
+        self._file.write(b"".join(strings))
+        self._file.write(offsets.tobytes())
+        self._file.write(record_lengths.tobytes())
+        if sys.byteorder == "little":
+            for values in (lengths, offsets, record_lengths):
+                values.byteswap()
+        self._file.write(_TRAILER.pack(self._position, len(offsets), len(strings),
+                                       _TRAILER_MAGIC))
+        self._file.close()
+        replace(self._temp_path, self._file_path)
+
+
+# Class which reads the records of an archive, loading its string table and index once.
+# Raises ValueError if the file is not an archive of this version.
+class ArchiveReader:
+
+    def __init__(self, file_path: str):
+        self._file = open(file_path, "rb")
+        try:
+            strings, self._offsets, self._lengths, footer_offset = _read_footer(self._file)
+        except ValueError:
+            self._file.close()
+            raise
+        self._strings = StringTable(strings)
+
+    def get_count(self) -> int:
+        return len(self._offsets)
+
+    # Function which returns a record, by its position in the archive, as encoded.
+    def get_encoded(self, index: int) -> bytes:
+        self._file.seek(self._offsets[index])
+        return self._file.read(self._lengths[index])
+
+    # Function which returns a record, by its position in the archive, the same as
+    # export_utils.sheet_to_record.
+    def get_record(self, index: int) -> {}:
+        return decode_record(self.get_encoded(index), self._strings)
+
+    # Generator of every record of the archive, in order.
+    def iter_records(self):
+        for index in range(len(self._offsets)):
+            yield self.get_record(index)
+
+    def close(self):
+        self._file.close()
+
+
+# Function used to append every sheet of an iterable, as they come, to an archive (see
+# ArchiveWriter). Returns the number of sheets written.
+def archive_sheets(sheets, file_path: str) -> int:
+    writer = ArchiveWriter(file_path)
+    count = 0
+    try:
+        for sheet in sheets:
+            writer.write(sheet)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+# Helper function which reads the footer of an archive: returns its strings, the offset
+# and length of each record and the offset of the footer. Raises ValueError if the file is
+# not an archive of this version.
+def _read_footer(file) -> ():
+    try:
+        magic, version, schema_version = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != _ARCHIVE_MAGIC:
+            raise ValueError("Not an archive")
+        if version != ARCHIVE_FORMAT_VERSION or schema_version != export.SCHEMA_VERSION:
+            raise ValueError("Archive of version " + str(version) + "." + str(schema_version) +
+                             " can not be read")
+        file.seek(-_TRAILER.size, 2)
+        footer_offset, record_count, string_count, magic = _TRAILER.unpack(
+            file.read(_TRAILER.size))
+    except (OSError, struct.error):
+        raise ValueError("Not an archive")
+    if magic != _TRAILER_MAGIC:
+        raise ValueError("Archive is missing its footer")
+
+    file.seek(footer_offset)
+    lengths = _read_array(file, "I", string_count)
+    data = file.read(sum(lengths))
+    strings = []
+    position = 0
+    for length in lengths:
+        strings.append(data[position:position + length].decode("utf-8"))
+        position += length
+    offsets = _read_array(file, "Q", record_count)
+    record_lengths = _read_array(file, "I", record_count)
+    return strings, offsets, record_lengths, footer_offset
+
+
+def _read_array(file, typecode: str, count: int) -> array:
+    values = array(typecode)
+    data = file.read(values.itemsize * count)
+    if len(data) != values.itemsize * count:
+        raise ValueError("Archive is missing its footer")
+    values.frombytes(data)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
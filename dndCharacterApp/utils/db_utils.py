@@ -0,0 +1,354 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which contains an optional SQLite backend for the rules found in the lib folder.
+# Every sheet is imported into a local database with indexed tables for spells (by list and
+# level), weapons and armor (by name), backgrounds (by index) and races (by name).
+# Once enabled, io_utils.get_col, get_row and get_rows query the database through a single
+# shared read-only connection instead of the sheets, and the Background class, the spell
+# choices of rand_utils and the armor/attack calculations in math_utils use the indexed
+# lookups of the database (io_utils.get_rules_database) instead of whole columns.
+# Run as a script to (re)build the database:
+#       python -m dndCharacterApp.utils.db_utils [lib folder]
+# ----------------------------------------------------------------------------------------------- #
+
+import json
+import sqlite3
+import sys
+import threading
+from os import remove, replace
+from os.path import exists, isdir, join
+from pathlib import Path
+import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.pack_utils as pack
+
+# Name of the database file which is stored at the top of the lib folder.
+DATABASE_FILE_NAME = "rules.sqlite"
+# Version of the database's tables, databases of a different version are rebuilt.
+DATABASE_SCHEMA_VERSION = 3
+
+_SCHEMA = (
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE sheets (file TEXT PRIMARY KEY, max_row INTEGER NOT NULL, "
+    "max_column INTEGER NOT NULL)",
+    "CREATE TABLE columns (file TEXT NOT NULL, col INTEGER NOT NULL, header TEXT, "
+    "contents TEXT NOT NULL, PRIMARY KEY (file, col)) WITHOUT ROWID",
+    "CREATE INDEX columns_by_header ON columns (file, header)",
+    "CREATE TABLE rows (file TEXT NOT NULL, row INTEGER NOT NULL, contents TEXT NOT NULL, "
+    "PRIMARY KEY (file, row)) WITHOUT ROWID",
+    "CREATE TABLE spells (list TEXT NOT NULL, level INTEGER NOT NULL, position INTEGER NOT NULL, "
+    "name TEXT NOT NULL, PRIMARY KEY (list, level, position)) WITHOUT ROWID",
+    "CREATE TABLE weapons (name TEXT PRIMARY KEY COLLATE NOCASE, damage TEXT, damage_type TEXT, "
+    "ranged INTEGER NOT NULL, finesse INTEGER NOT NULL, properties TEXT)",
+    "CREATE TABLE armor (name TEXT PRIMARY KEY COLLATE NOCASE, base_ac INTEGER NOT NULL, "
+    "add_dex INTEGER NOT NULL, dex_limit INTEGER, strength_requirement INTEGER)",
+    "CREATE TABLE backgrounds (idx INTEGER PRIMARY KEY, name TEXT NOT NULL, skill_prof TEXT, "
+    "tool_prof TEXT, languages TEXT, equipment TEXT, money TEXT, features TEXT)",
+    "CREATE TABLE races (name TEXT PRIMARY KEY COLLATE NOCASE, idx INTEGER NOT NULL UNIQUE, "
+    "ability_score_incr TEXT, spells TEXT, features TEXT, max_age INTEGER, size TEXT, "
+    "speed INTEGER, languages TEXT, name_file_path TEXT)",
+)
+
+
+# Class which represents a read-only connection to the rules database.
+# The connection may be shared between threads, queries are serialized by a lock.
+class RulesDatabase:
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro",
+                                           uri=True, check_same_thread=False)
+
+    # Function gets the contents of a column given either the name of the first element
+    # in that column or an index, the same as io_utils.get_col.
+    def get_col(self, elementOrIndex, file_path: str) -> ():
+        if isinstance(elementOrIndex, str):
+            result = self._query_one("SELECT contents FROM columns WHERE file = ? AND header = ?",
+                                     (file_path, elementOrIndex.lower()))
+        else:
+            result = self._query_one("SELECT contents FROM columns WHERE file = ? AND col = ?",
+                                     (file_path, elementOrIndex))
+            # Columns outside of an existing sheet are empty.
+            if result is None and self._get_sheet_size(file_path) is not None:
+                return ()
+        return tuple(json.loads(result[0])) if result is not None else None
+
+    # Function gets the contents of a row given an index, the same as io_utils.get_row.
+    def get_row(self, index: int, file_path: str) -> ():
+        size = self._get_sheet_size(file_path)
+        if size is None:
+            return None
+        max_row, max_column = size
+        if index > max_column:
+            return None
+        if index > max_row:
+            return tuple(None for i in range(index, max_column + 1))
+        result = self._query_one("SELECT contents FROM rows WHERE file = ? AND row = ?",
+                                 (file_path, index))
+        return tuple(json.loads(result[0])[index - 1:])
+
+    # Function gets every row of a sheet, the same as io_utils.get_rows.
+    def get_rows(self, file_path: str) -> ():
+        if self._get_sheet_size(file_path) is None:
+            return None
+        return tuple(tuple(json.loads(row[0])) for row in self._query_all(
+            "SELECT contents FROM rows WHERE file = ? ORDER BY row", (file_path,)))
+
+    # Function which returns the spells of a given spell level from a spell list file.
+    def get_spells(self, spell_list_file_path: str, level: int) -> ():
+        return tuple(row[0] for row in self._query_all(
+            "SELECT name FROM spells WHERE list = ? AND level = ? ORDER BY position",
+            (spell_list_file_path, level)))
+
+    # Function which returns a weapon's stats as a tuple of:
+    # name, damage dice, damage type, ranged, finesse and its properties.
+    # None is returned if the weapon does not exist.
+    def get_weapon(self, name: str) -> ():
+        return self._query_one("SELECT name, damage, damage_type, ranged, finesse, properties "
+                               "FROM weapons WHERE name = ?", (name,))
+
+    # Function which returns an armor's stats as a tuple of:
+    # name, base ac, if dexterity is added, the dexterity limit and strength requirement.
+    # None is returned if the armor does not exist.
+    def get_armor(self, name: str) -> ():
+        return self._query_one("SELECT name, base_ac, add_dex, dex_limit, strength_requirement "
+                               "FROM armor WHERE name = ?", (name,))
+
+    # Function which returns the cells of a background given its index (starting at 1),
+    # in the same order as the background attributes file.
+    def get_background(self, index: int) -> ():
+        return self._query_one("SELECT name, skill_prof, tool_prof, languages, equipment, money, "
+                               "features FROM backgrounds WHERE idx = ?", (index,))
+
+    # Function which returns the index (starting at 1) and cells of a race given its name,
+    # in the same order as the race file.
+    def get_race(self, name: str) -> ():
+        return self._query_one("SELECT idx, name, ability_score_incr, spells, features, max_age, "
+                               "size, speed, languages, name_file_path FROM races WHERE name = ?",
+                               (name,))
+
+    # Function which returns the number of races in the database.
+    def get_race_count(self) -> int:
+        return self._query_one("SELECT COUNT(*) FROM races", ())[0]
+
+    # Function which returns the value stored in the database's meta table.
+    def get_meta(self, key: str) -> str:
+        result = self._query_one("SELECT value FROM meta WHERE key = ?", (key,))
+        return result[0] if result is not None else None
+
+    def get_db_path(self) -> str:
+        return self._db_path
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _get_sheet_size(self, file_path: str) -> ():
+        return self._query_one("SELECT max_row, max_column FROM sheets WHERE file = ?", (file_path,))
+
+    def _query_one(self, query: str, parameters: ()) -> ():
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def _query_all(self, query: str, parameters: ()) -> []:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+
+# Shared connection used by the process, opened by enable().
+_DATABASE = None
+_DATABASE_LOCK = threading.Lock()
+
+
+# Function used to import every sheet of the lib folder into a new database.
+# Returns the path the database was written to.
+def build_database(lib_path: str, db_path=None) -> str:
+    if db_path is None:
+        db_path = join(lib_path, DATABASE_FILE_NAME)
+
+    sheets = pack.load_or_build_pack(lib_path)
+    if sheets is None:
+        raise ImportError("openpyxl is needed to read the sheets of " + lib_path)
+
+    # Write to a temporary file first so a half written database is never opened.
+    temp_path = db_path + ".tmp"
+    if exists(temp_path):
+        remove(temp_path)
+    connection = sqlite3.connect(temp_path)
+    try:
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        for file_path, rows in sheets.items():
+            _insert_sheet(connection, file_path, rows)
+            file_name = file_path.split("/")[-1]
+            if file_name.startswith("SpellList"):
+                _insert_spells(connection, file_path, rows)
+        _insert_weapons(connection, sheets.get(io.WEAPONS_STATS_FILE_PATH, ()))
+        _insert_armor(connection, sheets.get(io.ARMOR_STATS_FILE_PATH, ()))
+        _insert_backgrounds(connection, sheets.get(io.BKGR_ATRBT_FILE_PATH, ()))
+        _insert_races(connection, sheets.get(io.RACE_FILE_PATH, ()))
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", (
+            ("schema_version", str(DATABASE_SCHEMA_VERSION)),
+            ("content_hash", get_content_hash(lib_path))))
+        connection.commit()
+    finally:
+        connection.close()
+    replace(temp_path, db_path)
+
+    return db_path
+
+
+# Function which returns the hash of the workbooks the database should be built from.
+def get_content_hash(lib_path: str) -> str:
+    return pack.get_content_hash(lib_path, pack.find_workbooks(lib_path)).hex()
+
+
+# Function used to open the shared rules database and make io_utils query it.
+# The database of the lib folder is used if no path is given and it is rebuilt first if
+# it is missing or stale. The shared database is returned.
+def enable(db_path=None) -> RulesDatabase:
+    global _DATABASE
+
+    with _DATABASE_LOCK:
+        if _DATABASE is None or (db_path is not None and _DATABASE.get_db_path() != db_path):
+            lib_path = io.get_lib_folder()
+            if db_path is None:
+                db_path = join(lib_path, DATABASE_FILE_NAME)
+            if _is_stale(db_path, lib_path):
+                build_database(lib_path, db_path)
+            if _DATABASE is not None:
+                _DATABASE.close()
+            _DATABASE = RulesDatabase(db_path)
+        io.use_rules_database(_DATABASE)
+        return _DATABASE
+
+
+# Function used to stop io_utils from querying the rules database and close the shared
+# connection.
+def disable():
+    global _DATABASE
+
+    with _DATABASE_LOCK:
+        io.use_rules_database(None)
+        if _DATABASE is not None:
+            _DATABASE.close()
+            _DATABASE = None
+
+
+# Function which returns the shared rules database, None if it is not enabled.
+def get_database() -> RulesDatabase:
+    return _DATABASE
+
+
+# Function which checks if a database is missing, of a different version or built from
+# workbooks that have since changed.
+def _is_stale(db_path: str, lib_path: str) -> bool:
+    if not exists(db_path):
+        return True
+    try:
+        database = RulesDatabase(db_path)
+        try:
+            return database.get_meta("schema_version") != str(DATABASE_SCHEMA_VERSION) or \
+                database.get_meta("content_hash") != get_content_hash(lib_path)
+        finally:
+            database.close()
+    except sqlite3.Error:
+        return True
+
+
+# Helper functions used to fill the database's tables given the rows of a sheet.
+def _insert_sheet(connection: sqlite3.Connection, file_path: str, rows: ()):
+    max_row = len(rows)
+    max_column = len(rows[0]) if max_row > 0 else 0
+    connection.execute("INSERT INTO sheets VALUES (?, ?, ?)", (file_path, max_row, max_column))
+
+    headers = set()
+    for i in range(max_column):
+        header = rows[0][i]
+        # Only the first column with a given header can be found by name.
+        if header is not None and str(header).lower() not in headers:
+            header = str(header).lower()
+            headers.add(header)
+        else:
+            header = None
+        contents = [row[i] for row in rows if row[i] is not None]
+        connection.execute("INSERT INTO columns VALUES (?, ?, ?, ?)",
+                           (file_path, i + 1, header, json.dumps(contents)))
+
+    connection.executemany("INSERT INTO rows VALUES (?, ?, ?)",
+                           ((file_path, i + 1, json.dumps(rows[i])) for i in range(max_row)))
+
+
+def _insert_spells(connection: sqlite3.Connection, file_path: str, rows: ()):
+    # Each column is a spell level with the level itself as its header.
+    for i in range(len(rows[0]) if len(rows) > 0 else 0):
+        level = rows[0][i]
+        if not isinstance(level, int):
+            continue
+        position = 0
+        for row in rows[1:]:
+            if row[i] is not None:
+                connection.execute("INSERT INTO spells VALUES (?, ?, ?, ?)",
+                                   (file_path, level, position, str(row[i])))
+                position += 1
+
+
+def _insert_weapons(connection: sqlite3.Connection, rows: ()):
+    for index, column in _get_columns(rows):
+        damage = str(column[1]).split("=")
+        connection.execute("INSERT OR IGNORE INTO weapons VALUES (?, ?, ?, ?, ?, ?)",
+                           (column[0], damage[0], damage[1] if len(damage) > 1 else None,
+                            _is_true(column[2]), _is_true(column[3]),
+                            column[4] if len(column) > 4 else None))
+
+
+def _insert_armor(connection: sqlite3.Connection, rows: ()):
+    for index, column in _get_columns(rows):
+        add_dex = str(column[2]).split("=")
+        dex_limit = int(add_dex[2]) if len(add_dex) > 2 and add_dex[1].lower() == "true" else None
+        strength = str(column[3]).split("=") if len(column) > 3 else ["false"]
+        strength_requirement = int(strength[1]) if strength[0].lower() == "true" else None
+        connection.execute("INSERT OR IGNORE INTO armor VALUES (?, ?, ?, ?, ?)",
+                           (column[0], column[1], _is_true(column[2]), dex_limit,
+                            strength_requirement))
+
+
+def _insert_backgrounds(connection: sqlite3.Connection, rows: ()):
+    for index, column in _get_columns(rows):
+        cells = list(column[:7]) + [None for i in range(7 - len(column[:7]))]
+        connection.execute("INSERT INTO backgrounds VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           [index] + cells)
+
+
+def _insert_races(connection: sqlite3.Connection, rows: ()):
+    for index, column in _get_columns(rows):
+        cells = list(column[:9]) + [None for i in range(9 - len(column[:9]))]
+        connection.execute("INSERT OR IGNORE INTO races VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           [cells[0], index] + cells[1:])
+
+
+# Helper function which returns the index (starting at 1) and contents of every non-empty
+# column of a sheet, without its empty cells.
+def _get_columns(rows: ()) -> []:
+    columns = []
+    for i in range(len(rows[0]) if len(rows) > 0 else 0):
+        column = tuple(row[i] for row in rows if row[i] is not None)
+        if len(column) > 0:
+            columns.append((i + 1, column))
+    return columns
+
+
+def _is_true(cell) -> int:
+    return 1 if str(cell).split("=")[0].lower() == "true" else 0
+
+
+def main(args: []) -> int:
+    lib_path = args[0] if len(args) > 0 else "lib/"
+    if not isdir(lib_path):
+        print("Could not find the lib folder: " + lib_path)
+        return 1
+    print("Rules database written to " + build_database(lib_path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which rolls the dice of many characters at once: ability scores (4d6 dropping the
+# lowest die) and hit points. When NumPy is installed the rolls of a whole batch are made in a
+# single vectorized call, otherwise each roll falls back to the functions of rand_utils.
+# Both follow the same rules as rolling each character with rand_utils.
+# rand_utils.iter_character_sheets rolls the dice of its batches here when asked to with
+# GenerationOptions(numpy_dice=True). NumPy dice are drawn as uniform numbers, a fixed count
+# of them per character, so the dice of character i of a stream can be drawn on their own.
+# ----------------------------------------------------------------------------------------------- #
+
+import random
+import dndCharacterApp.utils.rand_utils as rand_utils
+
+# Number of hit dice rolled for every character with NumPy, one for each level after the
+# first. Rolling the same number for everyone keeps each character's rolls independent of the
+# rest of the batch.
+MAX_HIT_DIE_ROLLS = 19
+# Number of uniform draws each character takes from a NumPy generator: four d6 for each of
+# the six ability scores, then its hit dice.
+ABILITY_SCORE_DRAWS = 6 * 4
+CHARACTER_DRAWS = ABILITY_SCORE_DRAWS + MAX_HIT_DIE_ROLLS
+
+# NumPy is optional, without it the dice are rolled one at a time.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Function which returns True if the dice can be rolled with NumPy.
+def has_numpy() -> bool:
+    return np is not None
+
+
+# Function which returns a new generator for the dice engine given an optional seed:
+# a NumPy generator if NumPy is installed, otherwise a random.Random.
+def make_generator(seed=None):
+    if np is not None:
+        return np.random.default_rng(seed)
+    return random.Random(seed)
+
+
+# Function which returns a NumPy generator given a seed which starts at the dice of character
+# skip, so character i of a seed always gets the same dice. Needs NumPy.
+def make_character_generator(seed, skip=0):
+    bit_generator = np.random.PCG64(seed)
+    bit_generator.advance(skip * CHARACTER_DRAWS)
+    return np.random.Generator(bit_generator)
+
+
+# Function used to draw the dice of n characters from a NumPy generator, a row of
+# CHARACTER_DRAWS uniform draws per character, in the order the characters take them.
+def draw_characters(n: int, rng):
+    return rng.random(size=(n, CHARACTER_DRAWS))
+
+
+# Function which returns the ability scores of each row of draws made by draw_characters.
+def ability_scores_from_draws(draws) -> []:
+    return _get_ability_scores(draws[:, :ABILITY_SCORE_DRAWS].reshape(-1, 6, 4))
+
+
+# Function which returns the hit points of a character given its die size, level,
+# constitution score and its row of draws made by draw_characters.
+def hit_points_from_draws(die_size: int, level: int, constitution_score: int, draws) -> int:
+    return _get_hit_points([die_size], [level], [constitution_score],
+                           draws[None, ABILITY_SCORE_DRAWS:])[0]
+
+
+# Function used to roll n sets of six ability scores, each score is the sum of the three
+# highest of four d6. Returns a list of n lists ordered Str, Dex, Con, Int, Wis and Cha.
+# The generator can either be a NumPy generator or anything rand_utils accepts.
+def roll_ability_scores(n: int, rng=None) -> []:
+    if not _use_numpy(rng):
+        return [rand_utils.random_ability_scores(rng=_get_scalar_rng(rng)) for i in range(n)]
+    if rng is None:
+        rng = np.random.default_rng()
+
+    return _get_ability_scores(rng.random(size=(n, 6, 4)))
+
+
+# Function used to roll the hit points of many characters given their die sizes, levels
+# and constitution scores (one entry per character). As in rand_utils the first level gets
+# the full die and negative constitution modifiers are ignored.
+# Returns a list with the hit points of each character.
+def roll_hit_points(die_sizes: [], levels: [], constitution_scores: [], rng=None) -> []:
+    if not _use_numpy(rng):
+        scalar_rng = _get_scalar_rng(rng)
+        return [rand_utils.random_hit_points(die_sizes[i], levels[i], constitution_scores[i],
+                                             rng=scalar_rng)
+                for i in range(len(die_sizes))]
+    if rng is None:
+        rng = np.random.default_rng()
+    if len(die_sizes) == 0:
+        return []
+
+    max_rolls = max(MAX_HIT_DIE_ROLLS, max(levels) - 1)
+    return _get_hit_points(die_sizes, levels, constitution_scores,
+                           rng.random(size=(len(die_sizes), max_rolls)))
+
+
+# Helper function which returns the ability scores of uniform draws shaped (n, 6, 4): each
+# score is the sum of its four d6 minus the lowest one.
+def _get_ability_scores(draws) -> []:
+    rolls = (draws * 6).astype(np.int64) + 1
+    return (rolls.sum(axis=2) - rolls.min(axis=2)).tolist()
+
+
+# Helper function which returns the hit points of characters given a row of uniform draws
+# per character, one draw for each level after the first, draws past its level are ignored.
+def _get_hit_points(die_sizes: [], levels: [], constitution_scores: [], draws) -> []:
+    die_sizes = np.asarray(die_sizes, dtype=np.int64)
+    levels = np.asarray(levels, dtype=np.int64)
+    # Constitution modifier, floored at 0.
+    con_mods = np.maximum((np.asarray(constitution_scores, dtype=np.int64) - 10) // 2, 0)
+
+    extra_levels = np.maximum(levels - 1, 0)
+    rolls = (draws * die_sizes[:, None]).astype(np.int64) + 1
+    rolls = np.where(np.arange(draws.shape[1])[None, :] < extra_levels[:, None], rolls, 0)
+
+    hit_points = die_sizes + con_mods + rolls.sum(axis=1) + extra_levels * con_mods
+    return hit_points.tolist()
+
+
+# Helper function which decides if the dice should be rolled with NumPy.
+def _use_numpy(rng) -> bool:
+    if np is None:
+        return False
+    return rng is None or isinstance(rng, np.random.Generator)
+
+
+def _get_scalar_rng(rng):
+    return random if rng is None else rng
@@ -0,0 +1,254 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which exports character sheets as JSON lines or CSV, for programs which need the
+# characters themselves instead of a pdf. Every sheet becomes a record (see sheet_to_record)
+# with a stable schema holding what its pdf shows, derived stats included: armor class,
+# initiative, skills, saves, weapon stats, spells and spell slots. Batches are written one
+# sheet at a time as they are made. Does not need PyPDF2.
+# ----------------------------------------------------------------------------------------------- #
+
+import csv
+import json
+from contextlib import nullcontext
+import dndCharacterApp.utils.gen_utils as gen
+
+# Version of the schema of the records, changed whenever a key is added, removed or renamed.
+SCHEMA_VERSION = 1
+JSON_LINES_FORMAT = "jsonl"
+CSV_FORMAT = "csv"
+FORMATS = (JSON_LINES_FORMAT, CSV_FORMAT)
+MONEY_NAMES = ("cp", "sp", "ep", "gp", "pp")
+MAX_SPELL_LEVEL = 9
+# Separator of the items of a list in a CSV cell, a weapon's name, attack bonus and damage
+# are separated by colons.
+CSV_LIST_SEPARATOR = "; "
+CSV_WEAPON_SEPARATOR = ":"
+
+
+# Function which returns the key of a name in the records, such as sleight_of_hand.
+def get_key(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+ABILITY_KEYS = tuple(get_key(name) for name in gen.ABILITY_NAMES)
+SKILL_KEYS = tuple(get_key(name) for name in gen.SKILL_NAMES)
+# Keys of the records which hold a single value, the first columns of the CSV export.
+_SCALAR_KEYS = ("schema_version", "name", "gender", "age", "race", "class", "archetype",
+                "background", "alignment", "level", "hit_points", "hit_die", "armor_class",
+                "initiative", "speed", "proficiency_bonus", "passive_wisdom")
+
+
+# Function which returns the columns of the CSV export, in order.
+def _get_csv_columns() -> ():
+    columns = list(_SCALAR_KEYS)
+    for key in ABILITY_KEYS:
+        columns.extend((key, key + "_modifier", key + "_save", key + "_save_proficient"))
+    for key in SKILL_KEYS:
+        columns.extend(("skill_" + key, "skill_" + key + "_proficient"))
+    columns.extend(("languages", "proficiencies", "equipment", "armors", "weapons"))
+    columns.extend(MONEY_NAMES)
+    columns.extend(("personality_trait", "ideal", "bond", "flaw", "race_features",
+                    "background_features", "class_features", "attacks_and_spellcasting",
+                    "casting_ability", "prepared_or_known", "spell_save_dc", "spell_attack_bonus"))
+    columns.extend("spells_" + str(level) for level in range(MAX_SPELL_LEVEL + 1))
+    columns.extend("slots_" + str(level) for level in range(1, MAX_SPELL_LEVEL + 1))
+    columns.append("racial_spells")
+    return tuple(columns)
+
+
+CSV_COLUMNS = _get_csv_columns()
+
+
+# Function which returns the record of a character sheet: a dictionary of plain values
+# (strings, numbers, booleans, None, lists and dictionaries) which can be written as JSON.
+def sheet_to_record(sheet) -> {}:
+    scores = sheet.get_ability_scores() or ()
+    modifiers = sheet.get_ability_modifiers() or ()
+    saves = sheet.get_saving_throw_scores() or ()
+    save_profs = sheet.get_saving_throw_prof() or ()
+    skills = sheet.get_skill_scores() or ()
+    skill_profs = sheet.get_skill_prof() or ()
+    alignment = sheet.get_alignment()
+    gender = sheet.get_gender()
+    money = sheet.get_money() or ()
+
+    abilities = {}
+    for i in range(len(scores)):
+        abilities[ABILITY_KEYS[i]] = {"score": scores[i],
+                                      "modifier": modifiers[i],
+                                      "save": saves[i] if i < len(saves) else None,
+                                      "save_proficient": gen.ABILITY_NAMES[i] in save_profs}
+    skill_entries = {}
+    for i in range(len(skills)):
+        skill_entries[SKILL_KEYS[i]] = {"score": skills[i],
+                                        "proficient": gen.SKILL_NAMES[i] in skill_profs}
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "name": sheet.get_name(),
+        "gender": str(gender) if gender is not None else None,
+        "age": sheet.get_age(),
+        "race": sheet.get_race_name(),
+        "class": sheet.get_class_name(),
+        "archetype": sheet.get_archetype_name() or None,
+        "background": sheet.get_background_name(),
+        "alignment": str(alignment) if alignment is not None else None,
+        "level": sheet.get_level(),
+        "hit_points": sheet.get_hit_points(),
+        "hit_die": sheet.get_hit_die(),
+        "armor_class": sheet.get_armor_class(),
+        "initiative": sheet.get_initiative(),
+        "speed": sheet.get_speed(),
+        "proficiency_bonus": sheet.get_prof_bonus(),
+        "passive_wisdom": sheet.get_passive_wisdom(),
+        "abilities": abilities,
+        "skills": skill_entries,
+        "languages": list(sheet.get_languages() or ()),
+        "proficiencies": list(sheet.get_all_proficiencies() or ()),
+        "equipment": list(sheet.get_equipment() or ()),
+        "armors": list(sheet.get_armors() or ()),
+        "weapons": [{"name": name, "attack_bonus": _get_int(bonus), "damage": damage}
+                    for name, bonus, damage in sheet.get_weapon_stats() or ()],
+        "money": {MONEY_NAMES[i]: money[i] for i in range(min(len(money), len(MONEY_NAMES)))},
+        "personality_trait": sheet.get_personality_trait(),
+        "ideal": sheet.get_ideal(),
+        "bond": sheet.get_bond(),
+        "flaw": sheet.get_flaw(),
+        "features": {"race": list(sheet.get_race_features() or ()),
+                     "background": list(sheet.get_bkgr_features() or ()),
+                     "class": list(sheet.get_class_features() or ())},
+        "attacks_and_spellcasting": list(sheet.get_attacks_and_spell_casting() or ()),
+        "spellcasting": _get_spellcasting(sheet),
+        "racial_spells": list(sheet.get_race_spells() or ())
+    }
+
+
+# Function which returns the spell casting part of a record, None if the character does
+# not cast spells from their class. Spells are listed by level starting with cantrips, and
+# slots by level starting at level 1 (None for levels without slots).
+def _get_spellcasting(sheet) -> {}:
+    casting_ability = sheet.get_casting_ability()
+    if casting_ability is None:
+        return None
+
+    prepared_or_known = sheet.get_prepared_or_known()
+    if prepared_or_known is not None and prepared_or_known.lower() == "p":
+        prepared_or_known = "prepared"
+    elif prepared_or_known is not None and prepared_or_known.lower() == "k":
+        prepared_or_known = "known"
+    else:
+        prepared_or_known = None
+    slots = sheet.get_class_spell_slots() or ()
+
+    return {"ability": casting_ability,
+            "prepared_or_known": prepared_or_known,
+            "save_dc": sheet.get_spell_save_dc(),
+            "attack_bonus": sheet.get_spell_attack_bonus(),
+            "spells": [list(spells) for spells in sheet.get_class_spells() or ()],
+            # Cantrips do not have slots so the first entry is skipped.
+            "slots": [slot if isinstance(slot, int) else None for slot in slots[1:]]}
+
+
+# Function which returns the CSV row of a record, in the order of CSV_COLUMNS. Lists are
+# joined by CSV_LIST_SEPARATOR and missing values are empty.
+def record_to_row(record: {}) -> []:
+    row = [record[key] for key in _SCALAR_KEYS]
+    for key in ABILITY_KEYS:
+        ability = record["abilities"].get(key)
+        if ability is None:
+            row.extend(("", "", "", ""))
+        else:
+            row.extend((ability["score"], ability["modifier"], _get_cell(ability["save"]),
+                        ability["save_proficient"]))
+    for key in SKILL_KEYS:
+        skill = record["skills"].get(key)
+        row.extend(("", "") if skill is None else (skill["score"], skill["proficient"]))
+    for key in ("languages", "proficiencies", "equipment", "armors"):
+        row.append(_join(record[key]))
+    row.append(_join(CSV_WEAPON_SEPARATOR.join((weapon["name"], str(weapon["attack_bonus"]),
+                                                weapon["damage"]))
+                     for weapon in record["weapons"]))
+    row.extend(_get_cell(record["money"].get(key)) for key in MONEY_NAMES)
+    for key in ("personality_trait", "ideal", "bond", "flaw"):
+        row.append(record[key])
+    for key in ("race", "background", "class"):
+        row.append(_join(record["features"][key]))
+    row.append(_join(record["attacks_and_spellcasting"]))
+
+    spellcasting = record["spellcasting"]
+    if spellcasting is None:
+        row.extend([""] * (4 + MAX_SPELL_LEVEL + 1 + MAX_SPELL_LEVEL))
+    else:
+        row.extend((spellcasting["ability"], _get_cell(spellcasting["prepared_or_known"]),
+                    spellcasting["save_dc"], spellcasting["attack_bonus"]))
+        spells = spellcasting["spells"]
+        row.extend(_join(spells[level]) if level < len(spells) else ""
+                   for level in range(MAX_SPELL_LEVEL + 1))
+        slots = spellcasting["slots"]
+        row.extend(_get_cell(slots[level]) if level < len(slots) else ""
+                   for level in range(MAX_SPELL_LEVEL))
+    row.append(_join(record["racial_spells"]))
+    return row
+
+
+# Class which writes character sheets to a text stream, one at a time, in one of FORMATS.
+# The CSV header is written along with the first sheet.
+class SheetWriter:
+
+    def __init__(self, stream, export_format=JSON_LINES_FORMAT):
+        if export_format not in FORMATS:
+            raise ValueError("Unknown format: " + str(export_format))
+        self._stream = stream
+        self._format = export_format
+        self._count = 0
+        self._csv_writer = csv.writer(stream) if export_format == CSV_FORMAT else None
+        # Every record has the same keys, so they do not need to be sorted.
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    # Function used to write a character sheet.
+    def write(self, sheet):
+        self.write_record(sheet_to_record(sheet))
+
+    # Function used to write a record made by sheet_to_record.
+    def write_record(self, record: {}):
+        if self._csv_writer is not None:
+            if self._count == 0:
+                self._csv_writer.writerow(CSV_COLUMNS)
+            self._csv_writer.writerow(record_to_row(record))
+        else:
+            self._stream.write(self._encoder.encode(record))
+            self._stream.write("\n")
+        self._count += 1
+
+    # Function which returns the number of sheets written.
+    def get_count(self) -> int:
+        return self._count
+
+
+# Function used to write every sheet of an iterable, as they come, to a file path or a text
+# stream (which is left open). Returns the number of sheets written.
+def export_sheets(sheets, out_file, export_format=JSON_LINES_FORMAT) -> int:
+    if hasattr(out_file, "write"):
+        output = nullcontext(out_file)
+    else:
+        output = open(out_file, "w", encoding="utf-8", newline="")
+
+    with output as output_stream:
+        writer = SheetWriter(output_stream, export_format)
+        for sheet in sheets:
+            writer.write(sheet)
+        return writer.get_count()
+
+
+def _get_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _get_cell(value):
+    return "" if value is None else value
+
+
+def _join(items) -> str:
+    return CSV_LIST_SEPARATOR.join(str(item) for item in items)
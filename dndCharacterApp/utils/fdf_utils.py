@@ -0,0 +1,76 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which writes the values of form fields as FDF or XFDF, the data files PDF readers use
+# to fill a form from outside of it. Only the values are written, along with the name of the
+# template they belong to, so a character takes a few KB next to the one shared template.
+# Does not need PyPDF2.
+# ----------------------------------------------------------------------------------------------- #
+
+from xml.sax.saxutils import escape, quoteattr
+
+FDF_FORMAT = "fdf"
+XFDF_FORMAT = "xfdf"
+FORMATS = (FDF_FORMAT, XFDF_FORMAT)
+# Value of a checked check box, any other value of a check box leaves it unchecked.
+CHECKED_VALUE = "/Yes"
+# Characters escaped in PDF literal strings.
+_STRING_ESCAPES = {ord("\\"): "\\\\", ord("("): "\\(", ord(")"): "\\)", ord("\r"): "\\r",
+                   ord("\n"): "\\n"}
+
+
+# Function used to write field values to a binary stream in the given format (one of FORMATS).
+# Template name is the file the values are meant for, button names are the fields which are
+# check boxes. Returns the number of bytes written.
+def write_fields(field_values: {}, stream, fdf_format=FDF_FORMAT, template_name=None,
+                 button_names=()) -> int:
+    if fdf_format == FDF_FORMAT:
+        return write_fdf(field_values, stream, template_name, button_names)
+    if fdf_format == XFDF_FORMAT:
+        return write_xfdf(field_values, stream, template_name, button_names)
+    raise ValueError("Unknown format: " + str(fdf_format))
+
+
+# Function used to write field values as an FDF file, returns the number of bytes written.
+def write_fdf(field_values: {}, stream, template_name=None, button_names=()) -> int:
+    parts = ["%FDF-1.2\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /FDF <<"]
+    if template_name is not None:
+        parts.append(" /F " + _pdf_string(template_name))
+    parts.append(" /Fields [\n")
+    for name, value in field_values.items():
+        if name in button_names:
+            value = "/Yes" if value == CHECKED_VALUE else "/Off"
+        else:
+            value = _pdf_string(str(value))
+        parts.append("<< /T " + _pdf_string(name) + " /V " + value + " >>\n")
+    parts.append("] >> >>\nendobj\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n")
+
+    # Strings are either ASCII or hex, only the header has other characters.
+    data = "".join(parts).encode("latin-1")
+    stream.write(data)
+    return len(data)
+
+
+# Function used to write field values as an XFDF file, returns the number of bytes written.
+def write_xfdf(field_values: {}, stream, template_name=None, button_names=()) -> int:
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             '<xfdf xmlns="http://ns.adobe.com/xfdf/" xml:space="preserve">\n']
+    if template_name is not None:
+        parts.append("<f href=" + quoteattr(template_name) + "/>\n")
+    parts.append("<fields>\n")
+    for name, value in field_values.items():
+        if name in button_names:
+            value = "Yes" if value == CHECKED_VALUE else "Off"
+        parts.append("<field name=" + quoteattr(name) + "><value>" + escape(str(value)) +
+                     "</value></field>\n")
+    parts.append("</fields>\n</xfdf>\n")
+
+    data = "".join(parts).encode("utf-8")
+    stream.write(data)
+    return len(data)
+
+
+# Helper function which returns a PDF string holding text: a literal string if the text is
+# ASCII, otherwise a hex string of the text in UTF-16 (with its byte order mark).
+def _pdf_string(text: str) -> str:
+    if text.isascii():
+        return "(" + text.translate(_STRING_ESCAPES) + ")"
+    return "<FEFF" + text.encode("utf-16-be").hex().upper() + ">"
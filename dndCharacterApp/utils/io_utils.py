@@ -4,10 +4,12 @@
 # Also contains a list of file paths used throughout the program.
 # ----------------------------------------------------------------------------------------------- #
 
-import openpyxl as pyxl
-from os.path import exists
-from openpyxl.worksheet.worksheet import Worksheet as worksheet
-from PyPDF2 import PdfWriter, PdfFileReader
+import threading
+import dndCharacterApp.utils.fdf_utils as fdf
+import dndCharacterApp.utils.pack_utils as pack
+from contextlib import nullcontext
+from os import stat
+from os.path import exists, abspath, basename
 
 # List of file paths
 FOLDER_EXTENSION = "C:/Users/Public/Documents/DndRandApp-Build-1-Python-8-11-2022/lib/"
@@ -106,34 +108,42 @@ PDF_BUTTON_SPELL_FIELDS = (
 			("Check Box 327", "Check Box 326", "Check Box 3079", "Check Box 3080", "Check Box 3081", "Check Box 3082", "Check Box 3083")
 			)
 PDF_FILE_PATH = "general/5E_CharacterSheet_Fillable.pdf"
+# Every field of the pdf which is a check box.
+_PDF_BUTTON_NAMES = frozenset(PDF_BUTTON_FIELD_NAMES).union(*PDF_BUTTON_SPELL_FIELDS)
+
+# Rules database (see db_utils) which get_col and get_row query instead of the sheets,
+# None if the sheets are read directly.
+_RULES_DATABASE = None
+
+
+# Function used to set the rules database that get_col and get_row will query.
+# None can be given to go back to reading the sheets directly.
+def use_rules_database(database):
+    global _RULES_DATABASE
+    _RULES_DATABASE = database
+
+
+# Function which returns the rules database in use, so its indexed lookups can be used
+# instead of whole columns. None if the sheets are read directly.
+def get_rules_database():
+    return _RULES_DATABASE
 
 
 # Function gets the contents of a column given either the name of the first element
 # in that column or an index.
-# If a string is given as an argument then a binary/linear search is preformed whether
-# the file is sorted or not to find its index
+# If a string is given as an argument its index is found through the sheet's header index,
+# so whether the file is sorted or not (isSorted) no longer affects the lookup.
 def get_col(elementOrIndex, file_path: str, isSorted: bool) -> ():
-    # Absolute path is need to find the location of the resource folder
+    # Query the rules database instead of the sheet if one is in use.
+    if _RULES_DATABASE is not None:
+        return _RULES_DATABASE.get_col(elementOrIndex, file_path)
 
-    # If program is running from IDE use folder in project folder
-    path = "lib/" + file_path
-    if (exists(path)):
-        absolute_path = "lib/" + file_path
-    # Use external folder
-    else:
-        absolute_path = FOLDER_EXTENSION + file_path
-
-    sheet = _get_excel_sheet(absolute_path)
+    sheet = _get_excel_sheet(_get_absolute_path(file_path))
 
     if sheet is not None:
         # Get the index if the argument is a String
         if isinstance(elementOrIndex, str):
-            # Row is retrieved to search through first entries of all columns
-            row_Contents = _get_row_contents(sheet, 1)
-            # Get index
-            elementOrIndex = \
-                _get_index_binary_search(elementOrIndex, row_Contents) if isSorted \
-                    else _get_index(elementOrIndex, row_Contents)
+            elementOrIndex = sheet.header_index.get(elementOrIndex.lower(), -1)
 
         if elementOrIndex != -1:
             return _get_column_contents(sheet, elementOrIndex)
@@ -143,194 +153,387 @@ def get_col(elementOrIndex, file_path: str, isSorted: bool) -> ():
 
 # Function gets the contents of a row given an index and a file name.
 def get_row(index: int, file_path: str):
-    # Absolute path is need to find the location of the resource folder
-    absolute_path = FOLDER_EXTENSION + file_path
-    sheet = _get_excel_sheet(absolute_path)
+    if _RULES_DATABASE is not None:
+        return _RULES_DATABASE.get_row(index, file_path)
+
+    sheet = _get_excel_sheet(_get_absolute_path(file_path))
 
     if sheet is not None:
         return _get_row_contents(sheet, index)
 
 
+# Function gets every row of a sheet given its file name, empty cells are kept as None.
+def get_rows(file_path: str) -> ():
+    if _RULES_DATABASE is not None:
+        return _RULES_DATABASE.get_rows(file_path)
+
+    sheet = _get_excel_sheet(_get_absolute_path(file_path))
+
+    if sheet is not None:
+        return sheet.rows
+    return None
+
+
+# Function used to get the absolute path of a resource given its path inside the
+# lib folder.
+def _get_absolute_path(file_path: str) -> str:
+    # If program is running from IDE use folder in project folder
+    path = "lib/" + file_path
+    if exists(path):
+        return abspath(path)
+    # Use external folder
+    return abspath(FOLDER_EXTENSION + file_path)
+
+
+# Function used to get the absolute path of the lib folder itself.
+def get_lib_folder() -> str:
+    if exists("lib/"):
+        return abspath("lib/")
+    return abspath(FOLDER_EXTENSION)
+
+
+# Class which holds the contents of a parsed Excel sheet so the workbook does not
+# need to be opened again. Rows keep their empty cells while columns do not, mirroring
+# what was read from the worksheet itself.
+# The header index maps the lowercase first entry of each column to its index
+# (starting at 1), the first column wins if two share the same entry.
+class _SheetContents:
+
+    def __init__(self, rows: ()):
+        self.rows = rows
+        self.max_row = len(rows)
+        self.max_column = len(rows[0]) if len(rows) > 0 else 0
+        # Do not add to the columns if the cell is empty.
+        self.columns = tuple(tuple(row[i] for row in self.rows if row[i] is not None)
+                             for i in range(self.max_column))
+        self.header_index = {}
+        if self.max_row > 0:
+            for i in range(self.max_column):
+                header = self.rows[0][i]
+                if header is not None:
+                    self.header_index.setdefault(str(header).lower(), i + 1)
+
+
+# Cache of every sheet parsed by the program, keyed by the sheet's absolute path.
+# Each entry holds the file's modification time when it was read, so an edited file
+# is parsed again.
+_SHEET_CACHE = {}
+_SHEET_CACHE_LOCK = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+# Compiled rules pack of the lib folder, loaded on the first cache miss.
+# Keyed by each sheet's absolute path and holds the file's modification time when
+# the pack was checked along with its rows.
+_RULES_PACK = None
+_RULES_PACK_LOCK = threading.Lock()
+
+
 # Function used to get an Excel sheet from a given file.
 # None is returned if any exception occurs.
-def _get_excel_sheet(file_path: str) -> worksheet:
+def _get_excel_sheet(file_path: str) -> _SheetContents:
+    global _cache_hits, _cache_misses
+
+    try:
+        mtime = stat(file_path).st_mtime_ns
+    except OSError:
+        invalidate_cache(file_path)
+        return None
+
+    with _SHEET_CACHE_LOCK:
+        entry = _SHEET_CACHE.get(file_path)
+        if entry is not None and entry[0] == mtime:
+            _cache_hits += 1
+            return entry[1]
+        _cache_misses += 1
+
+    # Parse the workbook outside of the lock so other files may still be read.
+    sheet = _load_excel_sheet(file_path, mtime)
+    if sheet is not None:
+        with _SHEET_CACHE_LOCK:
+            _SHEET_CACHE[file_path] = (mtime, sheet)
+    return sheet
+
+
+# Function used to read a sheet, either from the compiled rules pack or if the pack
+# does not hold the current version of the file from the workbook itself.
+# None is returned if any exception occurs.
+def _load_excel_sheet(file_path: str, mtime: int) -> _SheetContents:
+    packed = _get_rules_pack().get(file_path)
+    if packed is not None and packed[0] == mtime:
+        return _SheetContents(packed[1])
+
     # First try to open the workbook if successful,
     # Return the sheet and then close the workbook after.
     try:
-        wb = pyxl.load_workbook(file_path)
-        sheet = wb.active
-        wb.close()
-        return sheet
+        return _SheetContents(pack.read_workbook_rows(file_path))
     except FileNotFoundError:
         return None
     except IOError:
         return None
 
 
-# Function used to get the contents of a specific row given a worksheet and
+# Function which returns the compiled rules pack of the lib folder, building it
+# if it is missing or stale. An empty dictionary is returned if no pack is available.
+def _get_rules_pack() -> {}:
+    global _RULES_PACK
+
+    with _RULES_PACK_LOCK:
+        if _RULES_PACK is None:
+            lib_folder = get_lib_folder()
+            _RULES_PACK = _index_rules_pack(lib_folder, pack.load_or_build_pack(lib_folder))
+        return _RULES_PACK
+
+
+# Function used to set the compiled rules pack of the lib folder given its sheets (each
+# sheet's path relative to the lib folder and its rows), such as a pack the warm up built.
+def set_rules_pack(sheets: {}):
+    global _RULES_PACK
+    rules_pack = _index_rules_pack(get_lib_folder(), sheets)
+    with _RULES_PACK_LOCK:
+        _RULES_PACK = rules_pack
+
+
+# Helper function which keys the sheets of a pack by their absolute path along with the
+# modification time of their file.
+def _index_rules_pack(lib_folder: str, sheets: {}) -> {}:
+    rules_pack = {}
+    if sheets is not None:
+        for relative_path, rows in sheets.items():
+            absolute_path = abspath(lib_folder + "/" + relative_path)
+            try:
+                rules_pack[absolute_path] = (stat(absolute_path).st_mtime_ns, rows)
+            except OSError:
+                pass
+    return rules_pack
+
+
+# Function used to remove sheets from the cache so they are read again on next use.
+# Either a path inside the lib folder, an absolute path or None (for every sheet)
+# can be given.
+def invalidate_cache(file_path=None):
+    with _SHEET_CACHE_LOCK:
+        if file_path is None:
+            _SHEET_CACHE.clear()
+        else:
+            _SHEET_CACHE.pop(file_path, None)
+            _SHEET_CACHE.pop(_get_absolute_path(file_path), None)
+
+
+# Function used to drop the compiled rules pack so it is checked (and rebuilt if stale)
+# on the next cache miss.
+def invalidate_rules_pack():
+    global _RULES_PACK
+    with _RULES_PACK_LOCK:
+        _RULES_PACK = None
+
+
+# Function which returns the number of cache hits, misses and sheets currently
+# held by the cache.
+def get_cache_stats() -> {}:
+    with _SHEET_CACHE_LOCK:
+        return {"hits": _cache_hits, "misses": _cache_misses, "entries": len(_SHEET_CACHE)}
+
+
+# Function used to reset the cache's hit and miss counters.
+def reset_cache_stats():
+    global _cache_hits, _cache_misses
+    with _SHEET_CACHE_LOCK:
+        _cache_hits = 0
+        _cache_misses = 0
+
+
+# Function used to get the contents of a specific row given a sheet and
 # index. Indexing begins at 1 instead of 0.
 # Returns a tuple containing the contents of said row.
-def _get_row_contents(sheet: worksheet, index: int) -> ():
+def _get_row_contents(sheet: _SheetContents, index: int) -> ():
     # openpyxl has rows and columns reversed for some reason.
-    max_row = sheet.max_column
-    row = []
-
-    if index > max_row:
+    if index > sheet.max_column:
         return None
+    # Rows past the end of the sheet only contain empty cells.
+    if index > sheet.max_row:
+        return tuple(None for i in range(index, sheet.max_column + 1))
 
-    for i in range(index, max_row + 1):
-        cell = sheet.cell(row=index, column=i)
-        # Do not add to the list if the cell is empty.
-        if cell is not None:
-            # Convert all numeric values to an integer
-            if isinstance(cell.value, float):
-                row.append(int(cell.value))
-            else:
-                row.append(cell.value)
+    return sheet.rows[index - 1][index - 1:]
 
-    return tuple(row)
 
-
-# Function used to get the contents of a specific column given a worksheet and
+# Function used to get the contents of a specific column given a sheet and
 # index. Indexing begins at 1 instead of 0.
 # Returns a tuple containing the contents of said column.
-def _get_column_contents(sheet: worksheet, index: int) -> ():
-    # openpyxl has rows and columns reversed for some reason.
-    max_column = sheet.max_row
-    column = []
-
-    for i in range(1, max_column + 1):
-        cell = sheet.cell(row=i, column=index)
-        # Do not add to the list if the cell is empty.
-        if cell is not None and cell.value is not None:
-            # Convert all numeric values to an integer
-            if isinstance(cell.value, float):
-                column.append(int(cell.value))
-            else:
-                column.append(cell.value)
-
-    return tuple(column)
-
-
-# Function used to linearly search for an index in a tuple for a given element
-# -1 is returned if the element is not in the tuple
-def _get_index(element: str, contents: ()) -> int:
-    for i in range(len(contents)):
-        if str(contents[i]).lower() == element.lower():
-            return i + 1
-    return -1
-
-
-# Function used preform a binary search for an index in a tuple for a given element
-# -1 is returned if the element is not in the tuple
-def _get_index_binary_search(element: str, contents: ()) -> int:
-    low = 0
-    high = len(contents) - 1
-
-    while low <= high:
-        guess_index = int(low + ((high - low) / 2))
-        guess = contents[guess_index]
-
-        if str(guess).lower() < element.lower():
-            low = guess_index + 1
-        elif str(guess).lower() > element.lower():
-            high = guess_index - 1
+def _get_column_contents(sheet: _SheetContents, index: int) -> ():
+    if index < 1 or index > sheet.max_column:
+        return ()
+
+    return sheet.columns[index - 1]
+
+
+# Form filler (see pdf_utils) holding the parsed character sheet template, it is only
+# made the first time a sheet is created.
+_FORM_FILLER = None
+_FORM_FILLER_LOCK = threading.Lock()
+
+
+# Function which returns the form filler of the character sheet template, None is
+# returned if the template could not be read.
+def get_form_filler():
+    global _FORM_FILLER
+
+    with _FORM_FILLER_LOCK:
+        if _FORM_FILLER is None:
+            # Only import PyPDF2 when a pdf is actually made.
+            import dndCharacterApp.utils.pdf_utils as pdf_utils
+            try:
+                _FORM_FILLER = pdf_utils.PdfFormFiller(_get_absolute_path(PDF_FILE_PATH), 2)
+            except (PermissionError, FileNotFoundError):
+                return None
+        return _FORM_FILLER
+
+
+# Function which collects the value of every field of a complete character sheet.
+# Returns a tuple with a mapping of field name to value for each page of the pdf.
+def get_sheet_field_values(string_field_contents: (), button_field_contents: (), spells: (),
+                           spell_slots: (), prepared_known_caster: str) -> ():
+    pages = ({}, {})
+
+    # Set proper page number which fields will be accessed by
+    page_num = 0
+
+    # Write the string values to the fields mostly on page 1.
+    for i in range(len(PDF_STR_FIELD_NAMES)):
+        # Last section of field names is on second page
+        if PDF_STR_FIELD_NAMES[i] == "Spellcasting Class 2":
+            page_num = 1
+        pages[page_num][PDF_STR_FIELD_NAMES[i]] = string_field_contents[i]
+
+    page_num = 0
+    # Set radio buttons to proper settings on the first page
+    for i in range(len(PDF_BUTTON_FIELD_NAMES)):
+        # Value for a selected radio button is "/Yes"
+        if button_field_contents[i]:
+            value = "/Yes"
         else:
-            return guess_index + 1
+            value = ""
+        pages[page_num][PDF_BUTTON_FIELD_NAMES[i]] = value
+
+    page_num = 1
+
+    # Fill the character's spells if they are a caster.
+    if spells is not None and spell_slots is not None:
+        # Get max level spell that the character can cast
+        spell_level_length = len(spells)
+
+        for i in range(len(PDF_STR_SPELL_FIELDS)):
+            # Stop writing if max spell has been exceeded.
+            if i >= spell_level_length:
+                break
+
+            # Get length of the list of spells the character can cast for that
+            # spell level
+            len_spells = len(spells[i])
+
+            for j in range(len(PDF_STR_SPELL_FIELDS[i])):
+                # Stop writing if the list has ended.
+                if j >= len_spells:
+                    break
+                pages[page_num][PDF_STR_SPELL_FIELDS[i][j]] = spells[i][j]
+                # Check the radio buttons for prepared casters
+                if i != 0 and prepared_known_caster.lower() == "p":
+                    pages[page_num][PDF_BUTTON_SPELL_FIELDS[i - 1][j]] = "/Yes"
+        # Get the max number of spells the caster has access to.
+        slot_length = len(spell_slots)
+        for i in range(len(PDF_STR_SPELL_SLOT_FIELDS)):
+            # Stop writing if max spell has been exceeded.
+            # Cantrips (0-level) spells do not have slots so skip the first entry.
+            if i + 1 >= slot_length:
+                break
+            pages[page_num][PDF_STR_SPELL_SLOT_FIELDS[i]] = str(spell_slots[i + 1])
+
+    return pages
 
-    return -1
 
 # Function used to fill pdf with information gathered from a complete character sheet.
+# The out file is either a file path or a binary stream (anything with a write method such as
+# an open file, io.BytesIO, a socket file or sys.stdout.buffer), streams are left open.
+# The pdf mode is how it is written, one of pdf_utils.WRITE_MODES: "full", "incremental"
+# (the template followed by only the fields that changed) or "compressed" (smallest files).
 # A boolean is returned to notify the sender of the success.
-def create_character_sheet(string_field_contents: (), button_field_contents:(), spells: (),
-                           spell_slots: (), prepared_known_caster: str, out_file: str) -> bool:
-    # Absolute path of file is specified
-    absolute_path = FOLDER_EXTENSION + PDF_FILE_PATH
-
+def create_character_sheet(string_field_contents: (), button_field_contents: (), spells: (),
+                           spell_slots: (), prepared_known_caster: str, out_file,
+                           pdf_mode="full") -> bool:
     # If the pdf can be opened continue writing to it, if not return false.
-    try:
-        pdf = PdfFileReader(open(absolute_path, 'rb'))
-    except (PermissionError, FileNotFoundError):
-        pdf = None
-
-    if pdf is not None:
-        # Create a new pdf to be written to using the base provided,
-        # add all the necessary pages, in this case two.
-        wr = PdfWriter()
-        for i in range(2):
-            page = pdf.pages[i]
-            wr.addPage(page)
-
-        # Set proper page number which fields will be accessed by
-        page_num = 0
-
-        # Write the string values to the fields mostly on page 1.
-        for i in range(len(PDF_STR_FIELD_NAMES)):
-            # Last section of field names is on second page
-            if PDF_STR_FIELD_NAMES[i] == "Spellcasting Class 2":
-                page_num = 1
-
-            wr.update_page_form_field_values(
-                wr.pages[page_num], {PDF_STR_FIELD_NAMES[i]: string_field_contents[i]}
-            )
-        page_num = 0
-        # Set radio buttons to proper settings on the first page
-        for i in range(len(PDF_BUTTON_FIELD_NAMES)):
-            # Value for a selected radio button is "/Yes"
-            if button_field_contents[i]:
-                value = "/Yes"
-            else:
-                value = ""
-            wr.update_page_form_field_values(
-                wr.pages[page_num], {PDF_BUTTON_FIELD_NAMES[i]: value}
-            )
-
-        page_num = 1
-
-        # Fill the character's spells if they are a caster.
-        if spells is not None and spell_slots is not None:
-            # Get max level spell that the character can cast
-            spell_level_length = len(spells)
-
-            for i in range(len(PDF_STR_SPELL_FIELDS)):
-                # Stop writing if max spell has been exceeded.
-                if i >= spell_level_length:
-                    break
+    filler = get_form_filler()
 
-                # Get length of the list of spells the character can cast for that
-                # spell level
-                len_spells = len(spells[i])
-
-                for j in range(len(PDF_STR_SPELL_FIELDS[i])):
-                    # Stop writing if the list has ended.
-                    if j >= len_spells:
-                        break
-                    wr.update_page_form_field_values(
-                        wr.pages[page_num], {PDF_STR_SPELL_FIELDS[i][j]: spells[i][j]}
-                    )
-                    # Check the radio buttons for prepared casters
-                    if i != 0 and prepared_known_caster.lower() == "p":
-                        wr.update_page_form_field_values(
-                            wr.pages[page_num], {PDF_BUTTON_SPELL_FIELDS[i - 1][j]: "/Yes"}
-                        )
-            # Get the max number of spells the caster has access to.
-            slot_length = len(spell_slots)
-            for i in range(len(PDF_STR_SPELL_SLOT_FIELDS)):
-                # Stop writing if max spell has been exceeded.
-                # Cantrips (0-level) spells do not have slots so skip the first entry.
-                if i + 1 >= slot_length:
-                    break
-                wr.update_page_form_field_values(
-                    wr.pages[page_num], {PDF_STR_SPELL_SLOT_FIELDS[i]: str(spell_slots[i + 1])}
-                )
+    if filler is not None:
+        # Create a new pdf to be written to using the base provided, which has
+        # all the necessary pages, in this case two.
+        wr = filler.new_document()
+
+        # Every value of a page is set in a single pass.
+        pages = get_sheet_field_values(string_field_contents, button_field_contents, spells,
+                                       spell_slots, prepared_known_caster)
+        for page_num in range(len(pages)):
+            wr.update_page_form_field_values(page_num, pages[page_num])
 
         # Write the contents to the given destination
         if out_file is not None:
-            with open(out_file, "wb") as output_stream:
-                wr.write(output_stream)
+            with _open_output(out_file) as output_stream:
+                wr.write(output_stream, pdf_mode)
         else:
             return False
 
         return True
     else:
         return False
+
+
+# Function used to write only the field values of a complete character sheet, as FDF or XFDF
+# (one of fdf_utils.FORMATS), instead of a whole pdf. The file opens with the character sheet
+# template, found by the template name (the name of the template file if None).
+# As with create_character_sheet the out file is either a file path or a binary stream.
+# A boolean is returned to notify the sender of the success.
+def create_character_data(string_field_contents: (), button_field_contents: (), spells: (),
+                          spell_slots: (), prepared_known_caster: str, out_file,
+                          fdf_format="fdf", template_name=None) -> bool:
+    if out_file is None:
+        return False
+
+    field_values = {}
+    for page in get_sheet_field_values(string_field_contents, button_field_contents, spells,
+                                       spell_slots, prepared_known_caster):
+        field_values.update(page)
+    if template_name is None:
+        template_name = basename(PDF_FILE_PATH)
+
+    with _open_output(out_file) as output_stream:
+        fdf.write_fields(field_values, output_stream, fdf_format, template_name,
+                         _PDF_BUTTON_NAMES)
+    return True
+
+
+# Function used to fill a single pdf with many character sheets, each with its own two pages.
+# Characters is an iterable with the field values of each character's pages (see
+# get_sheet_field_values), each is written as it comes so only one is held at a time.
+# The fields of each character are kept under its name (character_N, counting from 0, if no
+# names are given) such as "character_0.ClassLevel". As with create_character_sheet the
+# out file is either a file path or a binary stream.
+# A boolean is returned to notify the sender of the success.
+def create_party_pack(characters, out_file, names=None) -> bool:
+    filler = get_form_filler()
+
+    if filler is not None and out_file is not None:
+        with _open_output(out_file) as output_stream:
+            party_pack = filler.new_party_pack(output_stream)
+            for i, pages in enumerate(characters):
+                party_pack.add_character(pages, names[i] if names is not None else None)
+            party_pack.close()
+        return True
+    else:
+        return False
+
+
+# Helper function which returns the binary stream to write to given a file path or a stream,
+# a stream given is not closed when done.
+def _open_output(out_file):
+    if hasattr(out_file, "write"):
+        return nullcontext(out_file)
+    return open(out_file, "wb")
@@ -188,30 +188,23 @@ def get_armor_class(dexterity_score: int, armors: []) -> int:
 
     # Apply bonuses to ac for every piece of armor
     for armor in armors:
-        # Get the armor's stats
-        armor_stats = io.get_col(armor, io.ARMOR_STATS_FILE_PATH, True)
-        # Continue if successful return -1 if not
-        if armor_stats is not None:
-            add_dex = armor_stats[2].split("=")
-        else:
+        # Get the armor's stats, return -1 if it could not be found
+        armor_stats = _get_armor_stats(armor)
+        if armor_stats is None:
             return -1
+        base_ac, add_dex, dex_limit = armor_stats
 
         # If you can add your dexterity mod continue here
-        if add_dex[0].lower() == "true":
-            # If there is a limit to the amount of your mod you can add continue here
-            if add_dex[1].lower() == "true":
-                # If the dex bonus is greater then the limit, add the stats and limit to ac
-                if int(add_dex[2]) < dex_bonus:
-                    armor_class += armor_stats[1] + int(add_dex[2])
-                # Otherwise add your dex mod and stats to ac
-                else:
-                    armor_class += armor_stats[1] + dex_bonus
+        if add_dex:
+            # If the dex bonus is greater then the limit, add the stats and limit to ac
+            if dex_limit is not None and dex_limit < dex_bonus:
+                armor_class += base_ac + dex_limit
             # Otherwise add your dex mod and stats to ac
             else:
-                armor_class += armor_stats[1] + dex_bonus
+                armor_class += base_ac + dex_bonus
         # Otherwise just add the stats of the armor to the ac
         else:
-            armor_class += armor_stats[1]
+            armor_class += base_ac
 
     # If the character is only carrying a shield then add the dex bonus and 10 to the ac
     if len(armors) == 1 and armors[0] == "Shield":
@@ -224,15 +217,16 @@ def get_armor_class(dexterity_score: int, armors: []) -> int:
 def get_attack_bonus(strength_score: int, dexterity_score: int, prof_bonus: int,
                      weapon: str) -> int:
 
-    weapon_stats = io.get_col(weapon, io.WEAPONS_STATS_FILE_PATH, True)
+    weapon_stats = _get_weapon_stats(weapon)
 
     if weapon_stats is not None:
+        ranged, finesse = weapon_stats
         ability_mod = 0
         # If the weapon is ranged then use the dex score to calculate ab
-        if weapon_stats[2].split("=")[0].lower() == "true":
+        if ranged:
             ability_mod = get_ability_mod(dexterity_score)
         # If the weapon has the finesse use either dex or str score which ever is higher
-        elif weapon_stats[3].split("=")[0].lower() == "true":
+        elif finesse:
             if (dexterity_score > strength_score):
                 ability_mod = get_ability_mod(dexterity_score)
             else:
@@ -246,6 +240,38 @@ def get_attack_bonus(strength_score: int, dexterity_score: int, prof_bonus: int,
 
     return ability_mod + prof_bonus
 
+# Helper function which returns the base ac of an armor, whether the dexterity mod is added
+# to it and the limit of that mod (None if there is none). The indexed rules database is
+# queried when it is in use. None is returned if the armor could not be found.
+def _get_armor_stats(armor: str) -> ():
+    database = io.get_rules_database()
+    if database is not None:
+        armor_stats = database.get_armor(armor)
+        return armor_stats[1:4] if armor_stats is not None else None
+
+    armor_stats = io.get_col(armor, io.ARMOR_STATS_FILE_PATH, True)
+    if armor_stats is None:
+        return None
+    add_dex = armor_stats[2].split("=")
+    dex_limit = int(add_dex[2]) if len(add_dex) > 2 and add_dex[1].lower() == "true" else None
+    return armor_stats[1], add_dex[0].lower() == "true", dex_limit
+
+# Helper function which returns whether a weapon is ranged and whether it has finesse.
+# The indexed rules database is queried when it is in use. None is returned if the weapon
+# could not be found.
+def _get_weapon_stats(weapon: str) -> ():
+    database = io.get_rules_database()
+    if database is not None:
+        weapon_stats = database.get_weapon(weapon)
+        return (bool(weapon_stats[3]), bool(weapon_stats[4])) if weapon_stats is not None \
+            else None
+
+    weapon_stats = io.get_col(weapon, io.WEAPONS_STATS_FILE_PATH, True)
+    if weapon_stats is None:
+        return None
+    return weapon_stats[2].split("=")[0].lower() == "true", \
+        weapon_stats[3].split("=")[0].lower() == "true"
+
 # Function which calculates a character's spell attack bonus given their casting ability,
 # ability scores and their proficiency bonus. -1 is returned if there is any formatting errors.
 def get_spell_attack_bonus(ability_scores: [], casting_ability: str, prof_bonus:int) -> int:
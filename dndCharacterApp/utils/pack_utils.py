@@ -0,0 +1,187 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which compiles every workbook found in the lib folder into a single versioned binary
+# pack so the program does not need to import openpyxl and parse each workbook at runtime.
+# The pack holds the hash of the workbooks it was compiled from along with the size and
+# modification time of each, the workbooks are only hashed again when those have changed.
+# Run as a script to (re)build the pack:
+#       python -m dndCharacterApp.utils.pack_utils [lib folder]
+# ----------------------------------------------------------------------------------------------- #
+
+import hashlib
+import pickle
+import struct
+import sys
+from os import listdir, replace, stat
+from os.path import isdir, join
+
+# Name of the pack file which is stored at the top of the lib folder.
+PACK_FILE_NAME = "rules.pack"
+# Version of the pack's layout, packs of a different version are rebuilt.
+PACK_FORMAT_VERSION = 2
+# Folders of the lib folder which contain the workbooks used by the program.
+PACK_FOLDERS = ("races", "backgrounds", "classes", "items", "general")
+_PACK_MAGIC = b"DNDPACK\n"
+_PACK_HEADER = struct.Struct(">8sH32s")
+
+
+# Function used to read the active sheet of a workbook given its absolute path.
+# Returns a tuple containing every row of the sheet, empty cells are kept as None
+# and all numeric values are converted to an integer.
+def read_workbook_rows(file_path: str) -> ():
+    # Only import openpyxl when a workbook actually needs to be parsed.
+    import openpyxl as pyxl
+
+    wb = pyxl.load_workbook(file_path)
+    sheet = wb.active
+    rows = []
+    for row in sheet.iter_rows(min_row=1, max_row=sheet.max_row,
+                               max_col=sheet.max_column, values_only=True):
+        rows.append(tuple(int(value) if isinstance(value, float) else value
+                          for value in row))
+    wb.close()
+    return tuple(rows)
+
+
+# Function which returns the path (relative to the lib folder) of every workbook
+# that belongs in the pack, sorted so the pack's contents are always in the same order.
+def find_workbooks(lib_path: str) -> ():
+    workbooks = []
+    for folder in PACK_FOLDERS:
+        _find_workbooks_in_folder(lib_path, folder, workbooks)
+    return tuple(sorted(workbooks))
+
+
+# Helper function used to recursively search a folder for workbooks.
+def _find_workbooks_in_folder(lib_path: str, folder: str, workbooks: []):
+    absolute_folder = join(lib_path, folder)
+    if not isdir(absolute_folder):
+        return
+    for name in listdir(absolute_folder):
+        relative_path = folder + "/" + name
+        if isdir(join(lib_path, relative_path)):
+            _find_workbooks_in_folder(lib_path, relative_path, workbooks)
+        elif name.lower().endswith(".xlsx") and not name.startswith("~$"):
+            workbooks.append(relative_path)
+
+
+# Function which returns a hash of the name and contents of every given workbook.
+# A pack whose hash does not match the current workbooks is stale.
+def get_content_hash(lib_path: str, workbooks: ()) -> bytes:
+    content_hash = hashlib.sha256()
+    for relative_path in workbooks:
+        with open(join(lib_path, relative_path), "rb") as workbook:
+            contents = workbook.read()
+        content_hash.update(relative_path.encode("utf-8") + b"\0")
+        content_hash.update(struct.pack(">Q", len(contents)))
+        content_hash.update(contents)
+    return content_hash.digest()
+
+
+# Function which returns the size and modification time of every given workbook, keyed
+# by its path.
+def get_file_stats(lib_path: str, workbooks: ()) -> {}:
+    file_stats = {}
+    for relative_path in workbooks:
+        file_stat = stat(join(lib_path, relative_path))
+        file_stats[relative_path] = (file_stat.st_size, file_stat.st_mtime_ns)
+    return file_stats
+
+
+# Function used to parse every workbook of the lib folder.
+# Returns a dictionary of each workbook's relative path to its rows.
+def compile_workbooks(lib_path: str) -> {}:
+    sheets = {}
+    for relative_path in find_workbooks(lib_path):
+        sheets[relative_path] = read_workbook_rows(join(lib_path, relative_path))
+    return sheets
+
+
+# Function used to write compiled workbooks to a pack, the header of the pack
+# holds its version and the hash of the workbooks it was compiled from, followed by the
+# size and modification time of each workbook and then the workbooks themselves.
+def write_pack(lib_path: str, sheets: {}, pack_path=None):
+    if pack_path is None:
+        pack_path = join(lib_path, PACK_FILE_NAME)
+
+    workbooks = tuple(sorted(sheets.keys()))
+    file_stats = get_file_stats(lib_path, workbooks)
+    header = _PACK_HEADER.pack(_PACK_MAGIC, PACK_FORMAT_VERSION,
+                               get_content_hash(lib_path, workbooks))
+    # Write to a temporary file first so a half written pack is never read.
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, "wb") as pack:
+        pack.write(header)
+        pickle.dump(file_stats, pack, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(sheets, pack, protocol=pickle.HIGHEST_PROTOCOL)
+    replace(temp_path, pack_path)
+
+
+# Function used to compile every workbook of the lib folder into a pack.
+# Returns the compiled workbooks, the same as load_pack.
+def build_pack(lib_path: str, pack_path=None) -> {}:
+    sheets = compile_workbooks(lib_path)
+    write_pack(lib_path, sheets, pack_path)
+    return sheets
+
+
+# Function used to read a pack. None is returned if the pack does not exist, is
+# of a different version or is stale compared to the workbooks in the lib folder.
+# The workbooks are only hashed if their sizes or modification times are not the ones
+# stored in the pack, a pack whose workbooks were only touched is then saved again with
+# their new times.
+def load_pack(lib_path: str, pack_path=None) -> {}:
+    if pack_path is None:
+        pack_path = join(lib_path, PACK_FILE_NAME)
+
+    try:
+        with open(pack_path, "rb") as pack:
+            magic, version, content_hash = _PACK_HEADER.unpack(pack.read(_PACK_HEADER.size))
+            if magic != _PACK_MAGIC or version != PACK_FORMAT_VERSION:
+                return None
+            workbooks = find_workbooks(lib_path)
+            file_stats = pickle.load(pack)
+            if file_stats == get_file_stats(lib_path, workbooks):
+                return pickle.load(pack)
+            if content_hash != get_content_hash(lib_path, workbooks):
+                return None
+            sheets = pickle.load(pack)
+    except (OSError, struct.error, pickle.UnpicklingError, EOFError):
+        return None
+
+    try:
+        write_pack(lib_path, sheets, pack_path)
+    except OSError:
+        pass
+    return sheets
+
+
+# Function which loads the pack of the lib folder, rebuilding it first if it is
+# missing or stale. None is returned if there is no usable pack and openpyxl is
+# not available to build one. A pack that can not be saved (read-only folder) is
+# still returned.
+def load_or_build_pack(lib_path: str, pack_path=None) -> {}:
+    sheets = load_pack(lib_path, pack_path)
+    if sheets is None:
+        try:
+            sheets = compile_workbooks(lib_path)
+        except ImportError:
+            return None
+        try:
+            write_pack(lib_path, sheets, pack_path)
+        except OSError:
+            pass
+    return sheets
+
+
+def main(args: []) -> int:
+    lib_path = args[0] if len(args) > 0 else "lib/"
+    if not isdir(lib_path):
+        print("Could not find the lib folder: " + lib_path)
+        return 1
+    sheets = build_pack(lib_path)
+    print("Packed " + str(len(sheets)) + " workbooks into " + join(lib_path, PACK_FILE_NAME))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
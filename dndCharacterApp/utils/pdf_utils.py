@@ -0,0 +1,748 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which fills the form fields of a PDF template. The template is parsed once: the objects
+# used by its pages are numbered and written to bytes ahead of time, along with an index of each
+# form field's annotations. A filled document then only needs to write the annotations whose
+# values changed, every other object is copied from the bytes of the template.
+# Documents are either written in full or as an incremental update: the template's bytes as they
+# are, followed by the changed annotations (with their template object numbers) and a new xref.
+# Party packs put many filled copies of the pages in one document, sharing everything else.
+# Compressed documents drop what a filled sheet does not use (thumbnails, metadata, structure)
+# and compress the rest: streams with Flate, other objects into object streams.
+# ----------------------------------------------------------------------------------------------- #
+
+import re
+import threading
+import zlib
+from array import array
+from collections import ChainMap
+from io import BytesIO
+from typing import NamedTuple
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, BooleanObject, DictionaryObject, IndirectObject, \
+    NameObject, PdfObject, StreamObject, TextStringObject
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+# Ways a filled document can be written.
+WRITE_FULL = "full"
+WRITE_INCREMENTAL = "incremental"
+WRITE_COMPRESSED = "compressed"
+WRITE_MODES = (WRITE_FULL, WRITE_INCREMENTAL, WRITE_COMPRESSED)
+# Value of a checked check box, any other value leaves it unchecked.
+CHECKED_VALUE = "/Yes"
+UNCHECKED_VALUE = "/Off"
+# Attributes a page can inherit from the page tree it belongs to.
+_INHERITED_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Keys dropped from compressed documents: page thumbnails, XMP metadata, application data and
+# entries of the template's structure tree, which is not kept.
+_UNUSED_KEYS = ("/Thumb", "/Metadata", "/PieceInfo", "/StructParent", "/StructParents")
+# Object numbers of the objects made for every document, the template's objects follow.
+_CATALOG_NUMBER = 1
+_PAGES_NUMBER = 2
+_ACROFORM_NUMBER = 3
+
+
+# Reference to an object of the filled document, used where the template's own reference
+# can not be kept (the parent of a page).
+class _Reference(PdfObject):
+
+    def __init__(self, number: int):
+        self.number = number
+
+    def write_to_stream(self, stream, encryption_key):
+        stream.write(_reference_bytes(self.number))
+
+
+# What every compressed document made from a template shares: the bytes of everything up to
+# the object stream of the fields, the numbers of the fields (in the order of that stream) and
+# their bytes, and the xref stream entries of every object but the xref stream itself.
+class _CompressedTemplate(NamedTuple):
+    prefix: bytes
+    field_numbers: tuple
+    field_bytes: dict
+    fields_number: int
+    xref_number: int
+    xref_entries: bytes
+
+
+# Class which holds a parsed PDF template and makes filled documents from it.
+class PdfFormFiller:
+
+    # Constructor for PdfFormFiller, only the first page count pages of the template
+    # are kept (every page if None).
+    def __init__(self, template_path: str, page_count=None):
+        with open(template_path, "rb") as template:
+            self._template_bytes = template.read()
+        reader = PdfReader(BytesIO(self._template_bytes))
+        template_root = reader.trailer["/Root"].get_object()
+
+        # Object number of each template object (by its id and generation) in the documents.
+        self._numbers = {}
+        # Template objects in the order they are written, starting after the acro form.
+        self._objects = []
+        self._page_numbers = []
+        # Field name to a list of (page index, object number, is parent field) entries.
+        self._field_index = {}
+        # For each page, field name to a list of (object number, is parent field) entries.
+        self._page_field_index = []
+        self._fields = []
+
+        pages = _get_pages(reader)
+        if page_count is not None:
+            pages = pages[:page_count]
+        for reference, page in pages:
+            self._page_numbers.append(self._add_object(reference, page))
+            self._page_field_index.append({})
+        for page_index in range(len(pages)):
+            self._collect(pages[page_index][1], skip_keys=("/Parent",))
+            self._index_fields(page_index, pages[page_index][1])
+
+        # The template's default appearance and resources are kept for the fields.
+        template_form = dict.get(template_root, "/AcroForm")
+        template_form = template_form.get_object() if template_form is not None else {}
+        self._acroform = DictionaryObject()
+        self._acroform[NameObject("/Fields")] = ArrayObject(
+            _Reference(number) for number in self._fields)
+        self._acroform[NameObject("/NeedAppearances")] = BooleanObject(True)
+        for key in ("/DA", "/DR"):
+            if key in template_form:
+                self._acroform[NameObject(key)] = dict.__getitem__(template_form, key)
+                self._collect(dict.__getitem__(template_form, key))
+
+        # Write every object that does not change between documents ahead of time.
+        self._object_bytes = {
+            _CATALOG_NUMBER: b"<< /Type /Catalog /Pages 2 0 R /AcroForm 3 0 R >>",
+            _PAGES_NUMBER: b"<< /Type /Pages /Kids [" +
+                           b" ".join(_reference_bytes(number) for number in self._page_numbers) +
+                           b"] /Count " + str(len(self._page_numbers)).encode() + b" >>",
+            _ACROFORM_NUMBER: self._serialize(self._acroform)
+        }
+        for number, obj in self._objects:
+            if number in self._page_numbers:
+                obj = DictionaryObject(obj)
+                obj[NameObject("/Parent")] = _Reference(_PAGES_NUMBER)
+            self._object_bytes[number] = self._serialize(obj)
+
+        self._objects_by_number = dict(self._objects)
+        self._set_incremental_update(reader, template_root)
+        # Made the first time a compressed document is written.
+        self._compressed = None
+        self._compressed_lock = threading.Lock()
+
+    # Function which returns the names of every field that can be filled.
+    def get_field_names(self) -> ():
+        return tuple(self._field_index.keys())
+
+    # Function which returns whether the template has a field with the given name.
+    def has_field(self, name: str) -> bool:
+        return name in self._field_index
+
+    # Function which returns the number of pages of the documents.
+    def get_page_count(self) -> int:
+        return len(self._page_numbers)
+
+    # Function which returns a new, empty, document made from the template.
+    def new_document(self):
+        return FilledDocument(self)
+
+    # Function which returns a party pack written to a binary stream, the pack's shared
+    # objects are written right away.
+    def new_party_pack(self, stream):
+        return PartyPackWriter(self, stream)
+
+    # Function used to write a document with the given field values to a binary stream,
+    # the mode is one of WRITE_MODES. Returns the number of bytes written.
+    def fill(self, field_values: {}, stream, mode=WRITE_FULL) -> int:
+        document = self.new_document()
+        document.update_form_field_values(field_values)
+        return document.write(stream, mode)
+
+    # Helper function which numbers a template object the first time it is seen.
+    def _add_object(self, reference: IndirectObject, obj) -> int:
+        key = (reference.idnum, reference.generation)
+        number = self._numbers.get(key)
+        if number is None:
+            number = _ACROFORM_NUMBER + 1 + len(self._objects)
+            self._numbers[key] = number
+            self._objects.append((number, obj))
+        return number
+
+    # Helper function which numbers every object referenced by an object.
+    def _collect(self, obj, skip_keys=()):
+        pending = [obj]
+        while len(pending) > 0:
+            obj = pending.pop()
+            if isinstance(obj, IndirectObject):
+                if (obj.idnum, obj.generation) in self._numbers:
+                    continue
+                resolved = obj.get_object()
+                self._add_object(obj, resolved)
+                pending.append(resolved)
+            elif isinstance(obj, DictionaryObject):
+                for key, value in dict.items(obj):
+                    if key not in skip_keys:
+                        pending.append(value)
+                skip_keys = ()
+            elif isinstance(obj, ArrayObject):
+                pending.extend(list.__iter__(obj))
+
+    # Helper function which adds the fields of a page's annotations to the index.
+    def _index_fields(self, page_index: int, page: DictionaryObject):
+        annotations = dict.get(page, "/Annots")
+        if annotations is None:
+            return
+        for reference in list.__iter__(annotations.get_object()):
+            if not isinstance(reference, IndirectObject):
+                continue
+            number = self._numbers[(reference.idnum, reference.generation)]
+            annotation = reference.get_object()
+
+            # Fields either are the annotation itself or its parent.
+            parent = dict.get(annotation, "/Parent")
+            if "/T" in annotation:
+                self._add_field(annotation["/T"], page_index, number, False)
+                if parent is None and number not in self._fields:
+                    self._fields.append(number)
+            if parent is not None:
+                parent_number = self._numbers[(parent.idnum, parent.generation)]
+                if "/T" in parent.get_object():
+                    self._add_field(parent.get_object()["/T"], page_index, parent_number, True)
+                while dict.get(parent.get_object(), "/Parent") is not None:
+                    parent = dict.get(parent.get_object(), "/Parent")
+                parent_number = self._numbers[(parent.idnum, parent.generation)]
+                if parent_number not in self._fields:
+                    self._fields.append(parent_number)
+
+    def _add_field(self, name: str, page_index: int, number: int, is_parent: bool):
+        self._field_index.setdefault(str(name), []).append((page_index, number, is_parent))
+        self._page_field_index[page_index].setdefault(str(name), []).append((number, is_parent))
+
+    # Helper function which returns the numbers of the objects each character of a party
+    # pack gets its own copy of: the pages, their annotations and the fields above those.
+    def _get_character_numbers(self) -> []:
+        numbers = set(self._page_numbers)
+        for number in self._page_numbers:
+            annotations = dict.get(self._objects_by_number[number], "/Annots")
+            if annotations is None:
+                continue
+            if isinstance(annotations, IndirectObject):
+                numbers.add(self._numbers[(annotations.idnum, annotations.generation)])
+            for reference in list.__iter__(annotations.get_object()):
+                while isinstance(reference, IndirectObject):
+                    numbers.add(self._numbers[(reference.idnum, reference.generation)])
+                    reference = dict.get(reference.get_object(), "/Parent")
+        return sorted(numbers)
+
+    # Helper function which returns what every compressed document shares, it is only made
+    # the first time it is needed.
+    def _get_compressed_template(self) -> _CompressedTemplate:
+        with self._compressed_lock:
+            if self._compressed is None:
+                self._compressed = self._build_compressed_template()
+            return self._compressed
+
+    def _build_compressed_template(self) -> _CompressedTemplate:
+        # Objects still used once the unused keys are dropped, page parents are not numbered.
+        used = {_CATALOG_NUMBER, _PAGES_NUMBER, _ACROFORM_NUMBER}
+        pending = [self._acroform] + [self._objects_by_number[number]
+                                      for number in self._page_numbers]
+        used.update(self._page_numbers)
+        while len(pending) > 0:
+            obj = pending.pop()
+            if isinstance(obj, _Reference):
+                number = obj.number
+            elif isinstance(obj, IndirectObject):
+                number = self._numbers.get((obj.idnum, obj.generation))
+            else:
+                number = None
+                if isinstance(obj, DictionaryObject):
+                    pending.extend(value for key, value in dict.items(obj)
+                                   if key not in _UNUSED_KEYS)
+                elif isinstance(obj, ArrayObject):
+                    pending.extend(list.__iter__(obj))
+            if number is not None and number not in used:
+                used.add(number)
+                pending.append(self._objects_by_number[number])
+
+        fields_number = len(self._object_bytes) + 2
+        xref_number = fields_number + 1
+        field_numbers = tuple(sorted({entry[1] for entries in self._field_index.values()
+                                      for entry in entries}))
+        field_bytes = {number: self._serialize(self._objects_by_number[number], compact=True)
+                       for number in field_numbers}
+
+        # Streams are written as they are, every other object goes in a shared object stream.
+        prefix = BytesIO()
+        prefix.write(PDF_HEADER)
+        entries = {}
+        shared_numbers = []
+        shared_bodies = []
+        for number in sorted(used):
+            if number in field_bytes:
+                continue
+            if number <= _ACROFORM_NUMBER:
+                body = self._object_bytes[number]
+            else:
+                obj = self._objects_by_number[number]
+                if number in self._page_numbers:
+                    obj = DictionaryObject(obj)
+                    obj[NameObject("/Parent")] = _Reference(_PAGES_NUMBER)
+                body = self._serialize(obj, compact=True)
+                if isinstance(obj, StreamObject):
+                    entries[number] = _xref_entry(1, prefix.tell(), 0)
+                    prefix.write(_object_bytes(number, body))
+                    continue
+            shared_numbers.append(number)
+            shared_bodies.append(body)
+
+        shared_number = fields_number - 1
+        entries[shared_number] = _xref_entry(1, prefix.tell(), 0)
+        prefix.write(_get_object_stream(shared_number, shared_numbers, shared_bodies))
+        for i in range(len(shared_numbers)):
+            entries[shared_numbers[i]] = _xref_entry(2, shared_number, i)
+        for i in range(len(field_numbers)):
+            entries[field_numbers[i]] = _xref_entry(2, fields_number, i)
+        entries[fields_number] = _xref_entry(1, prefix.tell(), 0)
+
+        # Objects no longer used are left as free entries.
+        xref_entries = _xref_entry(0, 0, 65535) + b"".join(
+            entries.get(number, _xref_entry(0, 0, 0)) for number in range(1, xref_number))
+        return _CompressedTemplate(prefix=prefix.getvalue(),
+                                   field_numbers=field_numbers,
+                                   field_bytes=field_bytes,
+                                   fields_number=fields_number,
+                                   xref_number=xref_number,
+                                   xref_entries=xref_entries)
+
+    # Helper function which keeps what an incremental update of the template needs: where
+    # its last xref is, its trailer entries and the acro form set to make field appearances.
+    # Incremental updates keep every page of the template, whatever the page count.
+    def _set_incremental_update(self, reader: PdfReader, template_root: DictionaryObject):
+        # Template id and generation of each object number of the documents.
+        self._template_references = {number: key for key, number in self._numbers.items()}
+
+        start = self._template_bytes.rindex(b"startxref")
+        self._template_startxref = int(self._template_bytes[start + 9:].split()[0])
+        xref = self._template_bytes[self._template_startxref:]
+        self._template_xref_is_stream = not xref.startswith(b"xref")
+        size = re.search(rb"/Size\s+(\d+)", xref)
+        self._template_size = int(size.group(1)) if size is not None \
+            else max(max(numbers) for numbers in reader.xref.values()) + 1
+
+        trailer = DictionaryObject()
+        for key in ("/Root", "/Info", "/ID"):
+            if key in reader.trailer:
+                trailer[NameObject(key)] = dict.__getitem__(reader.trailer, key)
+        # Only the entries are kept, without the brackets of the dictionary.
+        self._template_trailer_bytes = self._serialize(trailer, keep_numbers=True)[2:-3]
+
+        # Same objects for every document: the acro form asking for field appearances to be
+        # made, it is either its own object or inside the catalog.
+        self._incremental_objects = []
+        form = dict.get(template_root, "/AcroForm")
+        if isinstance(form, IndirectObject):
+            updated_form = DictionaryObject(form.get_object())
+            updated_form[NameObject("/NeedAppearances")] = BooleanObject(True)
+            self._incremental_objects.append(
+                ((form.idnum, form.generation), self._serialize(updated_form, keep_numbers=True)))
+        elif form is not None:
+            root = reader.trailer.raw_get("/Root")
+            updated_root = DictionaryObject(template_root)
+            updated_form = DictionaryObject(form)
+            updated_form[NameObject("/NeedAppearances")] = BooleanObject(True)
+            updated_root[NameObject("/AcroForm")] = updated_form
+            self._incremental_objects.append(
+                ((root.idnum, root.generation), self._serialize(updated_root, keep_numbers=True)))
+
+    # Helper function which writes an object to bytes, references to template objects
+    # are changed to their numbers in the documents unless the template's are kept.
+    # Compact objects do not have the unused keys and their streams are compressed.
+    def _serialize(self, obj, keep_numbers=False, compact=False) -> bytes:
+        stream = BytesIO()
+        self._write_object(obj, stream, None if keep_numbers else self._numbers, compact)
+        return stream.getvalue()
+
+    def _write_object(self, obj, stream, numbers, compact=False):
+        if isinstance(obj, IndirectObject):
+            if numbers is None:
+                stream.write(str(obj.idnum).encode() + b" " + str(obj.generation).encode() + b" R")
+            else:
+                stream.write(_reference_bytes(numbers[(obj.idnum, obj.generation)]))
+        elif isinstance(obj, DictionaryObject):
+            is_stream = isinstance(obj, StreamObject)
+            data = obj._data if is_stream else None
+            stream.write(b"<<")
+            for key, value in dict.items(obj):
+                # The length of a stream is always written directly.
+                if is_stream and key == "/Length" or compact and key in _UNUSED_KEYS:
+                    continue
+                stream.write(b" ")
+                NameObject(key).write_to_stream(stream, None)
+                stream.write(b" ")
+                self._write_object(value, stream, numbers, compact)
+            if is_stream and compact and "/Filter" not in obj:
+                data = zlib.compress(data)
+                stream.write(b" /Filter /FlateDecode")
+            if is_stream:
+                stream.write(b" /Length " + str(len(data)).encode())
+            stream.write(b" >>")
+            if is_stream:
+                stream.write(b"\nstream\n")
+                stream.write(data)
+                stream.write(b"\nendstream")
+        elif isinstance(obj, ArrayObject):
+            stream.write(b"[")
+            for value in list.__iter__(obj):
+                stream.write(b" ")
+                self._write_object(value, stream, numbers, compact)
+            stream.write(b" ]")
+        else:
+            obj.write_to_stream(stream, None)
+
+
+# Class which represents a single document made from a PdfFormFiller, only the annotations
+# whose values are updated are copied, every other object is shared with the template.
+class FilledDocument:
+
+    def __init__(self, filler: PdfFormFiller):
+        self._filler = filler
+        # Object number to the updated copy of that object.
+        self._updated = {}
+
+    # Function used to set the values of fields found on a given page (starting at 0),
+    # field names which are not on the page are ignored. Every value is set in a single
+    # pass over the mapping, each field is found directly through the page's index.
+    def update_page_form_field_values(self, page_num: int, fields: {}):
+        page_index = self._filler._page_field_index[page_num]
+        for name, value in fields.items():
+            for number, is_parent in page_index.get(name, ()):
+                self._set_value(number, is_parent, value)
+
+    # Function used to set the values of fields found on any page.
+    def update_form_field_values(self, fields: {}):
+        for name, value in fields.items():
+            for entry in self._filler._field_index.get(name, ()):
+                self._set_value(entry[1], entry[2], value)
+
+    # Function used to write the document to a binary stream, only the write method of
+    # the stream is used. The mode is one of WRITE_MODES.
+    # Returns the number of bytes written.
+    def write(self, stream, mode=WRITE_FULL) -> int:
+        if mode == WRITE_FULL:
+            return self._write_full(stream)
+        if mode == WRITE_INCREMENTAL:
+            return self._write_incremental(stream)
+        if mode == WRITE_COMPRESSED:
+            return self._write_compressed(stream)
+        raise ValueError("Unknown write mode: " + str(mode))
+
+    def _write_full(self, stream) -> int:
+        object_bytes = self._filler._object_bytes
+        offsets = []
+        position = 0
+
+        stream.write(PDF_HEADER)
+        position += len(PDF_HEADER)
+        for number in range(1, len(object_bytes) + 1):
+            body = self._filler._serialize(self._updated[number]) \
+                if number in self._updated else object_bytes[number]
+            data = _object_bytes(number, body)
+            offsets.append(position)
+            stream.write(data)
+            position += len(data)
+
+        data = _get_xref(offsets, position)
+        stream.write(data)
+        return position + len(data)
+
+    # Helper function which writes the template followed by an update of the objects that
+    # changed, the update's xref is a stream if the template's is one.
+    def _write_incremental(self, stream) -> int:
+        filler = self._filler
+        template = filler._template_bytes
+        stream.write(template)
+        position = len(template)
+        if not template.endswith(b"\n"):
+            stream.write(b"\n")
+            position += 1
+
+        objects = [(filler._template_references[number], filler._serialize(obj, True))
+                   for number, obj in self._updated.items()]
+        objects.extend(filler._incremental_objects)
+        objects.sort()
+        offsets = {}
+        for (idnum, generation), body in objects:
+            data = str(idnum).encode() + b" " + str(generation).encode() + b" obj\n" + body + \
+                b"\nendobj\n"
+            offsets[(idnum, generation)] = position
+            stream.write(data)
+            position += len(data)
+
+        if filler._template_xref_is_stream:
+            data = _get_xref_stream(offsets, position, filler._template_size,
+                                    filler._template_trailer_bytes, filler._template_startxref)
+        else:
+            data = _get_xref_table(offsets, position, filler._template_size,
+                                   filler._template_trailer_bytes, filler._template_startxref)
+        stream.write(data)
+        return position + len(data)
+
+    # Helper function which writes the parts every compressed document shares, followed by an
+    # object stream of the fields and the xref stream.
+    def _write_compressed(self, stream) -> int:
+        filler = self._filler
+        template = filler._get_compressed_template()
+        bodies = []
+        for number in template.field_numbers:
+            obj = self._updated.get(number)
+            bodies.append(template.field_bytes[number] if obj is None
+                          else filler._serialize(obj, compact=True))
+        fields = _get_object_stream(template.fields_number, template.field_numbers, bodies)
+        position = len(template.prefix) + len(fields)
+
+        entries = zlib.compress(template.xref_entries + _xref_entry(1, position, 0))
+        xref = str(template.xref_number).encode() + b" 0 obj\n<< /Type /XRef /Size " + \
+            str(template.xref_number + 1).encode() + b" /W [1 4 2] /Root 1 0 R" + \
+            b" /Filter /FlateDecode /Length " + str(len(entries)).encode() + b" >>\nstream\n" + \
+            entries + b"\nendstream\nendobj\nstartxref\n" + str(position).encode() + b"\n%%EOF\n"
+
+        stream.write(template.prefix)
+        stream.write(fields)
+        stream.write(xref)
+        return position + len(xref)
+
+    # Helper function which sets the value of a field, check boxes also get their
+    # appearance state set. Parent fields only get their value set.
+    def _set_value(self, number: int, is_parent: bool, value):
+        obj = self._updated.get(number)
+        if obj is None:
+            obj = DictionaryObject(self._filler._objects_by_number[number])
+            self._updated[number] = obj
+
+        if dict.get(obj, "/FT") == "/Btn" and not is_parent:
+            state = NameObject(CHECKED_VALUE if value == CHECKED_VALUE else UNCHECKED_VALUE)
+            obj[NameObject("/AS")] = state
+            obj[NameObject("/V")] = state
+        else:
+            obj[NameObject("/V")] = TextStringObject(str(value))
+
+
+# Class which writes many characters into a single document, each with its own copy of the
+# template's pages. The fields of a character are kept under a field named after it, so
+# "Initiative" of a character named character_0 is "character_0.Initiative". Every object
+# the pages share (contents, fonts, appearances) is only written once. Characters are
+# written as they are added so only the offsets of the objects are kept in memory.
+class PartyPackWriter:
+
+    def __init__(self, filler: PdfFormFiller, stream):
+        self._filler = filler
+        self._stream = stream
+        self._character_numbers = filler._get_character_numbers()
+        self._top_fields = set(filler._fields)
+        # Offset of each object, by its number minus one.
+        self._offsets = array("q")
+        self._page_numbers = []
+        self._field_numbers = []
+        self._next_number = len(filler._object_bytes) + 1
+        self._position = 0
+
+        self._write(PDF_HEADER)
+        # The catalog, page tree and acro form are only known once every character is added.
+        characters = set(self._character_numbers)
+        for number in range(_ACROFORM_NUMBER + 1, len(filler._object_bytes) + 1):
+            if number not in characters:
+                self._write_object(number, filler._object_bytes[number])
+
+    # Function which returns the number of characters added.
+    def get_character_count(self) -> int:
+        return len(self._field_numbers)
+
+    # Function used to add a character given the field values of each page, the name is
+    # the character's field (character_N, counting from 0, if None) and can not contain
+    # periods.
+    def add_character(self, field_pages: (), name=None):
+        filler = self._filler
+        document = filler.new_document()
+        for page_num in range(min(len(field_pages), filler.get_page_count())):
+            document.update_page_form_field_values(page_num, field_pages[page_num])
+        if name is None:
+            name = "character_" + str(len(self._field_numbers))
+
+        field_number = self._take_number()
+        # The first character keeps the numbers of the template's objects, others get new ones.
+        if len(self._field_numbers) == 0:
+            new_numbers = {number: number for number in self._character_numbers}
+            numbers = filler._numbers
+        else:
+            new_numbers = {number: self._take_number() for number in self._character_numbers}
+            numbers = ChainMap({filler._template_references[number]: new_number
+                                for number, new_number in new_numbers.items()}, filler._numbers)
+
+        for number in self._character_numbers:
+            obj = document._updated.get(number)
+            if obj is None:
+                obj = filler._objects_by_number[number]
+            if number in filler._page_numbers:
+                obj = DictionaryObject(obj)
+                obj[NameObject("/Parent")] = _Reference(_PAGES_NUMBER)
+            elif number in self._top_fields:
+                obj = DictionaryObject(obj)
+                obj[NameObject("/Parent")] = _Reference(field_number)
+            body = BytesIO()
+            filler._write_object(obj, body, numbers)
+            self._write_object(new_numbers[number], body.getvalue())
+
+        field = BytesIO()
+        field.write(b"<< /T ")
+        TextStringObject(name).write_to_stream(field, None)
+        field.write(b" /Kids [" + b" ".join(_reference_bytes(new_numbers[number])
+                                            for number in filler._fields) + b"] >>")
+        self._write_object(field_number, field.getvalue())
+        self._field_numbers.append(field_number)
+        self._page_numbers.extend(new_numbers[number] for number in filler._page_numbers)
+
+    # Function used to finish the document once every character is added, the stream
+    # is not closed. Returns the number of bytes written.
+    def close(self) -> int:
+        filler = self._filler
+        acroform = DictionaryObject(filler._acroform)
+        acroform[NameObject("/Fields")] = ArrayObject(
+            _Reference(number) for number in self._field_numbers)
+
+        self._write_object(_CATALOG_NUMBER, filler._object_bytes[_CATALOG_NUMBER])
+        self._write_object(_PAGES_NUMBER, b"<< /Type /Pages /Kids [" +
+                           b" ".join(_reference_bytes(number) for number in self._page_numbers) +
+                           b"] /Count " + str(len(self._page_numbers)).encode() + b" >>")
+        self._write_object(_ACROFORM_NUMBER, filler._serialize(acroform))
+        self._write(_get_xref(self._offsets, self._position))
+        return self._position
+
+    def _take_number(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _write_object(self, number: int, body: bytes):
+        if len(self._offsets) < number:
+            self._offsets.extend([0] * (number - len(self._offsets)))
+        self._offsets[number - 1] = self._position
+        self._write(_object_bytes(number, body))
+
+    def _write(self, data: bytes):
+        self._stream.write(data)
+        self._position += len(data)
+
+
+# Function which returns the (reference, page) of every page of a PDF in order, pages
+# get any attribute they inherit from the page tree.
+def _get_pages(reader: PdfReader) -> []:
+    pages = []
+    root = reader.trailer["/Root"].get_object()
+    _get_tree_pages(dict.__getitem__(root, "/Pages"), {}, pages)
+    return pages
+
+
+def _get_tree_pages(reference: IndirectObject, inherited: {}, pages: []):
+    node = reference.get_object()
+    if node.get("/Type") == "/Pages":
+        inherited = dict(inherited)
+        for key in _INHERITED_PAGE_ATTRIBUTES:
+            if key in node:
+                inherited[key] = dict.__getitem__(node, key)
+        for kid in list.__iter__(node["/Kids"]):
+            _get_tree_pages(kid, inherited, pages)
+    else:
+        for key, value in inherited.items():
+            if key not in node:
+                node[NameObject(key)] = value
+        pages.append((reference, node))
+
+
+# Function which returns the xref table and trailer of a whole document given the offset
+# of every object, in order starting at object 1, and the offset of the table.
+def _get_xref(offsets: [], position: int) -> bytes:
+    # Cross reference table, each entry is exactly 20 bytes long.
+    xref = [b"xref\n0 " + str(len(offsets) + 1).encode() + b"\n", b"0000000000 65535 f\r\n"]
+    for offset in offsets:
+        xref.append(str(offset).zfill(10).encode() + b" 00000 n\r\n")
+    xref.append(b"trailer\n<< /Size " + str(len(offsets) + 1).encode() +
+                b" /Root 1 0 R >>\nstartxref\n" + str(position).encode() + b"\n%%EOF\n")
+    return b"".join(xref)
+
+
+# Function which returns the xref table and trailer of an incremental update given the
+# offset of each object, the offset of the table and what the trailer keeps from the template.
+def _get_xref_table(offsets: {}, position: int, size: int, trailer: bytes, previous: int) -> bytes:
+    xref = [b"xref\n"]
+    for run in _get_runs(sorted(offsets.keys())):
+        xref.append(str(run[0][0]).encode() + b" " + str(len(run)).encode() + b"\n")
+        for key in run:
+            xref.append(str(offsets[key]).zfill(10).encode() + b" " +
+                        str(key[1]).zfill(5).encode() + b" n\r\n")
+    xref.append(b"trailer\n<< /Size " + str(size).encode() + trailer + b" /Prev " +
+                str(previous).encode() + b" >>\nstartxref\n" + str(position).encode() +
+                b"\n%%EOF\n")
+    return b"".join(xref)
+
+
+# Function which returns the xref stream of an incremental update, the stream is the object
+# following the template's last object and has an entry for itself.
+def _get_xref_stream(offsets: {}, position: int, size: int, trailer: bytes,
+                     previous: int) -> bytes:
+    offsets = dict(offsets)
+    offsets[(size, 0)] = position
+    index = []
+    entries = []
+    for run in _get_runs(sorted(offsets.keys())):
+        index.append(str(run[0][0]).encode() + b" " + str(len(run)).encode())
+        for key in run:
+            # Each entry is its type (1, in use), offset and generation.
+            entries.append(b"\x01" + offsets[key].to_bytes(4, "big") + key[1].to_bytes(2, "big"))
+    data = b"".join(entries)
+    return str(size).encode() + b" 0 obj\n<< /Type /XRef /Size " + str(size + 1).encode() + \
+        b" /Index [" + b" ".join(index) + b"] /W [1 4 2]" + trailer + b" /Prev " + \
+        str(previous).encode() + b" /Length " + str(len(data)).encode() + \
+        b" >>\nstream\n" + data + b"\nendstream\nendobj\nstartxref\n" + \
+        str(position).encode() + b"\n%%EOF\n"
+
+
+# Function which splits sorted (object number, generation) keys into runs of consecutive
+# object numbers.
+def _get_runs(keys: []) -> []:
+    runs = []
+    for key in keys:
+        if len(runs) > 0 and runs[-1][-1][0] + 1 == key[0]:
+            runs[-1].append(key)
+        else:
+            runs.append([key])
+    return runs
+
+
+# Function which returns a compressed object stream holding objects given their numbers and
+# bodies, as a whole object with the given number.
+def _get_object_stream(number: int, numbers: (), bodies: []) -> bytes:
+    header = []
+    offset = 0
+    for i in range(len(numbers)):
+        header.append(str(numbers[i]).encode() + b" " + str(offset).encode())
+        # Each object is followed by a new line.
+        offset += len(bodies[i]) + 1
+    header = b" ".join(header) + b"\n"
+    data = zlib.compress(header + b"\n".join(bodies) + b"\n")
+    return _object_bytes(number, b"<< /Type /ObjStm /N " + str(len(numbers)).encode() +
+                         b" /First " + str(len(header)).encode() + b" /Filter /FlateDecode" +
+                         b" /Length " + str(len(data)).encode() + b" >>\nstream\n" + data +
+                         b"\nendstream")
+
+
+# Function which returns an entry of an xref stream with the widths 1, 4 and 2.
+def _xref_entry(entry_type: int, field: int, index: int) -> bytes:
+    return bytes((entry_type,)) + field.to_bytes(4, "big") + index.to_bytes(2, "big")
+
+
+def _object_bytes(number: int, body: bytes) -> bytes:
+    return str(number).encode() + b" 0 obj\n" + body + b"\nendobj\n"
+
+
+def _reference_bytes(number: int) -> bytes:
+    return str(number).encode() + b" 0 R"
+
@@ -1,12 +1,20 @@
 # ----------------------------------------------------------------------------------------------- #
 # Module which contains methods for producing random attributes of a dnd character;
 # level, stats, race, class, etc.
+# Every function takes the random generator to draw from (rng), by default the random module.
 # ----------------------------------------------------------------------------------------------- #
 
+import hashlib
 import random
+import threading
+from functools import lru_cache
+from itertools import product
 import dndCharacterApp.utils.math_utils as math_utils
 import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.rules_parser as rules
 import dndCharacterApp.dndEntities.dnd_class as dnd_mod
+import dndCharacterApp.dndEntities.dndRace as race_mod
+import dndCharacterApp.dndEntities.dndBackground as bkgr_mod
 from dndCharacterApp.dndEntities.dnd_enums import Alignment as Alignment
 from dndCharacterApp.dndEntities.dnd_enums import Gender as Gender
 from dndCharacterApp.dndEntities.dndRace import Race as Race
@@ -14,36 +22,99 @@ from dndCharacterApp.dndEntities.dndBackground import Background as Background
 from dndCharacterApp.dndEntities.dnd_class import DndClass as DndClass
 from dndCharacterApp.dndEntities.character_sheet import CharacterSheet as CharacterSheet
 
+
+# Cost of each score when using the point buy system and the points that are spent.
+POINT_BUY_COSTS = {8: 0, 9: 1, 10: 2, 11: 3, 12: 4, 13: 5, 14: 7, 15: 9}
+POINT_BUY_POINTS = 27
+# Largest number of sheets whose dice are drawn together when rolling with NumPy.
+DICE_BLOCK_SIZE = 256
+# Stream of a seed whose generator rolls the NumPy dice of its batches, sheets use the
+# streams from 0.
+DICE_STREAM = -1
+
+
+# Error raised when more unique items are requested from a pool than it holds.
+class PoolExhaustedError(ValueError):
+
+    def __init__(self, requested: int, available: int, pool_name=None):
+        self.requested = requested
+        self.available = available
+        self.pool_name = pool_name
+        message = "requested " + str(requested) + " items but only " + str(available) + \
+                  " are available"
+        if pool_name is not None:
+            message = pool_name + ": " + message
+        super().__init__(message)
+
+
+# Spell pools of each spell list file and spell level, without duplicates.
+_SPELL_POOLS = {}
+_SPELL_POOLS_LOCK = threading.Lock()
+
+
+# Function which returns k unique items drawn at random from a pool, skipping any item
+# found in exclude. Items are drawn with a partial Fisher-Yates shuffle so it never takes
+# more than k draws. PoolExhaustedError is raised if there are less than k eligible items.
+# Duplicates are removed from the pool first unless it is known to be unique.
+def sample_without_replacement(pool: [], k: int, exclude=(), pool_name=None, rng=random,
+                               is_unique=False) -> []:
+    if not is_unique:
+        pool = dict.fromkeys(pool)
+    # Remove excluded items, keeping the order of the pool.
+    if len(exclude) > 0:
+        excluded = set(exclude)
+        eligible = [item for item in pool if item not in excluded]
+    else:
+        eligible = list(pool)
+
+    if k > len(eligible):
+        raise PoolExhaustedError(k, len(eligible), pool_name)
+
+    for i in range(k):
+        j = rng.randint(i, len(eligible) - 1)
+        eligible[i], eligible[j] = eligible[j], eligible[i]
+    return eligible[:k]
+
+
+# Function which returns the spells of a spell level (0 for cantrips) given the file path
+# to the spell list, without duplicates. Each pool is only made once, through the indexed
+# rules database when it is in use.
+def get_spell_pool(spell_list_file_path: str, level: int) -> ():
+    key = (spell_list_file_path, level)
+    with _SPELL_POOLS_LOCK:
+        spell_pool = _SPELL_POOLS.get(key)
+    if spell_pool is None:
+        database = io.get_rules_database()
+        if database is not None:
+            spells = database.get_spells(spell_list_file_path, level)
+        else:
+            spells = io.get_col(level + 1, spell_list_file_path, False)[1:]
+        spell_pool = tuple(dict.fromkeys(spells))
+        with _SPELL_POOLS_LOCK:
+            spell_pool = _SPELL_POOLS.setdefault(key, spell_pool)
+    return spell_pool
+
+
+# Function used to drop the spell pools so they are made again from the spell lists.
+def clear_spell_pools():
+    with _SPELL_POOLS_LOCK:
+        _SPELL_POOLS.clear()
+
+
 # Function used to return a random level between 1-20
-def random_level() -> int:
-    return random.randint(1, 20)
+def random_level(rng=random) -> int:
+    return rng.randint(1, 20)
 
 # Function used to roll up a set of six ability scores, each roll is random as if using a d6.
-# Can either roll completely randomly or use a point by system with random points attached to
-# each ability score.
+# Can either roll completely randomly or use a point by system, drawing one of every possible
+# point buy arrays with the same odds.
 # List has ability scores as follows: Str, Dex, Con, Int, Wis and Cha
-def random_ability_scores(point_by=False) -> []:
+def random_ability_scores(point_by=False, rng=random) -> []:
     ability_scores = []
 
     # Point by System:
     if point_by:
-        # Begin with 27 points
-        points = 27
-        # Each score is set to a default 8
-        ability_scores = [8 for i in range(6)]
-        while points > 0:
-            # Get random ability score
-            index = random.randint(0, 5)
-            # If the ability score is not at its max (15) then add to it
-            if ability_scores[index] < 15:
-                # 9-13 costs one point to increase
-                if ability_scores[index] < 13:
-                    ability_scores[index] += 1
-                    points -= 1
-                # 14-15 costs 2 points to increase
-                else:
-                    ability_scores[index] += 1
-                    points -= 2
+        ability_scores = random_point_buy(rng=rng)
     # Completely Random Rolls:
     else:
         # Roll for each of the 6 stats
@@ -51,30 +122,57 @@ def random_ability_scores(point_by=False) -> []:
             # Roll 4 times and then add up the 3 highest rolls as the ability score
             temp_rolls = []
             for j in range(4):
-                temp_rolls.append(random.randint(1, 6))
+                temp_rolls.append(rng.randint(1, 6))
             temp_rolls.sort(reverse=True)
             ability_scores.append(temp_rolls[0] + temp_rolls[1] + temp_rolls[2])
 
     return ability_scores
 
+# Function which returns every set of six ability scores that can be bought with exactly
+# 27 points, each score is between 8 and 15. Only enumerated once.
+@lru_cache(maxsize=None)
+def get_point_buy_arrays() -> ():
+    arrays = []
+    for scores in product(sorted(POINT_BUY_COSTS.keys()), repeat=6):
+        if sum(POINT_BUY_COSTS[score] for score in scores) == POINT_BUY_POINTS:
+            arrays.append(scores)
+    return tuple(arrays)
+
+
+# Function used to draw a random point buy array, every array is as likely unless weights
+# are given. Weights can either be a list (one weight per array of get_point_buy_arrays)
+# or a function which returns the weight of an array.
+def random_point_buy(weights=None, rng=random) -> []:
+    return random_point_buys(1, weights, rng=rng)[0]
+
+
+# Function used to draw n random point buy arrays at once, see random_point_buy.
+def random_point_buys(n: int, weights=None, rng=random) -> []:
+    arrays = get_point_buy_arrays()
+    if weights is None:
+        return [list(arrays[rng.randint(0, len(arrays) - 1)]) for i in range(n)]
+    if callable(weights):
+        weights = [weights(scores) for scores in arrays]
+    return [list(scores) for scores in rng.choices(arrays, weights, k=n)]
+
 # Function used to increase a set of ability scores given a level and the ability scores
 # themselves. At levels 4, 8, 12, 16, and 19 ability scores can be increased; either
 # increasing one score by 2 points or two scores by 1 point. No score can exceed 20.
-def random_ability_scores_improve(level: int, ability_scores: []) -> []:
+def random_ability_scores_improve(level: int, ability_scores: [], rng=random) -> []:
     # Continue while the level has not been decremented to 0.
     while True:
         # If the score is 4, 8, 12, 16 or 19 increase it
         if (level == 19) or (level % 4 == 0 and level != 0 and level != 20):
             # Randomly choose if a score will be attempted to be increased by 2
-            add_two = bool(random.getrandbits(1))
+            add_two = bool(rng.getrandbits(1))
             # Get the index for score 1
-            index_one = _get_score_below_20(ability_scores)
+            index_one = _get_score_below_20(ability_scores, rng=rng)
             # Score can be increased by 2 if its under 19
             if add_two and ability_scores[index_one] < 19:
                 ability_scores[index_one] += 2
             # Otherwise just increase two scores by 1
             else:
-                index_two = _get_score_below_20(ability_scores, second_index=index_one)
+                index_two = _get_score_below_20(ability_scores, second_index=index_one, rng=rng)
                 ability_scores[index_one] += 1
                 ability_scores[index_two] += 1
             # Decrease the level by 1 until the next factor of 4 (16) Used for levels 19+
@@ -93,7 +191,7 @@ def random_ability_scores_improve(level: int, ability_scores: []) -> []:
 
 # Function used to roll a character's hit points given their level, their die size,
 # and their constitution score. Negative constitution scores are ignored.
-def random_hit_points(die_size: int, level: int, constitution_score: int) -> int:
+def random_hit_points(die_size: int, level: int, constitution_score: int, rng=random) -> int:
     con_mod = math_utils.get_ability_mod(constitution_score)
 
     # If the constitution modifier is lower than 0 then ignore it
@@ -105,102 +203,90 @@ def random_hit_points(die_size: int, level: int, constitution_score: int) -> int
 
     # Roll for every other level
     for i in range(level - 1):
-        hit_points += random.randint(1, die_size) + con_mod
+        hit_points += rng.randint(1, die_size) + con_mod
 
     return hit_points
 
 # Function used to return a random alignment
-def random_alignment() -> Alignment:
-    return random.choice(list(Alignment))
+def random_alignment(rng=random) -> Alignment:
+    return rng.choice(list(Alignment))
 
 # Function used to return a random age given a maximum racial age
-def random_age(max_age: int) -> int:
-    return random.randint(1, max_age)
+def random_age(max_age: int, rng=random) -> int:
+    return rng.randint(1, max_age)
 
 # Function used to return a random gender
-def random_gender() -> Gender:
-    return random.choice(list(Gender))
+def random_gender(rng=random) -> Gender:
+    return rng.choice(list(Gender))
 
 # Function used to get a random value from a file given a column index
 # and the file path itself. A space is returned if the file could
 # not be found.
-def random_value_from_file(file_path: str, elementOrIndex, is_sorted=False) -> str:
+def random_value_from_file(file_path: str, elementOrIndex, is_sorted=False, rng=random) -> str:
     list_of_traits = io.get_col(elementOrIndex, file_path, is_sorted)
     if list_of_traits is not None:
         # Convert to list and pop off the header element of the list
         list_of_traits = list(list_of_traits)
         list_of_traits.pop(0)
-        return random.choice(list_of_traits)
+        return rng.choice(list_of_traits)
     else:
         return " "
 
 # Function used to get a random full name given a file path
 # and the gender of that character (currently just Male and Female)
-def random_name (file_path: str, gender: Gender) -> str:
+def random_name (file_path: str, gender: Gender, rng=random) -> str:
     name = ""
     # Get the first name for either a male or female character
     if gender == Gender.Male:
-        name += random_value_from_file(file_path, 1)
+        name += random_value_from_file(file_path, 1, rng=rng)
     else:
-        name += random_value_from_file(file_path, 2)
+        name += random_value_from_file(file_path, 2, rng=rng)
     # Finally add a last name and return the value
-    name += " " + random_value_from_file(file_path, 3)
+    name += " " + random_value_from_file(file_path, 3, rng=rng)
     return name
 
 # Function that returns a random sub list given a list and a number
 # of elements to include. The list returned does not have repeating
 # elements.
-def random_list (list: [], num_of_items: int) -> []:
+def random_list (list: [], num_of_items: int, rng=random) -> []:
 
     # If number of items is greater than or equal
     # to the list length, just return the list.
     if num_of_items >= len(list):
         return list
 
-    final_list = []
-    # Loop list until a unique sublist is created
-    while num_of_items > 0:
-        item = random.choice(list)
-        if item not in final_list:
-            final_list.append(item)
-            num_of_items -= 1
-
-    return final_list
+    return sample_without_replacement(list, num_of_items, rng=rng)
 
 # Function used to select random equipment,languages or proficiencies given a list of strings
 # representing choices of state category that can be made.
 # Certain flags are used to indicate attributes about these choices such as
 # "!" representing multiple unique items that can be added to the final list
 # if this choice is selected. (/,?,!,*,@)
-def random_equip_or_lang_or_pro (list: [], file_path: str, is_armor: bool) -> []:
+def random_equip_or_lang_or_pro (list: [], file_path: str, is_armor: bool, rng=random) -> []:
     final_list = []
 
     # Loop through various item selections in the list, make a choice,
     # and then add the selected item to the final list.
     for item in list:
-        # Get the selection of items by splitting the given string
-        line = item.split("/")
-        invalid_choice = True
-        # Continue until a proper item is chosen for the list
-        while invalid_choice:
-            # Begin with a random item from the selection
-            element = str(random.choice(line))
-            # If it starts with a "?" then this is a category of item and an item
-            # of that category is chosen at random given the file path with that list
-            if file_path != None and element.startswith("?"):
-                element = random_value_from_file(file_path, element[1:])
-            # Confirm that item is not already in list and does not have
-            # a needed requirement
-            if element not in final_list and not element.startswith("*"):
-                # If it starts with "!" this means multiple unique items are a part of
-                # this choice and all must be individually added.
-                if "!" in element:
-                    element_list = element.split("!")
-                    for sub_element in element_list:
-                        final_list.append(sub_element)
-                else:
-                    final_list.append(element)
-            invalid_choice = False
+        # Get the selection of items from the parsed choice, beginning with
+        # a random item from the selection
+        option = rng.choice(rules.parse_choice(item).options)
+        element = option.text
+        # If it starts with a "?" then this is a category of item and an item
+        # of that category is chosen at random given the file path with that list
+        if file_path != None and option.kind == rules.OPTION_CATEGORY:
+            element = str(random_value_from_file(file_path, option.value, rng=rng))
+            option = rules.parse_option(element)
+        # Confirm that item is not already in list and does not have
+        # a needed requirement
+        if element not in final_list and option.kind != rules.OPTION_REQUIREMENT:
+            # If it contains "!" this means multiple unique items are a part of
+            # this choice and all must be individually added.
+            if len(option.parts) > 0:
+                for sub_element in option.parts:
+                    final_list.append(sub_element)
+            else:
+                final_list.append(element)
 
     # A final run through of the list must be preformed searching for
     # an "@" character in the selected items (if there is one).
@@ -211,12 +297,12 @@ def random_equip_or_lang_or_pro (list: [], file_path: str, is_armor: bool) -> []
         # If it starts with an "@" then this means multiple of the same item
         # should be added to the final list
         if "@" in item:
-            multi_items = item.split("@")
+            option = rules.parse_option(item)
             # Add original string so it can be removed from the final list
             remove_item.append(item)
             # Add the needed copies to the add item list
-            for i in range(int(multi_items[0])):
-                add_item.append(multi_items[1])
+            for i in range(option.count):
+                add_item.append(option.value)
 
     # Add/Remove elements in final list if needed
     for item in remove_item:
@@ -227,26 +313,25 @@ def random_equip_or_lang_or_pro (list: [], file_path: str, is_armor: bool) -> []
     return final_list
 
 # Function that returns a random race given a level
-def random_race (level: int) -> Race:
-    # Get the contents of all the available races
-    race_list = io.get_row(1, io.RACE_FILE_PATH)
+def random_race (level: int, rng=random) -> Race:
     # Create a random race with an index from the range of 1 to
-    # length of list
-    return Race(random.randint(1, len(race_list)), level)
+    # the number of available races
+    return Race(rng.randint(1, race_mod.get_race_count()), level)
 
 # Function that returns a random background given an alignment
-def random_background (alignment: Alignment) -> Background:
+def random_background (alignment: Alignment, rng=random) -> Background:
     # New background is generated from list of all available backgrounds
     bkgr_list = io.get_row(1, io.BKGR_ATRBT_FILE_PATH)
-    background = Background(alignment, random.randint(1, len(bkgr_list)))
+    background = Background(alignment, rng.randint(1, len(bkgr_list)))
     # Ideal is set using helper function
-    _random_ideal(background)
+    _random_ideal(background, rng=rng)
 
     # Background index is obtained so personality traits, bonds, and flaws can be set.
     bkgr_index = background.get_index()
-    background.personality_trait = random_value_from_file(io.BKGR_PERS_TRT_FILE_PATH, bkgr_index)
-    background.bond = random_value_from_file(io.BKGR_BONDS_FILE_PATH, bkgr_index)
-    background.flaw = random_value_from_file(io.BKGR_FLAWS_FILE_PATH, bkgr_index)
+    background.personality_trait = random_value_from_file(io.BKGR_PERS_TRT_FILE_PATH, bkgr_index,
+                                                          rng=rng)
+    background.bond = random_value_from_file(io.BKGR_BONDS_FILE_PATH, bkgr_index, rng=rng)
+    background.flaw = random_value_from_file(io.BKGR_FLAWS_FILE_PATH, bkgr_index, rng=rng)
 
     # Loop through tool proficiencies in case a specific tool needs to be chosen.
     tool_prof = background.tool_prof
@@ -255,7 +340,7 @@ def random_background (alignment: Alignment) -> Background:
         if tool_prof[i].startswith("*"):
             # Randomly choose a tool depending on the category specified.
             new_tool_prof = random_value_from_file(io.TOOL_TYPE_FILE_PATH,
-                                                   tool_prof[i][1:])
+                                                   tool_prof[i][1:], rng=rng)
             # Replace corresponding equipment with tool selected.
             for j in range(len(equip)):
                 if equip[j].lower() == tool_prof[i].lower():
@@ -266,26 +351,27 @@ def random_background (alignment: Alignment) -> Background:
     return background
 
 # Helper Function used to set a background's ideal randomly.
-def _random_ideal (background: Background):
-    # Get background's list of ideals
-    ideals_list = background.get_ideals_list()
-    # Continue until a match is made between the background's alignment
-    # and the chosen ideal
-    while True:
-        ideal_index = random.randint(1, len(ideals_list) - 1)
-        if background.set_ideal(ideal_index):
-            break
+def _random_ideal (background: Background, rng=random):
+    # Get the ideals of the background which match its alignment
+    eligible_ideals = bkgr_mod.get_eligible_ideals(background.get_index(),
+                                                   background.get_alignment())
+    ideal_index = sample_without_replacement(eligible_ideals, 1,
+                                             pool_name="ideals of " + str(background.name),
+                                             rng=rng, is_unique=True)[0]
+    background.set_ideal(ideal_index)
 
 # Function used to create a random dnd class given a level, ability scores,
 # and a race and a background (these last two parameters are optional)
 # This function makes a completely random dnd class regardless of the
 # ability scores.
+# A class name can be given to skip the random class choice.
 def random_dnd_class(level: int, ability_scores: [], race: Race,
-                     background: Background) -> DndClass:
+                     background: Background, class_name=None, rng=random) -> DndClass:
     # Get total list of classes available to the current program and make a random
     # class choice
-    class_list = io.get_row(1, io.CLASS_STAND_FILE_PATH)
-    class_name = random.choice(class_list)
+    if class_name is None:
+        class_list = io.get_row(1, io.CLASS_STAND_FILE_PATH)
+        class_name = rng.choice(class_list)
     dndclass = DndClass(class_name, level, ability_scores, race, background)
 
     # If the class was successfully made then continue
@@ -295,17 +381,17 @@ def random_dnd_class(level: int, ability_scores: [], race: Race,
         line = choice_list[1].split("=")
         # Choose what skills the class will add its proficiency bonus to.
         sub_line = line[1].split("/")
-        if dndclass.set_skill_bonus(random_list(sub_line, int(line[0]))) == False:
+        if dndclass.set_skill_bonus(random_list(sub_line, int(line[0]), rng=rng)) == False:
             return None
 
         # Set the classes weapons, armor and items depending on its
         # proficiencies.
         dndclass.weapons = (random_equip_or_lang_or_pro(
-            choice_list[2].split("="), io.WEAPON_TYPE_FILE_PATH, False))
+            choice_list[2].split("="), io.WEAPON_TYPE_FILE_PATH, False, rng=rng))
         dndclass.armor = (random_equip_or_lang_or_pro(
-            choice_list[3].split("="), io.ARMOR_TYPE_FILE_PATH, True))
+            choice_list[3].split("="), io.ARMOR_TYPE_FILE_PATH, True, rng=rng))
         dndclass.items = (random_equip_or_lang_or_pro(
-            choice_list[4].split("="), None, False))
+            choice_list[4].split("="), None, False, rng=rng))
 
         # Figure out if class has access to its archetypes at this level.
         archetype_list = choice_list[5].split("=")
@@ -314,7 +400,7 @@ def random_dnd_class(level: int, ability_scores: [], race: Race,
         # Select a given archetype if the class has access to it at the level
         if arche_level != 0 and level >= arche_level:
             line = io.get_row(1, archetype_list[2])
-            index = random.randint(1, len(line))
+            index = rng.randint(1, len(line))
 
             # Set the traits of this archetype and if it is a spell caster,
             # see if any additional spells need to be finalized.
@@ -324,7 +410,7 @@ def random_dnd_class(level: int, ability_scores: [], race: Race,
             need_to_set_spells = \
                 dndclass.set_archetype_attributes(archetype_list[2], index)
             if need_to_set_spells:
-                dndclass.spells = _finalize_spells(dndclass.spells)
+                dndclass.spells = _finalize_spells(dndclass.spells, rng=rng)
         # Initialize special abilities since it will not be done in the archetype phase
         else:
             dndclass.initialize_special_abilities()
@@ -336,7 +422,7 @@ def random_dnd_class(level: int, ability_scores: [], race: Race,
                                             dndclass.ability_scores[
                                                 math_utils.get_casting_ability_pos(
                                                     dndclass.get_casting_ability())],
-                                            dndclass.get_spells_known())
+                                            dndclass.get_spells_known(), rng=rng)
 
         # Add additional level information to its attacks and spell casting
         # abilities.
@@ -345,49 +431,226 @@ def random_dnd_class(level: int, ability_scores: [], race: Race,
 
         # Finally, if further choices need to be made regarding proficiencies/skill bonuses then do so.
         dndclass.set_weapon_prof(tuple(random_equip_or_lang_or_pro(list(dndclass.get_weapon_prof()),
-                                                                   io.WEAPON_TYPE_FILE_PATH, False)))
+                                                                   io.WEAPON_TYPE_FILE_PATH, False,
+                                                                   rng=rng)))
         dndclass.set_armor_prof((tuple(random_equip_or_lang_or_pro(list(dndclass.get_armor_prof()),
-                                                                   io.ARMOR_TYPE_FILE_PATH, True))))
+                                                                   io.ARMOR_TYPE_FILE_PATH, True,
+                                                                   rng=rng))))
         dndclass.set_tool_prof((tuple(random_equip_or_lang_or_pro(list(dndclass.get_tool_prof()),
-                                                                  io.TOOL_TYPE_FILE_PATH, False))))
+                                                                  io.TOOL_TYPE_FILE_PATH, False,
+                                                                  rng=rng))))
         dndclass.set_skill_bonuses((tuple(random_equip_or_lang_or_pro(list(dndclass.get_skill_bonuses()),
-                                                                      None, False))))
+                                                                      None, False, rng=rng))))
 
-        dndclass = _finialize_choice_special_abilities(dndclass)
+        dndclass = _finialize_choice_special_abilities(dndclass, rng=rng)
 
     return dndclass
 
-def random_character_sheet(dndClass: DndClass, gender: Gender, name: str, age: int) -> CharacterSheet:
+# Function used to make a character sheet of a class, its hit points are not rolled if
+# with hit points is False.
+def random_character_sheet(dndClass: DndClass, gender: Gender, name: str, age: int,
+                           rng=random, with_hit_points=True) -> CharacterSheet:
     characterSheet = CharacterSheet(dndClass, gender, name, age)
-    characterSheet.set_hit_points(random_hit_points(dndClass.get_hit_die(),
-                                               dndClass.get_level(),
-                                               characterSheet.get_ability_modifiers()[2]))
+    if with_hit_points:
+        characterSheet.set_hit_points(random_hit_points(dndClass.get_hit_die(),
+                                                   dndClass.get_level(),
+                                                   characterSheet.get_ability_modifiers()[2],
+                                                   rng=rng))
     characterSheet.set_languages(random_equip_or_lang_or_pro(list(characterSheet.get_languages()),
-                            io.LANGUAGE_FILE_PATH, False))
+                            io.LANGUAGE_FILE_PATH, False, rng=rng))
 
     return characterSheet
 
-def completely_random_character_sheet() -> CharacterSheet:
-    alignment = random_alignment()
-    bkgr = random_background(alignment)
-    level = random_level()
-    race = random_race(level)
-    gender = random_gender()
-    name = random_name(race.get_racial_name_file_path(), gender)
-    age = random_age(race.get_max_age())
-    ability_scores = random_ability_scores()
-    dndClass = random_dnd_class(level, ability_scores, race, bkgr)
-    characterSheet = random_character_sheet(dndClass, gender, name, age)
+def completely_random_character_sheet(rng=random) -> CharacterSheet:
+    alignment = random_alignment(rng=rng)
+    bkgr = random_background(alignment, rng=rng)
+    level = random_level(rng=rng)
+    race = random_race(level, rng=rng)
+    gender = random_gender(rng=rng)
+    name = random_name(race.get_racial_name_file_path(), gender, rng=rng)
+    age = random_age(race.get_max_age(), rng=rng)
+    ability_scores = random_ability_scores(rng=rng)
+    dndClass = random_dnd_class(level, ability_scores, race, bkgr, rng=rng)
+    characterSheet = random_character_sheet(dndClass, gender, name, age, rng=rng)
 
     return characterSheet
 
+# Options used when generating many character sheets at once. Any option left as None
+# is chosen randomly for each sheet. The race can be given as its name or its index in
+# the race file, the class as its name. A seed makes the batch reproducible, sheet i of
+# the batch can then be made again with regenerate_character_sheet(seed, i, options).
+# NumPy dice rolls the ability scores and hit points of the batch with dice_utils, which
+# needs NumPy. A seed only gives the same sheets with the same numpy dice option.
+class GenerationOptions:
+
+    def __init__(self, level=None, race=None, dnd_class=None, alignment=None, seed=None,
+                 numpy_dice=False):
+        if level is not None and not 1 <= level <= 20:
+            raise ValueError("level must be between 1 and 20, not " + str(level))
+        self.level = level
+        self.race_index = _get_race_index(race) if race is not None else None
+        if dnd_class is not None and dnd_class not in io.get_row(1, io.CLASS_STAND_FILE_PATH):
+            raise ValueError("unknown class: " + str(dnd_class))
+        self.dnd_class = dnd_class
+        self.alignment = alignment
+        self.seed = seed
+        if numpy_dice:
+            # Imported here since dice_utils imports this module.
+            import dndCharacterApp.utils.dice_utils as dice
+            if not dice.has_numpy():
+                raise ValueError("NumPy dice need NumPy to be installed")
+        self.numpy_dice = bool(numpy_dice)
+
+
+# Function which returns a list of n random character sheets made with the given options,
+# None in place of any sheet that could not be made (see iter_character_sheets).
+def generate_many(n: int, options=None, start=0, rng=random) -> []:
+    return list(iter_character_sheets(n, options, start, rng))
+
+
+# Function which yields n random character sheets made with the given options, one at a
+# time so large batches do not need to be kept in memory. The rule files are loaded once
+# before the first sheet and shared by every sheet of the batch.
+# If the options have a seed every sheet gets its own generator derived from the seed
+# and its number in the batch, so workers can each make a different range of the batch
+# (through start) and get the same sheets as a single worker would. Otherwise every sheet
+# is drawn from the given generator.
+# A sheet which runs out of choices (PoolExhaustedError) is yielded as None so the rest of
+# the batch is still made.
+def iter_character_sheets(n: int, options=None, start=0, rng=random):
+    if options is None:
+        options = GenerationOptions()
+    warm_up()
+
+    if options.numpy_dice:
+        yield from _iter_numpy_dice_sheets(n, options, start, rng)
+        return
+    for i in range(start, start + n):
+        try:
+            if options.seed is not None:
+                sheet = _character_sheet_from_options(options, rng=make_rng(options.seed, i))
+            else:
+                sheet = _character_sheet_from_options(options, rng=rng)
+        except PoolExhaustedError:
+            sheet = None
+        yield sheet
+
+
+# Function which makes sheet i of a seeded batch again without the rest of the batch.
+def regenerate_character_sheet(seed, index: int, options=None) -> CharacterSheet:
+    if options is None:
+        options = GenerationOptions()
+    if options.numpy_dice:
+        import dndCharacterApp.utils.dice_utils as dice
+        dice_rng = dice.make_character_generator(derive_seed(seed, DICE_STREAM), index)
+        return _numpy_dice_sheet(options, make_rng(seed, index), dice.draw_characters(1, dice_rng))
+    return _character_sheet_from_options(options, rng=make_rng(seed, index))
+
+
+# Function which derives the 64-bit seed of stream i (a sheet or a worker) from a seed.
+# Streams of the same seed are independent of each other and always the same.
+def derive_seed(seed, stream: int) -> int:
+    digest = hashlib.sha256((str(seed) + ":" + str(stream)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+# Function which returns a new generator given a seed, if a stream is given the
+# generator is seeded with the seed derived for that stream.
+def make_rng(seed, stream=None) -> random.Random:
+    if stream is None:
+        return random.Random(seed)
+    return random.Random(derive_seed(seed, stream))
+
+
+# Function used to load everything needed to make a character sheet ahead of time.
+def warm_up():
+    race_mod.get_race_count()
+    bkgr_mod.get_eligible_ideals(1, Alignment.True_Neutral)
+    for class_name in io.get_row(1, io.CLASS_STAND_FILE_PATH):
+        dnd_mod.get_class_progression(class_name)
+
+
+# Helper function which yields the sheets of a batch, rolling their dice with NumPy. The dice
+# are drawn for up to DICE_BLOCK_SIZE sheets at a time and each sheet is yielded as soon as
+# it is made. Every sheet takes the same number of draws, so a seeded batch gives sheet i the
+# draws of sheet i of the seed's dice stream whatever range of the batch is made. Otherwise
+# the dice are drawn from a generator seeded from the given generator.
+# Sheets that could not be made are yielded as None.
+def _iter_numpy_dice_sheets(n: int, options: GenerationOptions, start=0, rng=random):
+    import dndCharacterApp.utils.dice_utils as dice
+
+    if options.seed is not None:
+        dice_rng = dice.make_character_generator(derive_seed(options.seed, DICE_STREAM), start)
+    else:
+        dice_rng = dice.make_generator(rng.getrandbits(64))
+    end = start + n
+    block_start = start
+    while block_start < end:
+        draws = dice.draw_characters(min(end - block_start, DICE_BLOCK_SIZE), dice_rng)
+        ability_scores = dice.ability_scores_from_draws(draws)
+        for row in range(len(draws)):
+            i = block_start + row
+            sheet_rng = make_rng(options.seed, i) if options.seed is not None else rng
+            try:
+                sheet = _numpy_dice_sheet(options, sheet_rng, draws, row, ability_scores[row])
+            except PoolExhaustedError:
+                sheet = None
+            yield sheet
+        block_start += len(draws)
+
+
+# Helper function which makes a sheet whose dice are the given row of draws made by
+# dice_utils.draw_characters. The row's ability scores can be given if they are already known.
+def _numpy_dice_sheet(options: GenerationOptions, rng, draws, row=0,
+                      ability_scores=None) -> CharacterSheet:
+    import dndCharacterApp.utils.dice_utils as dice
+
+    if ability_scores is None:
+        ability_scores = dice.ability_scores_from_draws(draws[row:row + 1])[0]
+    sheet = _character_sheet_from_options(options, rng, ability_scores, False)
+    sheet.set_hit_points(dice.hit_points_from_draws(sheet.get_hit_die_size(), sheet.get_level(),
+                                                    sheet.get_ability_modifiers()[2], draws[row]))
+    return sheet
+
+
+# Helper function which makes a single sheet in the same order as
+# completely_random_character_sheet, skipping the choices fixed by the options.
+# Ability scores already rolled can be given, and the hit points can be left to the caller.
+def _character_sheet_from_options(options: GenerationOptions, rng=random, ability_scores=None,
+                                  with_hit_points=True) -> CharacterSheet:
+    alignment = options.alignment if options.alignment is not None else random_alignment(rng=rng)
+    bkgr = random_background(alignment, rng=rng)
+    level = options.level if options.level is not None else random_level(rng=rng)
+    race = Race(options.race_index, level) if options.race_index is not None \
+        else random_race(level, rng=rng)
+    gender = random_gender(rng=rng)
+    name = random_name(race.get_racial_name_file_path(), gender, rng=rng)
+    age = random_age(race.get_max_age(), rng=rng)
+    if ability_scores is None:
+        ability_scores = random_ability_scores(rng=rng)
+    dndClass = random_dnd_class(level, ability_scores, race, bkgr, options.dnd_class, rng=rng)
+    return random_character_sheet(dndClass, gender, name, age, rng=rng,
+                                  with_hit_points=with_hit_points)
+
+
+# Helper function which returns the index of a race given its name or index.
+def _get_race_index(race) -> int:
+    if isinstance(race, int):
+        if not 1 <= race <= race_mod.get_race_count():
+            raise ValueError("race index out of range: " + str(race))
+        return race
+    index = race_mod.find_race_index(str(race))
+    if index == -1:
+        raise ValueError("unknown race: " + str(race))
+    return index
+
 # Function which returns a random spell list given an empty or partially filled spell list,
 # list representing a caster's spell slots, the file path to the spell list,
 # level of the caster, score of the casting ability and spells known if they are
 # a known caster.
 # Spell list returned will not have any duplicate spells in its list.
 def random_spells(spells: [], spell_slots: (), spell_list_file_path: str,
-                  level: int, casting_ability_score: int, spells_known: int) -> []:
+                  level: int, casting_ability_score: int, spells_known: int, rng=random) -> []:
     # Get number of spells that need to be set for the spell list.
     # If it is a prepared caster then casting mod + level is the total spells they
     # can prepare.
@@ -403,34 +666,42 @@ def random_spells(spells: [], spell_slots: (), spell_list_file_path: str,
     max_spell_level = len(spell_slots)
     spell_list = [[] for i in range(len(spell_slots))]
     for i in range(max_spell_level):
-        spell_list[i] = list(io.get_col(i +1, spell_list_file_path, False))
-        spell_list[i].pop(0)
+        spell_list[i] = get_spell_pool(spell_list_file_path, i)
 
     # Set cantrips of list based on the available amount of space allotted by
     # the spells slots.
-    for i in range(spell_slots[0]):
-        while True:
-            spell = random.choice(spell_list[0])
-            if spell not in spells[0]:
-                spells[0].append(spell)
-                break
+    spells[0].extend(sample_without_replacement(spell_list[0], spell_slots[0], spells[0],
+                                                spell_list_file_path + " cantrips", rng=rng,
+                                                is_unique=True))
 
     # For the number of spells that can be chosen, select a random spell level,
-    # (1 - maximum spell level) and attempt to add that to the total spell list
+    # (1 - maximum spell level) and add one of its spells that is not known yet.
+    # A spell level is chosen with a weight of its remaining spells over its whole list,
+    # the same odds as drawing a level then a spell and redrawing duplicates.
+    remaining = [[spell for spell in spell_list[i] if spell not in spells[i]]
+                 for i in range(max_spell_level)]
     for i in range(number_of_spells):
-        while True:
-            random_spell_level = random.randint(1, max_spell_level - 1)
-            spell = random.choice(spell_list[random_spell_level])
-            # Do not add duplicate spells to the spell list
-            if spell not in spells[random_spell_level]:
-                spells[random_spell_level].append(spell)
-                break
+        weights = [len(remaining[level]) / len(spell_list[level]) if len(spell_list[level]) > 0
+                   else 0 for level in range(1, max_spell_level)]
+        if sum(weights) == 0:
+            raise PoolExhaustedError(number_of_spells, i, spell_list_file_path)
+        random_spell_level = rng.choices(range(1, max_spell_level), weights)[0]
+
+        # Swap the chosen spell with the last one so it can be removed right away.
+        level_spells = remaining[random_spell_level]
+        j = rng.randint(0, len(level_spells) - 1)
+        spell = level_spells[j]
+        level_spells[j] = level_spells[-1]
+        level_spells.pop()
+        while spell in level_spells:
+            level_spells.remove(spell)
+        spells[random_spell_level].append(spell)
 
     return spells
 
 # Function used to finish selecting spells if class requires further choice
 # from the player.
-def _finalize_spells(spells: []) -> []:
+def _finalize_spells(spells: [], rng=random) -> []:
     # Used to keep track of current spell level.
     counter = 0
     # Go through each spell level in the class's list
@@ -440,23 +711,21 @@ def _finalize_spells(spells: []) -> []:
             # Extract the file path to the spell list that a selection needs to be made from.
             if spell.startswith("*"):
                 file_path = spell[1:]
-                line = list(io.get_col(1 + counter, file_path, False))
-                line.pop(0)
+                line = get_spell_pool(file_path, counter)
                 # Get index of current spell so that it may be altered
                 index = spell_level.index(spell)
                 # Only add spells to the class that the class does not already know.
-                while True:
-                    new_spell = random.choice(line)
-                    if new_spell not in spell_level:
-                        spell_level[index] = new_spell
-                        break
+                spell_level[index] = sample_without_replacement(line, 1, spell_level,
+                                                                file_path + " level " +
+                                                                str(counter), rng=rng,
+                                                                is_unique=True)[0]
         counter += 1
     return spells
 
 # Function used to change specific attributes that may be affected by a dnd class's
 # abilities. These abilities require random choice(s) to be made as well such
 # as picking skills from a list or even random sub abilities.
-def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
+def _finialize_choice_special_abilities(dndclass: DndClass, rng=random) -> DndClass:
     for feature in dndclass.get_features():
         match feature.lower():
 
@@ -474,7 +743,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
 
                 # Get a random ability and then add it to the chosen features while removing it
                 # from the total list
-                feat = random.choice(available_features)
+                feat = rng.choice(available_features)
                 chosen_features.append(feat)
                 available_features.remove(feat)
 
@@ -485,7 +754,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                     for n_feat in new_features:
                         available_features.append(n_feat)
 
-                    feat = random.choice(available_features)
+                    feat = rng.choice(available_features)
                     chosen_features.append(feat)
                     available_features.remove(feat)
 
@@ -494,7 +763,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                         for n_feat in new_features:
                             available_features.append(n_feat)
 
-                        feat = random.choice(available_features)
+                        feat = rng.choice(available_features)
                         chosen_features.append(feat)
                         available_features.remove(feat)
 
@@ -504,7 +773,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                             for n_feat in new_features:
                                 available_features.append(n_feat)
 
-                            feat = random.choice(available_features)
+                            feat = rng.choice(available_features)
                             chosen_features.append(feat)
                             available_features.remove(feat)
 
@@ -516,7 +785,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                 dndclass.set_prepared_or_known_caster("K")
 
                 # Finally, apply these changes to the class itself.
-                dndclass = _finalize_sub_abilities(chosen_features, dndclass)
+                dndclass = _finalize_sub_abilities(chosen_features, dndclass, rng=rng)
 
             # Choose either 2 skills or the thieves tools and the proficiency bonus fo that is
             # doubled, at level 6 or higher 2 more skills can be selected.
@@ -539,7 +808,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                 proficient_skills.append("Thieves’ Tools")
                 # Get the list of skills that will have their proficiency bonus doubled,
                 # Remove Thieves tools from the list if that was chosen.
-                proficient_skills = random_list(proficient_skills, num_of_skills)
+                proficient_skills = random_list(proficient_skills, num_of_skills, rng=rng)
                 if "Thieves’ Tools" in proficient_skills:
                     proficient_skills.remove("Thieves’ Tools")
 
@@ -570,7 +839,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                 dnd_features = list(dndclass.get_features())
                 available_features = ["Forged Heart", "Nightmare Shroud", "Traveler’s Blade",
                                       "Weretouched"]
-                feat = random.choice(available_features)
+                feat = rng.choice(available_features)
 
                 # Get proper abbreviation
                 if feature.lower() == "martial discipline":
@@ -596,11 +865,12 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
                     num_of_selections = 1
 
                 # Get the final list of random skills and languages
-                skill_bonuses = random_list(skill_choices, num_of_selections)
+                skill_bonuses = random_list(skill_choices, num_of_selections, rng=rng)
                 langs = []
                 for i in range(num_of_selections):
                     langs.append("?Standard")
-                lang_bonuses = random_equip_or_lang_or_pro(langs,io.LANGUAGE_FILE_PATH, False)
+                lang_bonuses = random_equip_or_lang_or_pro(langs,io.LANGUAGE_FILE_PATH, False,
+                                                           rng=rng)
 
                 # Add the new languages to the class's list
                 if dndclass.languages is not None:
@@ -638,7 +908,7 @@ def _finialize_choice_special_abilities(dndclass: DndClass) -> DndClass:
 # the sub-abilities chosen if a parent ability grants them to the class.
 # Some features may not grant any changes to the class but will be added to the
 # dnd class's final features list.
-def _finalize_sub_abilities(sub_features: tuple, dndclass: DndClass) -> DndClass:
+def _finalize_sub_abilities(sub_features: tuple, dndclass: DndClass, rng=random) -> DndClass:
     dnd_features = list(dndclass.get_features())
     for feature in sub_features:
         # Match the name of features that change attributes of the class
@@ -677,8 +947,8 @@ def _finalize_sub_abilities(sub_features: tuple, dndclass: DndClass) -> DndClass
 # 20 (can not be increased). If two scores need to be increased then
 # a second index maybe passed in as well to avoid increasing the
 # same score twice.
-def _get_score_below_20 (ability_scores: [], second_index = -1) -> int:
+def _get_score_below_20 (ability_scores: [], second_index = -1, rng=random) -> int:
     while True:
-        index = random.randint(0, 5)
+        index = rng.randint(0, 5)
         if ability_scores[index] < 20 and index != second_index:
             return index
\ No newline at end of file
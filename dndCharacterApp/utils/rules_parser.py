@@ -0,0 +1,258 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which parses the mini-language used inside the cells of the rule files into typed
+# records. Each distinct cell is only parsed once, later requests for the same cell return
+# the record that was already built.
+#   "="  separates the entries of a list
+#   "/"  separates a level from its value (1/Feature) or the options of a choice (a/b)
+#   "?"  marks an option as a category which an item is randomly chosen from
+#   "*"  marks an option which has a further requirement (and is skipped when chosen)
+#   "!"  joins several items which are all gained with a single option
+#   "@"  gives the number of copies of an item (2@Dagger)
+# compile_rules parses every rule cell ahead of time, the warm up does so once the rule files
+# are loaded, and reports malformed cells with their file and cell location.
+# ----------------------------------------------------------------------------------------------- #
+
+from functools import lru_cache
+from typing import NamedTuple
+import dndCharacterApp.utils.io_utils as io
+
+# Kinds of options that can be found in a choice.
+OPTION_ITEM = "item"
+OPTION_CATEGORY = "category"
+OPTION_REQUIREMENT = "requirement"
+
+
+# Error raised when a cell does not follow the rules of the mini-language.
+class RulesSyntaxError(ValueError):
+
+    def __init__(self, reason: str, text: str, location=None):
+        self.reason = reason
+        self.text = text
+        self.location = location
+        message = reason + " (" + repr(text) + ")"
+        if location is not None:
+            message = location + ": " + message
+        super().__init__(message)
+
+
+# Record of a level gated list such as "1/Feature=3/Other Feature".
+# Entries hold the level, value and any further parts of the entry ("1/Light/0").
+class LevelGated(NamedTuple):
+    text: str
+    entries: tuple
+
+    # Function which returns the values gained up to a given level. As in the rule files,
+    # entries are expected to be in order so the list stops at the first entry above the level.
+    def up_to(self, level: int) -> ():
+        values = []
+        for entry in self.entries:
+            if level < entry[0]:
+                break
+            values.append(entry[1])
+        return tuple(values)
+
+    # Function which returns the value given for exactly the given level,
+    # None is returned if the level has no entry.
+    def at(self, level: int) -> str:
+        for entry in self.entries:
+            if entry[0] == level:
+                return entry[1]
+        return None
+
+
+# Record of a single option of a choice, such as "?Simple Weapons", "*War-hammer",
+# "A Holy Symbol!Vestments" or "2@Dagger".
+# Parts holds the items gained through "!" and count the copies given through "@".
+class Option(NamedTuple):
+    text: str
+    kind: str
+    value: str
+    count: int
+    parts: tuple
+
+
+# Record of a choice between several options such as "Mace/*War-hammer".
+class Choice(NamedTuple):
+    text: str
+    options: tuple
+
+
+# Function used to split a cell into the entries of its list.
+@lru_cache(maxsize=None)
+def parse_list(text: str) -> ():
+    return tuple(str(text).split("="))
+
+
+# Function used to parse a level gated list: "level/value=level/value".
+@lru_cache(maxsize=None)
+def parse_level_gated(text: str) -> LevelGated:
+    entries = []
+    for entry in parse_list(text):
+        sub_entries = entry.split("/")
+        if len(sub_entries) < 2:
+            raise RulesSyntaxError("entry " + repr(entry) + " is missing its level", text)
+        try:
+            level = int(sub_entries[0])
+        except ValueError:
+            raise RulesSyntaxError("entry " + repr(entry) + " does not begin with a level", text)
+        entries.append((level, sub_entries[1], tuple(sub_entries[2:])))
+    return LevelGated(text, tuple(entries))
+
+
+# Function used to parse a racial spell cell: "Ability=level/spell/spell level=...".
+# Returns the casting ability and the level gated list of spells.
+@lru_cache(maxsize=None)
+def parse_racial_spells(text: str) -> ():
+    line = parse_list(text)
+    if len(line) > 1:
+        return line[0], parse_level_gated("=".join(line[1:]))
+    return line[0], LevelGated("", ())
+
+
+# Function used to parse a single option of a choice.
+@lru_cache(maxsize=None)
+def parse_option(text: str) -> Option:
+    text = str(text)
+    if text.startswith("?"):
+        kind = OPTION_CATEGORY
+    elif text.startswith("*"):
+        kind = OPTION_REQUIREMENT
+    else:
+        kind = OPTION_ITEM
+
+    count = 1
+    value = text
+    if "@" in text:
+        multi_items = text.split("@")
+        try:
+            count = int(multi_items[0])
+        except ValueError:
+            raise RulesSyntaxError("the number of copies is not a number", text)
+        value = multi_items[1]
+    elif kind != OPTION_ITEM:
+        value = text[1:]
+
+    parts = tuple(text.split("!")) if "!" in text else ()
+    return Option(text, kind, value, count, parts)
+
+
+# Function used to parse a choice between options: "option/option".
+@lru_cache(maxsize=None)
+def parse_choice(text: str) -> Choice:
+    return Choice(text, tuple(parse_option(option) for option in str(text).split("/")))
+
+
+# Function used to parse a list of choices: "option/option=option".
+@lru_cache(maxsize=None)
+def parse_choice_list(text: str) -> ():
+    return tuple(parse_choice(choice) for choice in parse_list(text))
+
+
+# Function used to parse every rule cell that the program uses, so they are ready before
+# the first character is made. Missing ideals are the (background index, alignment) pairs
+# that no ideal can be taken with (see dndBackground.find_missing_ideals).
+# A list of errors (with their locations) is returned, it is empty if every cell is valid.
+def compile_rules(missing_ideals=()) -> []:
+    errors = []
+
+    # Standard features of each class.
+    rows = io.get_rows(io.CLASS_STAND_FILE_PATH)
+    for col in _get_filled_columns(rows):
+        _check(errors, parse_level_gated, io.CLASS_STAND_FILE_PATH, rows, 2, col)
+        # Armor, weapon and tool proficiencies may still hold choices.
+        for row in range(4, 7):
+            _check(errors, parse_choice_list, io.CLASS_STAND_FILE_PATH, rows, row, col)
+        _check(errors, parse_list, io.CLASS_STAND_FILE_PATH, rows, 7, col)
+        _check(errors, parse_list, io.CLASS_STAND_FILE_PATH, rows, 8, col)
+        _check(errors, parse_level_gated, io.CLASS_STAND_FILE_PATH, rows, 9, col)
+        _check(errors, parse_level_gated, io.CLASS_STAND_FILE_PATH, rows, 10, col)
+
+    # Choices of each class and the archetypes they lead to.
+    rows = io.get_rows(io.CLASS_CHOICE_FILE_PATH)
+    for col in _get_filled_columns(rows):
+        skills = _check(errors, parse_list, io.CLASS_CHOICE_FILE_PATH, rows, 2, col)
+        if skills is not None and (len(skills) != 2 or not skills[0].isdigit()):
+            errors.append(_get_location(io.CLASS_CHOICE_FILE_PATH, 2, col) +
+                          ": skill choices should be 'number=skill/skill'")
+        for row in range(3, 6):
+            _check(errors, parse_choice_list, io.CLASS_CHOICE_FILE_PATH, rows, row, col)
+        archetype = _check(errors, parse_list, io.CLASS_CHOICE_FILE_PATH, rows, 6, col)
+        if archetype is not None and len(archetype) > 2 and archetype[0] != "0":
+            _compile_archetype_file(errors, archetype[2])
+
+    # Races and backgrounds.
+    rows = io.get_rows(io.RACE_FILE_PATH)
+    for col in _get_filled_columns(rows):
+        _check(errors, parse_list, io.RACE_FILE_PATH, rows, 2, col)
+        if _get_cell(rows, 3, col) is not None and str(_get_cell(rows, 3, col)).lower() != "none":
+            _check(errors, parse_racial_spells, io.RACE_FILE_PATH, rows, 3, col)
+        _check(errors, parse_list, io.RACE_FILE_PATH, rows, 4, col)
+        _check(errors, parse_choice_list, io.RACE_FILE_PATH, rows, 8, col)
+
+    rows = io.get_rows(io.BKGR_ATRBT_FILE_PATH)
+    for col in _get_filled_columns(rows):
+        for row in range(2, 5):
+            _check(errors, parse_choice_list, io.BKGR_ATRBT_FILE_PATH, rows, row, col)
+        _check(errors, parse_list, io.BKGR_ATRBT_FILE_PATH, rows, 5, col)
+        _check(errors, parse_list, io.BKGR_ATRBT_FILE_PATH, rows, 7, col)
+
+    # Backgrounds which can not be made with an alignment since none of their ideals match it.
+    for background_index, alignment in missing_ideals:
+        errors.append(_get_location(io.BKGR_IDEALS_FILE_PATH, 1, background_index) +
+                      ": no ideal can be taken with the alignment " + alignment.name)
+
+    return errors
+
+
+# Helper function used to parse the cells of an archetype file.
+def _compile_archetype_file(errors: [], file_path: str):
+    rows = io.get_rows(file_path)
+    if rows is None:
+        errors.append(file_path + ": archetype file could not be found")
+        return
+    for col in _get_filled_columns(rows):
+        for row in range(2, 7):
+            _check(errors, parse_choice_list, file_path, rows, row, col)
+        _check(errors, parse_list, file_path, rows, 7, col)
+        _check(errors, parse_list, file_path, rows, 8, col)
+        _check(errors, parse_level_gated, file_path, rows, 9, col)
+        cell = _get_cell(rows, 10, col)
+        if cell is not None and str(cell).lower() != "none":
+            _check(errors, parse_level_gated, file_path, rows, 10, col)
+
+
+# Helper function which parses a cell and records any error with the cell's location.
+# Returns the parsed record or None if the cell is missing or invalid.
+def _check(errors: [], parser, file_path: str, rows: (), row: int, col: int):
+    cell = _get_cell(rows, row, col)
+    if cell is None:
+        errors.append(_get_location(file_path, row, col) + ": cell is empty")
+        return None
+    try:
+        return parser(str(cell))
+    except RulesSyntaxError as ex:
+        errors.append(str(RulesSyntaxError(ex.reason, ex.text,
+                                           _get_location(file_path, row, col))))
+        return None
+
+
+# Helper function which returns the indexes (starting at 1) of every column with a header.
+def _get_filled_columns(rows: ()) -> []:
+    if rows is None or len(rows) == 0:
+        return []
+    return [i + 1 for i in range(len(rows[0])) if rows[0][i] is not None]
+
+
+def _get_cell(rows: (), row: int, col: int):
+    if row > len(rows) or col > len(rows[row - 1]):
+        return None
+    return rows[row - 1][col - 1]
+
+
+# Helper function which returns the location of a cell as "file!A1".
+def _get_location(file_path: str, row: int, col: int) -> str:
+    name = ""
+    while col > 0:
+        col, remainder = divmod(col - 1, 26)
+        name = chr(ord("A") + remainder) + name
+    return file_path + "!" + name + str(row)
@@ -0,0 +1,168 @@
+# ----------------------------------------------------------------------------------------------- #
+# Module which loads every rule file of the lib folder in the background, so the first
+# character does not have to wait for the files to be read. A rules pack which is up to date
+# is a single read, so its files are then loaded from it on the warm up's thread. If the pack
+# is missing or stale each workbook is parsed on a pool of threads instead and the pack is
+# built from them. Once every file is loaded the cells of the rules are parsed (reporting any
+# malformed cell) and the races, classes and ideals are built as well. Callers can check the
+# progress, wait for it or just go ahead, files that are not loaded yet are read as usual
+# when they are needed.
+# ----------------------------------------------------------------------------------------------- #
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from os.path import join
+import dndCharacterApp.utils.io_utils as io
+import dndCharacterApp.utils.pack_utils as pack
+import dndCharacterApp.utils.rules_parser as rules
+
+# Warm up started by start_warm_up, None if it has not been started.
+_WARM_UP = None
+_WARM_UP_LOCK = threading.Lock()
+
+
+# Class which loads a list of rule files in the background.
+class WarmUp:
+
+    # Constructor for WarmUp, file paths are relative to the lib folder. The pool of threads
+    # is only used when the workbooks need to be parsed.
+    # Nothing is loaded until start is called.
+    def __init__(self, file_paths: (), max_workers=None):
+        self._file_paths = tuple(file_paths)
+        self._max_workers = max_workers
+        self._loaded = 0
+        self._errors = []
+        self._rule_errors = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started = False
+
+    # Function used to begin loading the files, returns the warm up itself.
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        threading.Thread(target=self._run, name="rules-warm-up", daemon=True).start()
+        return self
+
+    # Function which returns the number of files loaded and the total number of files.
+    def get_progress(self) -> ():
+        with self._lock:
+            return self._loaded, len(self._file_paths)
+
+    # Function which returns whether every file has been loaded.
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    # Function used to wait until every file has been loaded, or until the timeout
+    # (in seconds) has passed. Returns whether the warm up is done.
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    # Function which returns the errors (file path and exception) of the files that
+    # could not be loaded.
+    def get_errors(self) -> []:
+        with self._lock:
+            return list(self._errors)
+
+    # Function which returns the malformed cells of the rule files, with their locations.
+    def get_rule_errors(self) -> []:
+        with self._lock:
+            return list(self._rule_errors)
+
+    def _run(self):
+        lib_folder = io.get_lib_folder()
+        try:
+            if len(self._file_paths) == 0:
+                with self._lock:
+                    self._errors.append((lib_folder, FileNotFoundError("No rule files found")))
+                return
+            sheets = pack.load_pack(lib_folder)
+            # Workbooks parsed by the pool are counted as they are parsed.
+            parsed = sheets is None
+            if parsed:
+                sheets = self._compile_workbooks(lib_folder)
+                if sheets is None:
+                    return
+                # Only a pack of every workbook is saved, a pack that can not be saved
+                # (read-only folder) is still used.
+                if self._file_paths == pack.find_workbooks(lib_folder):
+                    try:
+                        pack.write_pack(lib_folder, sheets)
+                    except OSError:
+                        pass
+            io.set_rules_pack(sheets)
+            for file_path in self._file_paths:
+                self._load_file(file_path)
+                if not parsed:
+                    self._add_loaded()
+            # Once the files are loaded build what is made from them.
+            if len(self.get_errors()) > 0:
+                return
+            try:
+                # Imported here since rand_utils imports every entity of the program.
+                import dndCharacterApp.utils.rand_utils as ran
+                import dndCharacterApp.dndEntities.dndBackground as bkgr_mod
+                rule_errors = rules.compile_rules(bkgr_mod.find_missing_ideals())
+                with self._lock:
+                    self._rule_errors.extend(rule_errors)
+                ran.warm_up()
+            except Exception as ex:
+                with self._lock:
+                    self._errors.append((lib_folder, ex))
+        finally:
+            self._done.set()
+
+    # Function used to parse every workbook on a pool of threads, each thread parsing its own
+    # workbook. Returns the rows of each workbook keyed by its path, None if any could not
+    # be parsed.
+    def _compile_workbooks(self, lib_folder: str) -> {}:
+        sheets = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers,
+                                thread_name_prefix="rules-warm-up") as executor:
+            wait([executor.submit(self._read_workbook, lib_folder, file_path, sheets)
+                  for file_path in self._file_paths])
+        return sheets if len(self.get_errors()) == 0 else None
+
+    def _read_workbook(self, lib_folder: str, file_path: str, sheets: {}):
+        try:
+            rows = pack.read_workbook_rows(join(lib_folder, file_path))
+            with self._lock:
+                sheets[file_path] = rows
+        except Exception as ex:
+            with self._lock:
+                self._errors.append((file_path, ex))
+        self._add_loaded()
+
+    def _load_file(self, file_path: str):
+        try:
+            if io.get_rows(file_path) is None:
+                raise FileNotFoundError("Could not read the file")
+        except Exception as ex:
+            with self._lock:
+                self._errors.append((file_path, ex))
+
+    def _add_loaded(self):
+        with self._lock:
+            self._loaded += 1
+
+
+# Function which returns the path (relative to the lib folder) of every rule file.
+def get_rule_files() -> ():
+    return pack.find_workbooks(io.get_lib_folder())
+
+
+# Function used to start loading every rule file in the background, the warm up is only
+# started once and later calls return the same warm up.
+def start_warm_up(max_workers=None) -> WarmUp:
+    global _WARM_UP
+    with _WARM_UP_LOCK:
+        if _WARM_UP is None:
+            _WARM_UP = WarmUp(get_rule_files(), max_workers).start()
+        return _WARM_UP
+
+
+# Function which returns the warm up started by start_warm_up, None if it has not been started.
+def get_warm_up() -> WarmUp:
+    return _WARM_UP